@@ -0,0 +1,476 @@
+"""
+Ảnh chụp (snapshot) dạng cột của bảng điểm cho phân tích: Parquet + Arrow
+
+Ghi: Score JOIN Student JOIN Subject được ghi thành dataset Parquet (nén zstd)
+chia thư mục theo học kỳ kiểu Hive, trong ANALYTICS_DIR:
+
+    scores/semester=HK1-2024/part-0.parquet
+    scores/semester=__HIVE_DEFAULT_PARTITION__/part-0.parquet   (học kỳ NULL)
+    state.json   (mốc refresh, số dòng từng partition, điểm trượt)
+
+- Mỗi partition luôn được ghi lại trọn vẹn từ database (đọc theo lô bằng
+  server-side cursor, ghi file tạm rồi os.replace) nên người đọc không bao giờ
+  thấy file ghi dở và các partition độc lập với nhau (tác vụ nền ghi song song,
+  mỗi chunk một học kỳ, xem jobs.py).
+- Refresh tăng dần: chỉ ghi lại học kỳ có điểm với created_at/updated_at sau
+  mốc lần trước (trừ ANALYTICS_OVERLAP_SECONDS cho các transaction commit
+  muộn), có sinh viên/môn học liên quan vừa sửa, hoặc có số dòng trong database
+  khác số dòng đã ghi (bản ghi bị xóa). Các truy vấn dò này chỉ dùng index
+  created_at/updated_at và một GROUP BY semester.
+- full=True ghi lại mọi học kỳ và xóa partition không còn dữ liệu.
+
+Đọc: dataset được mở bằng pyarrow.dataset trên LocalFileSystem(use_mmap=True)
+(memory-map, các worker dùng chung page cache của hệ điều hành). Lọc học kỳ chỉ
+mở đúng partition đó; phân bố điểm chữ, điểm trung bình, tỉ lệ đạt và GPA tính
+bằng pyarrow.compute trên cả cột, không qua object ORM và không chạm database.
+
+Module này import pyarrow khi được import; app.py và jobs.py chỉ import nó bên
+trong hàm (và app.preload nạp sẵn ở chế độ gunicorn preload).
+"""
+
+import json
+import os
+import shutil
+import threading
+from datetime import datetime, timedelta
+from urllib.parse import quote, unquote
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.fs
+import pyarrow.parquet as pq
+from flask import current_app
+from sqlalchemy import func, or_, select
+
+import gpa
+from models import db, GradingPolicy, Score, Student, Subject
+
+# Tăng khi đổi schema: snapshot cũ khác version bị bỏ qua cho tới lần refresh --full
+SNAPSHOT_VERSION = 1
+DATASET_DIR = 'scores'
+STATE_FILE = 'state.json'
+PARTITION_FILE = 'part-0.parquet'
+NULL_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+COMPRESSION = 'zstd'
+FETCH_SIZE = 10000
+
+SCHEMA = pa.schema([
+    ('score_id', pa.int64()),
+    ('student_id', pa.int64()),
+    ('student_code', pa.string()),
+    ('class_name', pa.string()),
+    ('major', pa.string()),
+    ('subject_id', pa.int64()),
+    ('subject_code', pa.string()),
+    ('credits', pa.int32()),
+    ('midterm_score', pa.float64()),
+    ('final_score', pa.float64()),
+    ('average_score', pa.float64()),
+    ('letter_grade', pa.string()),
+    ('created_at', pa.timestamp('us')),
+    ('updated_at', pa.timestamp('us')),
+])
+PARTITIONING = ds.partitioning(pa.schema([('semester', pa.string())]), flavor='hive')
+
+SOURCE_COLUMNS = (
+    Score.id, Score.student_id, Student.student_id, Student.class_name, Student.major,
+    Score.subject_id, Subject.subject_code, Subject.credits,
+    Score.midterm_score, Score.final_score, Score.average_score, Score.letter_grade,
+    Score.created_at, Score.updated_at,
+)
+
+GRADE_ORDER = ['A+', 'A', 'B+', 'B', 'C+', 'C', 'D+', 'D', 'F']
+
+# Cùng các chiều với stats.GROUP_COLUMNS, trỏ tới cột trong snapshot
+GROUP_COLUMNS = {
+    'semester': 'semester',
+    'subject': 'subject_code',
+    'class': 'class_name',
+    'major': 'major',
+}
+
+
+class SnapshotMissing(RuntimeError):
+    """Chưa có snapshot (hoặc snapshot khác SNAPSHOT_VERSION): cần chạy refresh"""
+
+
+# --- Ghi snapshot -------------------------------------------------------------
+
+def root_dir():
+    return current_app.config['ANALYTICS_DIR']
+
+
+def _dataset_dir():
+    return os.path.join(root_dir(), DATASET_DIR)
+
+
+def partition_key(semester):
+    """Tên partition của học kỳ (giá trị được mã hóa URL như Hive)"""
+    return NULL_PARTITION if semester is None else quote(semester, safe='')
+
+
+def _partition_semester(key):
+    return None if key == NULL_PARTITION else unquote(key)
+
+
+def _partition_dir(semester):
+    return os.path.join(_dataset_dir(), f'semester={partition_key(semester)}')
+
+
+def _semester_condition(semester):
+    return Score.semester.is_(None) if semester is None else Score.semester == semester
+
+
+def read_state():
+    """Nội dung state.json của snapshot hiện tại, None nếu chưa có hoặc khác version"""
+    try:
+        with open(os.path.join(root_dir(), STATE_FILE), encoding='utf-8') as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    return state if state.get('version') == SNAPSHOT_VERSION else None
+
+
+def plan(full=False):
+    """
+    Chọn các học kỳ cần ghi lại. Trả về (mốc refresh mới, danh sách học kỳ,
+    full); mốc được lấy trước khi dò để thay đổi xảy ra trong lúc refresh được
+    lần sau bắt lại.
+    """
+    watermark = datetime.utcnow()
+    state = read_state()
+    full = full or state is None
+    db_counts = dict(db.session.execute(
+        select(Score.semester, func.count()).group_by(Score.semester)).all())
+    if full:
+        stale = [_partition_semester(key) for key in _existing_partitions()]
+        return watermark, sorted(set(db_counts) | set(stale), key=lambda s: (s is None, s or '')), True
+
+    since = (datetime.fromisoformat(state['refreshed_at'])
+             - timedelta(seconds=current_app.config['ANALYTICS_OVERLAP_SECONDS']))
+    changed_students = select(Student.id).where(Student.updated_at >= since)
+    changed_subjects = select(Subject.id).where(Subject.updated_at >= since)
+    affected = set(db.session.execute(
+        select(Score.semester).distinct().where(or_(
+            Score.created_at >= since,
+            Score.updated_at >= since,
+            Score.student_id.in_(changed_students),
+            Score.subject_id.in_(changed_subjects),
+        ))).scalars())
+
+    # Số dòng lệch (bản ghi bị xóa) hoặc partition không còn trong database
+    snapshot_counts = {_partition_semester(key): rows for key, rows in state['partitions'].items()}
+    for semester in set(db_counts) | set(snapshot_counts):
+        if db_counts.get(semester, 0) != snapshot_counts.get(semester, 0):
+            affected.add(semester)
+    return watermark, sorted(affected, key=lambda s: (s is None, s or '')), False
+
+
+def _existing_partitions():
+    try:
+        names = os.listdir(_dataset_dir())
+    except FileNotFoundError:
+        return []
+    return [name.split('=', 1)[1] for name in names if name.startswith('semester=')]
+
+
+def _batches(semester):
+    stmt = (select(*SOURCE_COLUMNS)
+            .join(Student, Student.id == Score.student_id)
+            .join(Subject, Subject.id == Score.subject_id)
+            .where(_semester_condition(semester))
+            .order_by(Score.id)
+            .execution_options(yield_per=FETCH_SIZE))
+    for rows in db.session.execute(stmt).partitions():
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(values, type=field.type) for values, field in zip(columns, SCHEMA)],
+            schema=SCHEMA)
+
+
+def write_partition(semester):
+    """
+    Ghi lại partition của một học kỳ từ database. Học kỳ không còn điểm thì
+    giữ nguyên file cũ (save_state xóa partition sau khi mọi chunk xong).
+    Trả về {'partition', 'rows', 'bytes'}.
+    """
+    directory = _partition_dir(semester)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, PARTITION_FILE)
+    # Tên bắt đầu bằng '.' để pyarrow.dataset bỏ qua file đang ghi
+    tmp_path = os.path.join(directory, f'.{PARTITION_FILE}.{os.getpid()}.{threading.get_ident()}.tmp')
+    rows = 0
+    try:
+        with pq.ParquetWriter(tmp_path, SCHEMA, compression=COMPRESSION) as writer:
+            for batch in _batches(semester):
+                writer.write_batch(batch)
+                rows += batch.num_rows
+        if rows:
+            os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    if not rows:
+        return {'partition': partition_key(semester), 'rows': 0, 'bytes': 0}
+    return {'partition': partition_key(semester), 'rows': rows, 'bytes': os.path.getsize(path)}
+
+
+def _fail_grades():
+    grades = {Score.FAIL_GRADE}
+    grades.update(db.session.execute(select(GradingPolicy.fail_grade).distinct()).scalars())
+    return sorted(grades)
+
+
+def save_state(watermark, results, full):
+    """
+    Ghi state.json sau khi mọi partition đã ghi xong, rồi xóa partition không
+    còn dữ liệu; trả về state mới.
+    """
+    previous = None if full else read_state()
+    partitions = dict(previous['partitions']) if previous else {}
+    removed = []
+    for result in results:
+        if result['rows']:
+            partitions[result['partition']] = result['rows']
+        else:
+            partitions.pop(result['partition'], None)
+            removed.append(result['partition'])
+    state = {
+        'version': SNAPSHOT_VERSION,
+        'refreshed_at': watermark.isoformat(),
+        'partitions': partitions,
+        'rows': sum(partitions.values()),
+        'fail_grades': _fail_grades(),
+    }
+    path = os.path.join(root_dir(), STATE_FILE)
+    os.makedirs(_dataset_dir(), exist_ok=True)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+    for key in removed:
+        shutil.rmtree(os.path.join(_dataset_dir(), f'semester={key}'), ignore_errors=True)
+    return state
+
+
+def refresh(full=False, progress=None):
+    """Refresh snapshot ngay trong tiến trình hiện tại; trả về (state, kết quả từng partition)"""
+    watermark, semesters, full = plan(full)
+    results = []
+    for semester in semesters:
+        results.append(write_partition(semester))
+        if progress:
+            progress(semester, results[-1])
+    return save_state(watermark, results, full), results
+
+
+# --- Đọc snapshot -------------------------------------------------------------
+
+_dataset_lock = threading.Lock()
+_dataset_cache = {}
+
+
+def open_dataset():
+    """
+    (dataset, state) của snapshot hiện tại. Dataset được giữ lại trong tiến
+    trình cho tới khi state.json đổi (refresh xong), nên không phải liệt kê lại
+    thư mục ở mỗi truy vấn.
+    """
+    path = os.path.join(root_dir(), STATE_FILE)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        raise SnapshotMissing('Chưa có snapshot phân tích, chạy `flask analytics snapshot`')
+    with _dataset_lock:
+        cached = _dataset_cache.get(path)
+        if cached and cached[0] == mtime:
+            return cached[1], cached[2]
+        state = read_state()
+        if state is None:
+            raise SnapshotMissing('Snapshot phân tích đã cũ, chạy `flask analytics snapshot --full`')
+        dataset = ds.dataset(_dataset_dir(), format='parquet', partitioning=PARTITIONING,
+                             filesystem=pyarrow.fs.LocalFileSystem(use_mmap=True))
+        _dataset_cache[path] = (mtime, dataset, state)
+        return dataset, state
+
+
+def _filter_expression(filters):
+    filters = filters or {}
+    conditions = []
+    if filters.get('semester'):
+        conditions.append(ds.field('semester') == filters['semester'])
+    if filters.get('subject_id'):
+        conditions.append(ds.field('subject_id') == int(filters['subject_id']))
+    if filters.get('class_name'):
+        conditions.append(ds.field('class_name') == filters['class_name'])
+    if filters.get('major'):
+        conditions.append(ds.field('major') == filters['major'])
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def _group_column(group_by):
+    if group_by is None:
+        return None
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f'group_by không hợp lệ: {group_by}')
+    return GROUP_COLUMNS[group_by]
+
+
+def _load(columns, filters, group_by):
+    """Đọc đúng các cột cần từ snapshot (chỉ các partition/row group khớp bộ lọc)"""
+    dataset, state = open_dataset()
+    group = _group_column(group_by)
+    if group and group not in columns:
+        columns = [group] + columns
+    return dataset.to_table(columns=columns, filter=_filter_expression(filters)), group, state
+
+
+def _round(value):
+    return round(float(value), 2) if value is not None else None
+
+
+def _grouped(table, group, aggregations, build):
+    """
+    Chạy aggregate trên cả bảng (group=None) hoặc theo từng nhóm; `build` chuyển
+    một dòng kết quả (dict tên cột -> giá trị) thành kết quả trả về.
+    """
+    keys = [group] if group else []
+    result = table.group_by(keys).aggregate(aggregations) if keys else _aggregate_all(table, aggregations)
+    rows = {}
+    for row in result.to_pylist():
+        rows[row[group] if group else None] = build(row)
+    return rows
+
+
+def _aggregate_all(table, aggregations):
+    # Gom cả bảng thành một nhóm (khóa null) để dùng chung đường aggregate với group_by
+    return table.append_column('_all', pa.nulls(table.num_rows, pa.int8())).group_by(['_all']).aggregate(aggregations)
+
+
+def _with_breakdown(compute, filters, group_by):
+    """Kết quả tổng thể, kèm bảng theo nhóm (sắp như stats.get_statistics) nếu có group_by"""
+    result = compute(filters, None).get(None)
+    if group_by:
+        groups = compute(filters, group_by)
+        result['group_by'] = group_by
+        result['breakdown'] = [dict(group=key, **groups[key])
+                               for key in sorted(groups, key=lambda k: (k is None, k or ''))]
+    return result
+
+
+def _distribution(filters, group_by):
+    table, group, _ = _load(['letter_grade'], filters, group_by)
+    keys = ([group] if group else []) + ['letter_grade']
+    result = {}
+    for row in table.group_by(keys).aggregate([([], 'count_all')]).to_pylist():
+        key = row[group] if group else None
+        result.setdefault(key, {})[row['letter_grade'] or 'N/A'] = row['count_all']
+    if group is None:
+        result.setdefault(None, {})
+    order = {grade: i for i, grade in enumerate(GRADE_ORDER + ['N/A'])}
+    return {key: {'grade_distribution': dict(sorted(dist.items(), key=lambda item: order.get(item[0], len(order)))),
+                  'total_scores': sum(dist.values())}
+            for key, dist in result.items()}
+
+
+def distribution(filters=None, group_by=None):
+    """Số bản ghi theo điểm chữ"""
+    return _with_breakdown(_distribution, filters, group_by)
+
+
+def _average(filters, group_by):
+    table, group, _ = _load(['average_score'], filters, group_by)
+    aggregations = [('average_score', 'count'), ('average_score', 'mean'),
+                    ('average_score', 'min'), ('average_score', 'max'),
+                    ('average_score', 'stddev')]
+    result = _grouped(table, group, aggregations, lambda row: {
+        'count': row['average_score_count'],
+        'mean': _round(row['average_score_mean']),
+        'min': _round(row['average_score_min']),
+        'max': _round(row['average_score_max']),
+        'stddev': _round(row['average_score_stddev']),
+    })
+    if group is None and None not in result:
+        result[None] = {'count': 0, 'mean': None, 'min': None, 'max': None, 'stddev': None}
+    return result
+
+
+def average(filters=None, group_by=None):
+    """count/mean/min/max/stddev của điểm trung bình"""
+    return _with_breakdown(_average, filters, group_by)
+
+
+def _pass_rate(filters, group_by):
+    table, group, state = _load(['letter_grade'], filters, group_by)
+    letters = table['letter_grade']
+    graded = pc.is_valid(letters)
+    passed = pc.and_(graded, pc.invert(pc.is_in(letters, value_set=pa.array(state['fail_grades']))))
+    table = table.append_column('graded', pc.cast(graded, pa.int64())) \
+                 .append_column('passed', pc.cast(pc.fill_null(passed, False), pa.int64()))
+    result = _grouped(table, group, [('graded', 'sum'), ('passed', 'sum')], lambda row: {
+        'graded': row['graded_sum'],
+        'passed': row['passed_sum'],
+        'failed': row['graded_sum'] - row['passed_sum'],
+        'pass_rate': round(row['passed_sum'] / row['graded_sum'], 4) if row['graded_sum'] else None,
+    })
+    if group is None and None not in result:
+        result[None] = {'graded': 0, 'passed': 0, 'failed': 0, 'pass_rate': None}
+    return result
+
+
+def pass_rate(filters=None, group_by=None):
+    """Số bản ghi đã có điểm chữ, số đạt/trượt và tỉ lệ đạt (điểm trượt lấy lúc refresh)"""
+    return _with_breakdown(_pass_rate, filters, group_by)
+
+
+def _grade_points(letters):
+    """Điểm hệ 4 của cả cột điểm chữ (null với điểm chữ không có trong gpa.GRADE_POINTS)"""
+    grades = pa.array(list(gpa.GRADE_POINTS))
+    points = pa.array(list(gpa.GRADE_POINTS.values()), type=pa.float64())
+    return pc.take(points, pc.index_in(letters, value_set=grades))
+
+
+def _gpa(filters, group_by):
+    table, group, _ = _load(['student_id', 'letter_grade', 'credits'], filters, group_by)
+    table = table.filter(pc.is_valid(table['letter_grade']))
+    credits = pc.cast(table['credits'], pa.float64())
+    weighted = pc.multiply(pc.fill_null(_grade_points(table['letter_grade']), 0.0), credits)
+    table = table.append_column('points', weighted).append_column('credit_hours', credits)
+
+    # GPA từng sinh viên (trong nhóm), giống reports.rankings_query
+    keys = ([group] if group else []) + ['student_id']
+    per_student = table.group_by(keys).aggregate([('points', 'sum'), ('credit_hours', 'sum')])
+    per_student = per_student.append_column('gpa', pc.if_else(
+        pc.greater(per_student['credit_hours_sum'], 0),
+        pc.divide(per_student['points_sum'], per_student['credit_hours_sum']), 0.0))
+    result = _grouped(per_student, group, [('gpa', 'count'), ('gpa', 'mean'),
+                                            ('gpa', 'min'), ('gpa', 'max')], lambda row: {
+        'students': row['gpa_count'],
+        'mean_gpa': _round(row['gpa_mean']),
+        'min_gpa': _round(row['gpa_min']),
+        'max_gpa': _round(row['gpa_max']),
+    })
+    if group is None and None not in result:
+        result[None] = {'students': 0, 'mean_gpa': None, 'min_gpa': None, 'max_gpa': None}
+    return result
+
+
+def gpa_summary(filters=None, group_by=None):
+    """Số sinh viên và GPA trung bình/thấp nhất/cao nhất (GPA mỗi sinh viên tính trong phạm vi lọc)"""
+    return _with_breakdown(_gpa, filters, group_by)
+
+
+QUERIES = {
+    'distribution': distribution,
+    'average': average,
+    'pass-rate': pass_rate,
+    'gpa': gpa_summary,
+}
+
+
+def snapshot_info(state):
+    return {'refreshed_at': state['refreshed_at'], 'rows': state['rows'],
+            'partitions': len(state['partitions'])}
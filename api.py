@@ -0,0 +1,373 @@
+"""
+API JSON chỉ đọc, có version: /api/v1/students, /api/v1/subjects, /api/v1/scores
+
+- Phân trang bằng cursor (keyset theo id): ?limit=100&cursor=<next_cursor>
+- Chọn trường: ?fields=student_id,full_name (mặc định trả về mọi trường)
+- Lọc theo các tham số trong FILTERS của từng tài nguyên, ví dụ ?semester=HK1-2024
+- ETag (strong) và Last-Modified tính từ max(updated_at) và số bản ghi của các
+  bảng liên quan: client gửi lại If-None-Match / If-Modified-Since sẽ nhận 304
+  mà server không phải chạy truy vấn danh sách. Việc xóa bản ghi làm đổi ETag
+  (số bản ghi thay đổi) nhưng không đổi Last-Modified, nên client nên dùng ETag.
+  Last-Modified chỉ có khi giây chứa thay đổi mới nhất đã trôi qua.
+  Response được nén (compression.py) mang ETag yếu W/"..."; If-None-Match so
+  sánh yếu nên cả hai dạng đều nhận 304.
+
+Feed thay đổi cho đồng bộ tăng dần: /api/v1/changes?since=<cursor> trả về
+NDJSON, mỗi dòng một bản ghi đã thêm/sửa/xóa sau cursor (nhiều thay đổi của cùng
+bản ghi được gộp, dữ liệu là giá trị hiện tại với các trường như danh sách
+tương ứng). Cursor tiếp theo nằm trong header X-Next-Cursor; since có thể là
+thời điểm ISO 8601 cho lần đồng bộ đầu. Xem changes.py.
+
+Xác thực bằng session đăng nhập như giao diện web (quyền giáo viên trở lên).
+"""
+
+import hashlib
+import json
+from datetime import date, datetime, timedelta, timezone
+from functools import wraps
+
+from flask import Blueprint, Response, jsonify, request, url_for
+from flask_login import current_user
+from sqlalchemy import func, select
+
+import changes
+import counters
+from database import read_replica
+from models import db, Score, Student, Subject
+from pagination import keyset_page
+
+API_VERSION = 'v1'
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+CHANGES_DEFAULT_LIMIT = 1000
+CHANGES_MAX_LIMIT = 10000
+LOOKUP_BATCH_SIZE = 5000
+
+bp = Blueprint('api_v1', __name__, url_prefix=f'/api/{API_VERSION}')
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+
+
+@bp.errorhandler(ApiError)
+def _api_error(error):
+    return jsonify({'error': error.message}), error.status
+
+
+def api_teacher_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if not current_user.is_authenticated:
+            raise ApiError('Cần đăng nhập', 401)
+        if current_user.role not in ['admin', 'teacher']:
+            raise ApiError('Cần quyền giáo viên', 403)
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def _parse_int(name, value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ApiError(f'{name} phải là số nguyên')
+
+
+def _parse_datetime(name, value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ApiError(f'{name} phải có dạng ISO 8601, ví dụ 2024-01-31T08:00:00')
+
+
+# Mỗi tài nguyên: các trường (tên -> cột), cột nào cần join bảng student/subject,
+# các bộ lọc (tên -> (cột, hàm chuyển kiểu)) và các bảng quyết định ETag.
+RESOURCES = {
+    'students': {
+        'model': Student,
+        'fields': {
+            'id': Student.id,
+            'student_id': Student.student_id,
+            'full_name': Student.full_name,
+            'email': Student.email,
+            'phone': Student.phone,
+            'birth_date': Student.birth_date,
+            'class_name': Student.class_name,
+            'major': Student.major,
+            'status': Student.status,
+            'created_at': Student.created_at,
+            'updated_at': Student.updated_at,
+        },
+        'filters': {
+            'class_name': (Student.class_name, str),
+            'major': (Student.major, str),
+            'status': (Student.status, str),
+        },
+        'joins': {},
+        'validators': [(Student, counters.TOTAL_STUDENTS)],
+    },
+    'subjects': {
+        'model': Subject,
+        'fields': {
+            'id': Subject.id,
+            'subject_code': Subject.subject_code,
+            'subject_name': Subject.subject_name,
+            'credits': Subject.credits,
+            'semester': Subject.semester,
+            'updated_at': Subject.updated_at,
+        },
+        'filters': {
+            'semester': (Subject.semester, str),
+            'subject_code': (Subject.subject_code, str),
+        },
+        'joins': {},
+        'validators': [(Subject, counters.TOTAL_SUBJECTS)],
+    },
+    'scores': {
+        'model': Score,
+        'fields': {
+            'id': Score.id,
+            'student_id': Score.student_id,
+            'student_code': Student.student_id,
+            'subject_id': Score.subject_id,
+            'subject_code': Subject.subject_code,
+            'semester': Score.semester,
+            'midterm_score': Score.midterm_score,
+            'final_score': Score.final_score,
+            'average_score': Score.average_score,
+            'letter_grade': Score.letter_grade,
+            'created_at': Score.created_at,
+            'updated_at': Score.updated_at,
+        },
+        'filters': {
+            'semester': (Score.semester, str),
+            'subject_id': (Score.subject_id, int),
+            'student_id': (Score.student_id, int),
+            'letter_grade': (Score.letter_grade, str),
+            'class_name': (Student.class_name, str),
+        },
+        'joins': {
+            Student: Score.student_id == Student.id,
+            Subject: Score.subject_id == Subject.id,
+        },
+        'validators': [(Score, counters.TOTAL_SCORES), (Student, counters.TOTAL_STUDENTS),
+                       (Subject, counters.TOTAL_SUBJECTS)],
+    },
+}
+
+
+def _selected_fields(resource):
+    fields = resource['fields']
+    requested = request.args.get('fields')
+    if not requested:
+        return list(fields)
+    names = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown:
+        raise ApiError(f"Trường không hợp lệ: {', '.join(unknown)} (có: {', '.join(fields)})")
+    return names
+
+
+def _filters(resource):
+    conditions = []
+    for name, (column, cast) in resource['filters'].items():
+        value = request.args.get(name)
+        if value is None or value == '':
+            continue
+        conditions.append(column == (_parse_int(name, value) if cast is int else value))
+    updated_since = request.args.get('updated_since')
+    if updated_since:
+        conditions.append(resource['model'].updated_at >= _parse_datetime('updated_since', updated_since))
+    return conditions
+
+
+def _limit(default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    value = request.args.get('limit')
+    if value is None:
+        return default
+    limit = _parse_int('limit', value)
+    if not 1 <= limit <= maximum:
+        raise ApiError(f'limit phải nằm trong khoảng 1-{maximum}')
+    return limit
+
+
+def _validators(resource):
+    """(Last-Modified, ETag) của kết quả: chỉ đọc max(updated_at) theo index và bộ đếm"""
+    last_modified = None
+    parts = [API_VERSION, request.path, '&'.join(f'{k}={v}' for k, v in sorted(request.args.items(multi=True)))]
+    for model, counter in resource['validators']:
+        model_modified = db.session.execute(select(func.max(model.updated_at))).scalar()
+        parts.append(f'{model_modified.isoformat() if model_modified else "-"}:{counters.current(counter)}')
+        if model_modified and (last_modified is None or model_modified > last_modified):
+            last_modified = model_modified
+    if last_modified is not None:
+        # HTTP-date chỉ tới giây: làm tròn lên, và chỉ gửi khi giây đó đã qua. Nếu
+        # không, lần ghi sau trong cùng giây vẫn <= If-Modified-Since và client
+        # nhận 304 sai; trong lúc chờ, client vẫn dùng được ETag
+        if last_modified.microsecond:
+            last_modified = last_modified.replace(microsecond=0) + timedelta(seconds=1)
+        if last_modified > datetime.utcnow():
+            last_modified = None
+        else:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+    return last_modified, hashlib.sha1('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+def _not_modified(etag, last_modified):
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if request.if_modified_since and last_modified is not None:
+        return last_modified <= request.if_modified_since
+    return False
+
+
+def _serialize(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _list(name):
+    resource = RESOURCES[name]
+    fields = _selected_fields(resource)
+    conditions = _filters(resource)
+    limit = _limit()
+    cursor = request.args.get('cursor')
+
+    last_modified, etag = _validators(resource)
+    if _not_modified(etag, last_modified):
+        response = Response(status=304)
+    else:
+        model = resource['model']
+        columns = [resource['fields'][field].label(field) for field in fields if field != 'id']
+        query = db.session.query(model.id.label('id'), *columns)
+        needed = {resource['fields'][field].class_ for field in fields}
+        needed.update(column.class_ for column, _ in
+                      (resource['filters'][f] for f in resource['filters'] if request.args.get(f)))
+        for joined, on in resource['joins'].items():
+            if joined in needed:
+                query = query.join(joined, on)
+        if conditions:
+            query = query.filter(*conditions)
+
+        rows, next_cursor = keyset_page(query, [model.id], cursor, limit, descending=False,
+                                        key=lambda row: [row.id])
+        data = [{field: _serialize(getattr(row, field)) for field in fields} for row in rows]
+        payload = {'data': data, 'next_cursor': next_cursor}
+        if next_cursor:
+            args = request.args.to_dict()
+            args['cursor'] = next_cursor
+            payload['links'] = {'next': url_for(request.endpoint, **args)}
+        response = jsonify(payload)
+
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+@bp.route('/students')
+@api_teacher_required
+@read_replica
+def list_students():
+    return _list('students')
+
+
+@bp.route('/subjects')
+@api_teacher_required
+@read_replica
+def list_subjects():
+    return _list('subjects')
+
+
+@bp.route('/scores')
+@api_teacher_required
+@read_replica
+def list_scores():
+    return _list('scores')
+
+
+# --- Feed thay đổi ------------------------------------------------------------
+
+# Bảng trong change_log -> tài nguyên có cùng các trường dữ liệu
+CHANGE_RESOURCES = {'student': 'students', 'subject': 'subjects', 'score': 'scores'}
+
+
+def _changes_since(value):
+    if value is None or value == '':
+        return 0
+    if value.isdigit():
+        return int(value)
+    return changes.cursor_at(_parse_datetime('since', value))
+
+
+def _change_tables():
+    value = request.args.get('types')
+    if not value:
+        return None
+    tables = {name.strip() for name in value.split(',') if name.strip()}
+    unknown = tables - set(CHANGE_RESOURCES)
+    if unknown:
+        raise ApiError(f"types không hợp lệ: {', '.join(sorted(unknown))} (có: {', '.join(CHANGE_RESOURCES)})")
+    return tables
+
+
+def _current_rows(name, ids):
+    """Giá trị hiện tại của các bản ghi theo id; bản ghi đã bị xóa không có trong kết quả"""
+    resource = RESOURCES[name]
+    model = resource['model']
+    fields = resource['fields']
+    query = db.session.query(*[column.label(field) for field, column in fields.items()]).select_from(model)
+    for joined, on in resource['joins'].items():
+        query = query.join(joined, on)
+    rows = {}
+    ids = list(ids)
+    for i in range(0, len(ids), LOOKUP_BATCH_SIZE):
+        for row in query.filter(model.id.in_(ids[i:i + LOOKUP_BATCH_SIZE])):
+            rows[row.id] = {field: _serialize(getattr(row, field)) for field in fields}
+    return rows
+
+
+def _change_line(change, data):
+    line = {'cursor': change['cursor'], 'type': change['table'], 'id': change['id']}
+    if data is None:
+        line['op'] = 'delete'
+        if change['op'] == 'delete':
+            line['deleted_at'] = _serialize(change['changed_at'])
+    else:
+        line['op'] = 'insert' if change['created'] else 'update'
+        line['data'] = data
+    return json.dumps(line, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+@bp.route('/changes')
+@api_teacher_required
+@read_replica
+def list_changes():
+    since = _changes_since(request.args.get('since'))
+    limit = _limit(CHANGES_DEFAULT_LIMIT, CHANGES_MAX_LIMIT)
+    tables = _change_tables()
+    try:
+        entries, next_cursor, has_more = changes.read_changes(since, limit, tables)
+    except changes.CursorExpired as e:
+        raise ApiError(str(e), 410)
+
+    current = {}
+    for table, name in CHANGE_RESOURCES.items():
+        ids = {e['id'] for e in entries if e['table'] == table and e['op'] != 'delete'}
+        current[table] = _current_rows(name, ids) if ids else {}
+    body = ''.join(_change_line(e, current[e['table']].get(e['id'])) for e in entries)
+
+    response = Response(body, mimetype='application/x-ndjson')
+    response.headers['X-Next-Cursor'] = str(next_cursor)
+    response.headers['X-Has-More'] = '1' if has_more else '0'
+    if has_more:
+        args = request.args.to_dict()
+        args['since'] = next_cursor
+        response.headers['Link'] = f'<{url_for(request.endpoint, **args)}>; rel="next"'
+    response.headers['Cache-Control'] = 'private, no-store'
+    return response
@@ -1,117 +1,77 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, session
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
-import pandas as pd
-import io
+from flask import Flask, Blueprint, abort, current_app, render_template, request, redirect, url_for, flash, jsonify, send_file, Response, stream_with_context
+from flask.cli import AppGroup
+from flask_login import LoginManager, login_user, login_required, logout_user, current_user
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager, joinedload
+import importlib
 import os
 from functools import wraps
-
-app = Flask(__name__)
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production')
-
-# Database configuration with better error handling
-database_url = os.environ.get('DATABASE_URL', 'sqlite:///students.db')
-
-# Fix postgres:// to postgresql:// for SQLAlchemy
-if database_url.startswith('postgres://'):
-    database_url = database_url.replace('postgres://', 'postgresql://', 1)
-
-# For Render internal URLs, use postgresql+psycopg2://
-if 'render.com' in database_url and not database_url.startswith('postgresql+psycopg2://'):
-    database_url = database_url.replace('postgresql://', 'postgresql+psycopg2://', 1)
-
-app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,
-    'pool_recycle': 300,
-    'connect_args': {
-        'connect_timeout': 10,
-        'options': '-c statement_timeout=30000'
-    }
-}
-
-db = SQLAlchemy(app)
-login_manager = LoginManager(app)
-login_manager.login_view = 'login'
-
-# Models
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password = db.Column(db.String(200), nullable=False)
-    role = db.Column(db.String(20), nullable=False)  # admin, teacher, student
-    full_name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120))
-    
-    def set_password(self, password):
-        self.password = generate_password_hash(password)
-    
-    def check_password(self, password):
-        return check_password_hash(self.password, password)
-
-class Student(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.String(20), unique=True, nullable=False)
-    full_name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120))
-    phone = db.Column(db.String(20))
-    birth_date = db.Column(db.Date)
-    class_name = db.Column(db.String(50))
-    major = db.Column(db.String(100))
-    status = db.Column(db.String(20), default='active')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    scores = db.relationship('Score', backref='student', lazy=True, cascade='all, delete-orphan')
-
-class Subject(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    subject_code = db.Column(db.String(20), unique=True, nullable=False)
-    subject_name = db.Column(db.String(100), nullable=False)
-    credits = db.Column(db.Integer, nullable=False)
-    semester = db.Column(db.String(20))
-    scores = db.relationship('Score', backref='subject', lazy=True, cascade='all, delete-orphan')
-
-class Score(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    student_id = db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
-    midterm_score = db.Column(db.Float)
-    final_score = db.Column(db.Float)
-    average_score = db.Column(db.Float)
-    letter_grade = db.Column(db.String(2))
-    semester = db.Column(db.String(20))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    def calculate_average(self):
-        if self.midterm_score is not None and self.final_score is not None:
-            self.average_score = round(self.midterm_score * 0.4 + self.final_score * 0.6, 2)
-            self.letter_grade = self.get_letter_grade(self.average_score)
-    
-    @staticmethod
-    def get_letter_grade(score):
-        if score >= 9.0: return 'A+'
-        elif score >= 8.5: return 'A'
-        elif score >= 8.0: return 'B+'
-        elif score >= 7.0: return 'B'
-        elif score >= 6.5: return 'C+'
-        elif score >= 5.5: return 'C'
-        elif score >= 5.0: return 'D+'
-        elif score >= 4.0: return 'D'
-        else: return 'F'
-
-@login_manager.user_loader
-def load_user(user_id):
-    return User.query.get(int(user_id))
-
-# Decorators
+import click
+from models import db, User, Student, Subject, Score, GradingPolicy, Job
+from config import load_config
+from database import read_replica
+from pagination import keyset_page
+import search
+import stats
+import gpa
+import importer
+import exporter
+import reports
+import gradebook
+import grading
+import migrations
+import counters
+import database
+import auth
+import api
+import datagen
+import profiling
+import jobs
+import cache
+import changes
+import compression
+import assets
+
+bp = Blueprint('main', __name__, cli_group=None)
+login_manager = LoginManager()
+login_manager.login_view = 'main.login'
+
+def create_app(config=None):
+    """
+    Tạo Flask app. Chỉ đọc cấu hình và đăng ký route, không kết nối database;
+    tạo bảng, migration và tài khoản mặc định do lệnh `flask bootstrap` đảm nhận.
+    Cấu hình lấy theo profile APP_PROFILE (xem config.py), `config` ghi đè thêm.
+    """
+    app = Flask(__name__)
+    app.config.update(load_config())
+    if config:
+        app.config.update(config)
+
+    db.init_app(app)
+    database.init_app(app, db)
+    profiling.init_app(app, db)
+    login_manager.init_app(app)
+    auth.init_app(app, login_manager)
+    cache.init_app(app)
+    compression.init_app(app)
+    assets.init_app(app)
+    app.register_blueprint(bp)
+    app.register_blueprint(api.bp)
+    app.cli.add_command(db_cli)
+    app.cli.add_command(grading_cli)
+    app.cli.add_command(jobs_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(analytics_cli)
+    app.cli.add_command(changes_cli)
+    return app
+
+# Decorators (current_user là ảnh chụp trong bộ nhớ của auth.py, không truy vấn DB)
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated or current_user.role != 'admin':
             flash('Bạn cần quyền admin để truy cập trang này', 'danger')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -120,106 +80,140 @@ def teacher_required(f):
     def decorated_function(*args, **kwargs):
         if not current_user.is_authenticated or current_user.role not in ['admin', 'teacher']:
             flash('Bạn cần quyền giáo viên để truy cập trang này', 'danger')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         return f(*args, **kwargs)
     return decorated_function
 
 # Routes
-@app.route('/')
+@bp.route('/')
 def index():
     if current_user.is_authenticated:
         if current_user.role == 'admin':
-            return redirect(url_for('admin_dashboard'))
+            return redirect(url_for('main.admin_dashboard'))
         elif current_user.role == 'teacher':
-            return redirect(url_for('teacher_dashboard'))
+            return redirect(url_for('main.teacher_dashboard'))
         else:
-            return redirect(url_for('student_dashboard'))
-    return redirect(url_for('login'))
+            return redirect(url_for('main.student_dashboard'))
+    return redirect(url_for('main.login'))
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if current_user.is_authenticated:
-        return redirect(url_for('index'))
+        return redirect(url_for('main.index'))
     
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
-        user = User.query.filter_by(username=username).first()
+        try:
+            user = auth.authenticate(username, password, request.remote_addr)
+        except auth.LoginRateLimited as e:
+            flash(f'Đăng nhập sai quá nhiều lần, vui lòng thử lại sau {e.retry_after} giây', 'danger')
+            return render_template('login.html'), 429, {'Retry-After': str(e.retry_after)}
+        except auth.AuthBusy:
+            flash('Hệ thống đang bận, vui lòng thử lại sau giây lát', 'warning')
+            return render_template('login.html'), 503, {'Retry-After': '1'}
         
-        if user and user.check_password(password):
+        if user:
             login_user(user)
             flash('Đăng nhập thành công!', 'success')
-            return redirect(url_for('index'))
+            return redirect(url_for('main.index'))
         else:
             flash('Tên đăng nhập hoặc mật khẩu không đúng', 'danger')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
     flash('Đã đăng xuất', 'info')
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
-@app.route('/admin/dashboard')
+@bp.route('/admin/dashboard')
 @admin_required
+@read_replica
 def admin_dashboard():
-    total_students = Student.query.count()
-    total_subjects = Subject.query.count()
-    total_scores = Score.query.count()
-    
-    # Statistics
-    active_students = Student.query.filter_by(status='active').count()
+    counts = counters.get_counts()
     
     # Recent students
-    recent_students = Student.query.order_by(Student.created_at.desc()).limit(5).all()
+    def render_recent_students():
+        recent = Student.query.order_by(Student.created_at.desc()).limit(5).all()
+        return render_template('_recent_students.html', recent_students=recent)
     
     return render_template('admin_dashboard.html', 
-                         total_students=total_students,
-                         total_subjects=total_subjects,
-                         total_scores=total_scores,
-                         active_students=active_students,
-                         recent_students=recent_students)
-
-@app.route('/teacher/dashboard')
+                         total_students=counts[counters.TOTAL_STUDENTS],
+                         total_subjects=counts[counters.TOTAL_SUBJECTS],
+                         total_scores=counts[counters.TOTAL_SCORES],
+                         active_students=counts[counters.ACTIVE_STUDENTS],
+                         recent_students=cache.fragment('recent_students', (Student,),
+                                                        render_recent_students))
+
+@bp.route('/teacher/dashboard')
 @teacher_required
+@read_replica
 def teacher_dashboard():
-    total_students = Student.query.count()
-    total_subjects = Subject.query.count()
-    recent_scores = Score.query.order_by(Score.created_at.desc()).limit(10).all()
+    counts = counters.get_counts()
+
+    def render_recent_scores():
+        recent = (Score.query
+                  .options(joinedload(Score.student), joinedload(Score.subject))
+                  .order_by(Score.created_at.desc())
+                  .limit(10)
+                  .all())
+        return render_template('_recent_scores.html', recent_scores=recent)
     
     return render_template('teacher_dashboard.html',
-                         total_students=total_students,
-                         total_subjects=total_subjects,
-                         recent_scores=recent_scores)
+                         total_students=counts[counters.TOTAL_STUDENTS],
+                         total_subjects=counts[counters.TOTAL_SUBJECTS],
+                         recent_scores=cache.fragment('recent_scores', (Score, Student, Subject),
+                                                      render_recent_scores))
 
-@app.route('/student/dashboard')
+@bp.route('/student/dashboard')
 @login_required
+@read_replica
 def student_dashboard():
     # In a real app, link User to Student
     student = Student.query.first()  # Simplified
     if student:
-        scores = Score.query.filter_by(student_id=student.id).all()
-        gpa = calculate_gpa(scores)
-        return render_template('student_dashboard.html', student=student, scores=scores, gpa=gpa)
-    return render_template('student_dashboard.html', student=None, scores=[], gpa=0)
+        scores = (Score.query
+                  .options(joinedload(Score.subject))
+                  .filter_by(student_id=student.id)
+                  .all())
+        student_gpa, total_credits = gpa.get_student_gpa(student.id)
+        return render_template('student_dashboard.html',
+                             student=student,
+                             scores=scores,
+                             gpa=student_gpa,
+                             total_credits=total_credits,
+                             semester_gpas=gpa.get_semester_gpas(student.id))
+    return render_template('student_dashboard.html', student=None, scores=[], gpa=0,
+                         total_credits=0, semester_gpas=[])
 
 # Student Management
-@app.route('/students')
+STUDENTS_PER_PAGE = 50
+
+@bp.route('/students')
 @teacher_required
+@read_replica
 def list_students():
-    search = request.args.get('search', '')
-    if search:
-        students = Student.query.filter(
-            (Student.student_id.contains(search)) | 
-            (Student.full_name.contains(search))
-        ).all()
-    else:
-        students = Student.query.all()
-    return render_template('students.html', students=students, search=search)
-
-@app.route('/students/add', methods=['GET', 'POST'])
+    search_term = request.args.get('search', '').strip()
+    cursor = request.args.get('cursor')
+
+    def render_table():
+        students, next_cursor = search.search_students(search_term, cursor=cursor,
+                                                       limit=STUDENTS_PER_PAGE)
+        return render_template('_students_table.html',
+                             students=students,
+                             search=search_term,
+                             cursor=cursor,
+                             next_cursor=next_cursor)
+
+    # Nút xóa chỉ hiện với admin nên fragment khác nhau theo vai trò
+    table = cache.fragment('students', (Student,), render_table,
+                           search_term, cursor, current_user.role)
+    return render_template('students.html', table=table, search=search_term)
+
+@bp.route('/students/add', methods=['GET', 'POST'])
 @teacher_required
 def add_student():
     if request.method == 'POST':
@@ -235,10 +229,10 @@ def add_student():
         db.session.add(student)
         db.session.commit()
         flash('Thêm sinh viên thành công!', 'success')
-        return redirect(url_for('list_students'))
+        return redirect(url_for('main.list_students'))
     return render_template('add_student.html')
 
-@app.route('/students/edit/<int:id>', methods=['GET', 'POST'])
+@bp.route('/students/edit/<int:id>', methods=['GET', 'POST'])
 @teacher_required
 def edit_student(id):
     student = Student.query.get_or_404(id)
@@ -251,26 +245,29 @@ def edit_student(id):
         student.status = request.form.get('status')
         db.session.commit()
         flash('Cập nhật thông tin thành công!', 'success')
-        return redirect(url_for('list_students'))
+        return redirect(url_for('main.list_students'))
     return render_template('edit_student.html', student=student)
 
-@app.route('/students/delete/<int:id>')
+@bp.route('/students/delete/<int:id>')
 @admin_required
 def delete_student(id):
     student = Student.query.get_or_404(id)
     db.session.delete(student)
     db.session.commit()
     flash('Đã xóa sinh viên', 'success')
-    return redirect(url_for('list_students'))
+    return redirect(url_for('main.list_students'))
 
 # Subject Management
-@app.route('/subjects')
+@bp.route('/subjects')
 @teacher_required
+@read_replica
 def list_subjects():
-    subjects = Subject.query.all()
-    return render_template('subjects.html', subjects=subjects)
+    def render_table():
+        return render_template('_subjects_table.html', subjects=Subject.query.all())
+
+    return render_template('subjects.html', table=cache.fragment('subjects', (Subject,), render_table))
 
-@app.route('/subjects/add', methods=['GET', 'POST'])
+@bp.route('/subjects/add', methods=['GET', 'POST'])
 @teacher_required
 def add_subject():
     if request.method == 'POST':
@@ -283,17 +280,59 @@ def add_subject():
         db.session.add(subject)
         db.session.commit()
         flash('Thêm môn học thành công!', 'success')
-        return redirect(url_for('list_subjects'))
+        return redirect(url_for('main.list_subjects'))
     return render_template('add_subject.html')
 
 # Score Management
-@app.route('/scores')
+SCORES_PER_PAGE = 50
+
+@bp.route('/scores')
 @teacher_required
+@read_replica
 def list_scores():
-    scores = Score.query.all()
-    return render_template('scores.html', scores=scores)
-
-@app.route('/scores/add', methods=['GET', 'POST'])
+    semester = request.args.get('semester', '').strip()
+    subject_id = request.args.get('subject_id', type=int)
+    class_name = request.args.get('class_name', '').strip()
+    cursor = request.args.get('cursor')
+
+    def render_table():
+        # Join student/subject trong cùng một truy vấn thay vì lazy load từng dòng
+        query = (Score.query
+                 .join(Score.student)
+                 .join(Score.subject)
+                 .options(contains_eager(Score.student), contains_eager(Score.subject)))
+        if semester:
+            query = query.filter(Score.semester == semester)
+        if subject_id:
+            query = query.filter(Score.subject_id == subject_id)
+        if class_name:
+            query = query.filter(Student.class_name == class_name)
+
+        scores, next_cursor = keyset_page(query, [Score.created_at, Score.id],
+                                          cursor=cursor, limit=SCORES_PER_PAGE)
+        return render_template('_scores_table.html',
+                             scores=scores,
+                             semester=semester,
+                             subject_id=subject_id,
+                             class_name=class_name,
+                             cursor=cursor,
+                             next_cursor=next_cursor)
+
+    table = cache.fragment('scores', (Score, Student, Subject), render_table,
+                           semester, subject_id, class_name, cursor)
+    subjects = cache.memoize('subject_options', (Subject,), _subject_options)
+    return render_template('scores.html',
+                         table=table,
+                         subjects=subjects,
+                         semester=semester,
+                         subject_id=subject_id,
+                         class_name=class_name)
+
+def _subject_options():
+    return [{'id': s.id, 'subject_code': s.subject_code, 'subject_name': s.subject_name}
+            for s in Subject.query.order_by(Subject.subject_code)]
+
+@bp.route('/scores/add', methods=['GET', 'POST'])
 @teacher_required
 def add_score():
     if request.method == 'POST':
@@ -306,198 +345,575 @@ def add_score():
         )
         score.calculate_average()
         db.session.add(score)
-        db.session.commit()
-        flash('Thêm điểm thành công!', 'success')
-        return redirect(url_for('list_scores'))
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # uq_score_student_subject_semester: mỗi sinh viên một bản ghi điểm/môn/học kỳ
+            db.session.rollback()
+            flash('Sinh viên đã có điểm môn này trong học kỳ này, hãy nhập lại bảng điểm để cập nhật', 'danger')
+        else:
+            flash('Thêm điểm thành công!', 'success')
+            return redirect(url_for('main.list_scores'))
     
     students = Student.query.all()
     subjects = Subject.query.all()
     return render_template('add_score.html', students=students, subjects=subjects)
 
+def _resolve_gradebook_subject(subject_id=None, subject_code=None):
+    if subject_id:
+        return db.session.get(Subject, subject_id)
+    if subject_code:
+        return Subject.query.filter_by(subject_code=subject_code).first()
+    return None
+
+@bp.route('/scores/import', methods=['GET', 'POST'])
+@teacher_required
+def import_scores():
+    subjects = Subject.query.order_by(Subject.subject_code).all()
+    if request.method == 'POST':
+        subject = _resolve_gradebook_subject(subject_id=request.form.get('subject_id', type=int))
+        file = request.files.get('file')
+        if not subject:
+            flash('Vui lòng chọn môn học', 'danger')
+        elif not (file and file.filename.lower().endswith(importer.SUPPORTED_EXTENSIONS)):
+            flash('Vui lòng chọn file Excel (.xlsx) hoặc CSV (.csv)', 'danger')
+        else:
+            semester = request.form.get('semester', '').strip() or subject.semester
+            try:
+                entries = gradebook.entries_from_file(file.stream, file.filename)
+                inserted, updated = gradebook.import_gradebook(subject, semester, entries)
+            except gradebook.GradebookError as e:
+                flash(f'{e}. Chưa có điểm nào được lưu.', 'danger')
+                return render_template('import_scores.html', subjects=subjects, errors=e.errors,
+                                     error_count=e.error_count)
+            except importer.InvalidImportFile as e:
+                flash(str(e), 'danger')
+            else:
+                flash(f'Đã lưu bảng điểm {subject.subject_code}: thêm {inserted}, cập nhật {updated} bản ghi', 'success')
+                return redirect(url_for('main.list_scores', subject_id=subject.id, semester=semester))
+    return render_template('import_scores.html', subjects=subjects)
+
+@bp.route('/api/scores/bulk', methods=['POST'])
+@teacher_required
+def api_bulk_scores():
+    payload = request.get_json(silent=True) or {}
+    subject = _resolve_gradebook_subject(subject_id=payload.get('subject_id'),
+                                         subject_code=payload.get('subject_code'))
+    if not subject:
+        return jsonify({'error': 'Không tìm thấy môn học (subject_id hoặc subject_code)'}), 400
+    semester = payload.get('semester') or subject.semester
+    try:
+        entries = gradebook.entries_from_json(payload.get('scores'))
+        inserted, updated = gradebook.import_gradebook(subject, semester, entries)
+    except gradebook.GradebookError as e:
+        return jsonify({
+            'error': str(e),
+            'error_count': e.error_count,
+            'errors': [{'row': row, 'message': message} for row, message in e.errors],
+        }), 422
+    return jsonify({'subject_id': subject.id, 'semester': semester,
+                    'inserted': inserted, 'updated': updated})
+
 # Import/Export
-@app.route('/import/students', methods=['GET', 'POST'])
+@bp.route('/import/students', methods=['GET', 'POST'])
 @admin_required
 def import_students():
     if request.method == 'POST':
         file = request.files.get('file')
-        if file and file.filename.endswith(('.xlsx', '.xls')):
-            try:
-                df = pd.read_excel(file)
-                required_columns = ['student_id', 'full_name']
-                
-                if not all(col in df.columns for col in required_columns):
-                    flash('File Excel thiếu cột bắt buộc: student_id, full_name', 'danger')
-                    return redirect(url_for('import_students'))
-                
-                count = 0
-                for _, row in df.iterrows():
-                    existing = Student.query.filter_by(student_id=str(row['student_id'])).first()
-                    if not existing:
-                        student = Student(
-                            student_id=str(row['student_id']),
-                            full_name=str(row['full_name']),
-                            email=str(row.get('email', '')),
-                            phone=str(row.get('phone', '')),
-                            class_name=str(row.get('class_name', '')),
-                            major=str(row.get('major', '')),
-                            status='active'
-                        )
-                        db.session.add(student)
-                        count += 1
-                
-                db.session.commit()
-                flash(f'Import thành công {count} sinh viên!', 'success')
-                return redirect(url_for('list_students'))
-            except Exception as e:
-                flash(f'Lỗi import: {str(e)}', 'danger')
+        if file and file.filename.lower().endswith(importer.SUPPORTED_EXTENSIONS):
+            job = jobs.submit('import_students', user_id=current_user.id, upload=file)
+            flash(f'Đã đưa file {file.filename} vào hàng đợi import (tác vụ #{job.id})', 'info')
+            return redirect(url_for('main.job_detail', id=job.id))
         else:
-            flash('Vui lòng chọn file Excel (.xlsx hoặc .xls)', 'danger')
+            flash('Vui lòng chọn file Excel (.xlsx) hoặc CSV (.csv)', 'danger')
     
     return render_template('import_students.html')
 
-@app.route('/export/students')
+@bp.route('/export/students')
 @teacher_required
 def export_students():
-    students = Student.query.all()
-    data = [{
-        'Mã SV': s.student_id,
-        'Họ tên': s.full_name,
-        'Email': s.email,
-        'Điện thoại': s.phone,
-        'Lớp': s.class_name,
-        'Chuyên ngành': s.major,
-        'Trạng thái': s.status
-    } for s in students]
-    
-    df = pd.DataFrame(data)
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Sinh viên')
-    output.seek(0)
-    
-    return send_file(output, 
-                     download_name='danh_sach_sinh_vien.xlsx',
+    # CSV được ghi dạng luồng ngay trong request (bộ nhớ không đổi); Excel phải
+    # dựng cả file nên chạy thành tác vụ nền
+    if request.args.get('format') == 'csv':
+        return Response(stream_with_context(exporter.generate_csv()),
+                        content_type='text/csv; charset=utf-8',
+                        headers={'Content-Disposition': 'attachment; filename=danh_sach_sinh_vien.csv'})
+
+    job = jobs.submit('export_students', {'format': 'xlsx'}, user_id=current_user.id)
+    return redirect(url_for('main.job_detail', id=job.id))
+
+# Background jobs
+JOBS_PER_PAGE = 50
+
+def _get_job(id):
+    """Job của người dùng hiện tại (admin xem được mọi job)"""
+    job = Job.query.get_or_404(id)
+    if current_user.role != 'admin' and job.created_by != current_user.id:
+        abort(404)
+    return job
+
+def _job_status(job):
+    result = job.result or {}
+    data = {
+        'id': job.id,
+        'kind': job.kind,
+        'title': jobs.KINDS[job.kind]['title'],
+        'status': job.status,
+        'progress': jobs.progress(job),
+        'chunks_done': job.chunks_done,
+        'chunks_total': job.chunks_total,
+        'message': result.get('message'),
+        'error': job.error,
+        'created_at': job.created_at.isoformat() if job.created_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == jobs.DONE and result.get('file'):
+        data['download_url'] = url_for('main.job_download', id=job.id)
+    return data
+
+@bp.route('/jobs')
+@teacher_required
+def list_jobs():
+    query = Job.query
+    if current_user.role != 'admin':
+        query = query.filter_by(created_by=current_user.id)
+    recent = query.order_by(Job.id.desc()).limit(JOBS_PER_PAGE).all()
+    return render_template('jobs.html', jobs=[_job_status(job) for job in recent],
+                         workers_alive=jobs.workers_alive(),
+                         subjects=Subject.query.order_by(Subject.subject_code).all()
+                         if current_user.role == 'admin' else [])
+
+@bp.route('/jobs/<int:id>')
+@teacher_required
+def job_detail(id):
+    job = _get_job(id)
+    report = None
+    if job.kind == 'import_students' and job.result and 'report' in job.result:
+        report = importer.ImportReport.from_dict(job.result['report'])
+    return render_template('job_detail.html', job=_job_status(job), report=report,
+                         workers_alive=jobs.workers_alive())
+
+@bp.route('/jobs/<int:id>/status')
+@teacher_required
+def job_status(id):
+    return jsonify(dict(_job_status(_get_job(id)), workers_alive=jobs.workers_alive()))
+
+@bp.route('/jobs/<int:id>/download')
+@teacher_required
+def job_download(id):
+    job = _get_job(id)
+    result = job.result or {}
+    if job.status != jobs.DONE or not result.get('file'):
+        abort(404)
+    return send_file(os.path.join(jobs.job_dir(job.id), result['file']),
+                     download_name=result['filename'],
                      as_attachment=True,
-                     mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+                     mimetype=result['mimetype'])
+
+@bp.route('/jobs/regrade', methods=['POST'])
+@admin_required
+def submit_regrade():
+    params = {'semester': request.form.get('semester') or None, 'subject_id': None}
+    subject_code = request.form.get('subject_code')
+    if subject_code:
+        subject = Subject.query.filter_by(subject_code=subject_code).first()
+        if not subject:
+            flash(f'Không tìm thấy môn học {subject_code}', 'danger')
+            return redirect(url_for('main.list_jobs'))
+        params['subject_id'] = subject.id
+    job = jobs.submit('regrade', params, user_id=current_user.id)
+    return redirect(url_for('main.job_detail', id=job.id))
+
+@bp.route('/jobs/snapshot', methods=['POST'])
+@admin_required
+def submit_snapshot():
+    job = jobs.submit('snapshot', {'full': bool(request.form.get('full'))}, user_id=current_user.id)
+    return redirect(url_for('main.job_detail', id=job.id))
+
+def _report_filters():
+    return {name: request.args.get(name, '').strip() for name in reports.FILTER_NAMES}
+
+@bp.route('/reports')
+@teacher_required
+@read_replica
+def list_reports():
+    name = request.args.get('report', 'rankings')
+    if name not in reports.REPORTS:
+        name = 'rankings'
+    filters = _report_filters()
+    rows = reports.preview(name, filters)
+    return render_template('reports.html',
+                         reports=reports.REPORTS,
+                         report_name=name,
+                         report=reports.REPORTS[name],
+                         filters=filters,
+                         rows=rows,
+                         preview_limit=reports.PREVIEW_ROWS)
+
+@bp.route('/reports/<name>/download')
+@teacher_required
+@read_replica
+def download_report(name):
+    if name not in reports.REPORTS:
+        flash('Báo cáo không tồn tại', 'danger')
+        return redirect(url_for('main.list_reports'))
+    filters = _report_filters()
+    if request.args.get('format') == 'xlsx':
+        output = reports.report_xlsx(name, filters)
+        return send_file(output,
+                         download_name=f'bao_cao_{name}.xlsx',
+                         as_attachment=True,
+                         mimetype=exporter.XLSX_MIMETYPE)
+    return Response(stream_with_context(reports.report_csv(name, filters)),
+                    content_type='text/csv; charset=utf-8',
+                    headers={'Content-Disposition': f'attachment; filename=bao_cao_{name}.csv'})
 
 # API for charts
-@app.route('/api/statistics')
-@login_required
-def api_statistics():
-    # Grade distribution
-    scores = Score.query.all()
-    grade_counts = {}
-    for score in scores:
-        grade = score.letter_grade or 'N/A'
-        grade_counts[grade] = grade_counts.get(grade, 0) + 1
-    
+@bp.route('/admin/pool-stats')
+@admin_required
+def pool_stats():
+    """Trạng thái pool kết nối của worker này, dùng để chọn pool_size theo số worker gunicorn"""
+    engines = database.pool_stats(db)
+    workers = int(os.environ.get('WEB_CONCURRENCY', 1))
+    for stats in engines.values():
+        if 'pool_size' in stats:
+            stats['max_connections_all_workers'] = workers * (stats['pool_size'] + max(stats['max_overflow'], 0))
     return jsonify({
-        'grade_distribution': grade_counts,
-        'total_students': Student.query.count(),
-        'total_subjects': Subject.query.count(),
-        'total_scores': len(scores)
+        'profile': current_app.config['APP_PROFILE'],
+        'workers': workers,
+        'pid': os.getpid(),
+        'engines': engines,
     })
 
-def calculate_gpa(scores):
-    if not scores:
-        return 0.0
-    
-    grade_points = {
-        'A+': 4.0, 'A': 3.7, 'B+': 3.5, 'B': 3.0,
-        'C+': 2.5, 'C': 2.0, 'D+': 1.5, 'D': 1.0, 'F': 0.0
+@bp.route('/metrics')
+def metrics():
+    """Số liệu Prometheus của worker này (xem profiling.py)"""
+    if not profiling.metrics_authorized():
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(profiling.metrics.render(database.pool_stats(db), cache.store.stats()),
+                    content_type=profiling.CONTENT_TYPE)
+
+@bp.route('/api/statistics')
+@login_required
+@read_replica
+def api_statistics():
+    group_by = request.args.get('group_by') or None
+    if group_by and group_by not in stats.GROUP_COLUMNS:
+        return jsonify({'error': f'group_by phải là một trong: {", ".join(stats.GROUP_COLUMNS)}'}), 400
+
+    filters = {
+        'semester': request.args.get('semester'),
+        'subject_id': request.args.get('subject_id', type=int),
+        'class_name': request.args.get('class_name'),
+        'major': request.args.get('major'),
     }
-    
-    total_points = 0
-    total_credits = 0
-    
-    for score in scores:
-        if score.letter_grade and score.subject:
-            points = grade_points.get(score.letter_grade, 0)
-            credits = score.subject.credits
-            total_points += points * credits
-            total_credits += credits
-    
-    return round(total_points / total_credits, 2) if total_credits > 0 else 0.0
+    result = dict(cache.memoize('statistics', (Score, Student, Subject),
+                                lambda: stats.get_statistics(filters, group_by),
+                                group_by, *filters.values()))
+    counts = counters.get_counts()
+    result['total_students'] = counts[counters.TOTAL_STUDENTS]
+    result['total_subjects'] = counts[counters.TOTAL_SUBJECTS]
+    return jsonify(result)
+
+@bp.route('/api/analytics/<query>')
+@login_required
+def api_analytics(query):
+    """Thống kê tính trên snapshot Parquet (analytics.py), không truy vấn database"""
+    import analytics
+    if query not in analytics.QUERIES:
+        return jsonify({'error': f'query phải là một trong: {", ".join(analytics.QUERIES)}'}), 404
+    group_by = request.args.get('group_by') or None
+    if group_by and group_by not in analytics.GROUP_COLUMNS:
+        return jsonify({'error': f'group_by phải là một trong: {", ".join(analytics.GROUP_COLUMNS)}'}), 400
+
+    filters = {
+        'semester': request.args.get('semester'),
+        'subject_id': request.args.get('subject_id', type=int),
+        'class_name': request.args.get('class_name'),
+        'major': request.args.get('major'),
+    }
+    try:
+        _, state = analytics.open_dataset()
+        result = analytics.QUERIES[query](filters, group_by)
+    except analytics.SnapshotMissing as e:
+        return jsonify({'error': str(e)}), 503
+    result['snapshot'] = analytics.snapshot_info(state)
+    return jsonify(result)
+
+@bp.cli.command('rebuild-gpa')
+def rebuild_gpa_command():
+    """Tính lại toàn bộ bảng tổng hợp GPA từ bảng điểm"""
+    gpa.rebuild_all()
+    print("✓ Đã tính lại bảng tổng hợp GPA")
+
+@bp.cli.command('rebuild-counters')
+def rebuild_counters_command():
+    """Đếm lại chính xác các bộ đếm dashboard"""
+    values = counters.rebuild()
+    db.session.commit()
+    print("✓ Đã đếm lại: " + ", ".join(f"{k}={v}" for k, v in values.items()))
+
+@bp.cli.command('seed')
+@click.option('--students', type=int, default=1000, show_default=True)
+@click.option('--subjects', type=int, default=60, show_default=True)
+@click.option('--scores', type=int, default=20000, show_default=True)
+@click.option('--years', type=int, default=4, show_default=True, help='Số năm học (3 học kỳ mỗi năm)')
+@click.option('--start-year', type=int, default=2020, show_default=True)
+@click.option('--seed', 'random_seed', type=int, default=42, show_default=True)
+def seed_command(students, subjects, scores, years, start_year, random_seed):
+    """Sinh dữ liệu tổng hợp quy mô lớn (sinh viên, môn học, điểm) để phát triển và đo hiệu năng"""
+    def report(kind, count):
+        print(f"  ... {count} {'sinh viên' if kind == 'students' else 'bản ghi điểm'}")
 
-# Initialize database and create admin user
-def init_db():
-    with app.app_context():
-        db.create_all()
-        
-        # Create admin user if not exists
-        admin = User.query.filter_by(username='admin').first()
-        if not admin:
-            admin = User(
-                username='admin',
-                role='admin',
-                full_name='Administrator',
-                email='admin@example.com'
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-            db.session.commit()
-            print("Admin user created: username='admin', password='admin123'")
+    try:
+        result = datagen.generate(students, subjects, scores, years=years, start_year=start_year,
+                                  seed=random_seed, progress=report)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"✓ Đã tạo {result['students']} sinh viên, {result['subjects']} môn học, "
+          f"{result['scores']} bản ghi điểm trong {result['seconds']}s")
+
+db_cli = AppGroup('db', help='Quản lý schema database')
+
+@db_cli.command('upgrade')
+def db_upgrade_command():
+    """Tạo bảng còn thiếu và chạy các migration chưa áp dụng"""
+    try:
+        applied = migrations.upgrade()
+    except migrations.MigrationError as e:
+        raise click.ClickException(str(e))
+    print(f"✓ Schema đã cập nhật ({len(applied)} migration mới)")
+
+@db_cli.command('status')
+def db_status_command():
+    """Liệt kê migration và trạng thái áp dụng"""
+    for migration_id, applied in migrations.status():
+        print(f"[{'x' if applied else ' '}] {migration_id}")
+
+@db_cli.command('check-plans')
+def db_check_plans_command():
+    """Kiểm tra các truy vấn nóng không bị quét toàn bảng (exit code 1 nếu có)"""
+    failed = False
+    for name, (plan, seq_scans) in migrations.check_query_plans().items():
+        if seq_scans:
+            failed = True
+            print(f"✗ {name}: {'; '.join(seq_scans)}")
+        else:
+            print(f"✓ {name}")
+    if failed:
+        raise SystemExit(1)
+
+grading_cli = AppGroup('grading', help='Quản lý chính sách tính điểm và tính lại điểm')
+
+def _parse_grade_scale(value):
+    scale = []
+    for item in value.split(','):
+        grade, _, threshold = item.partition(':')
+        scale.append((float(threshold), grade.strip()))
+    return scale
+
+@grading_cli.command('list')
+def grading_list_command():
+    """Liệt kê các chính sách tính điểm"""
+    for policy in GradingPolicy.query.order_by(GradingPolicy.id).all():
+        scale = ', '.join(f'{g}>={t}' for t, g in policy.grade_scale)
+        print(f"#{policy.id} {policy.name} v{policy.version} "
+              f"[học kỳ={policy.semester or '*'}, môn={policy.subject_id or '*'}] "
+              f"GK={policy.midterm_weight} CK={policy.final_weight} "
+              f"làm tròn={policy.rounding}/{policy.decimals}: {scale}")
+
+@grading_cli.command('add')
+@click.option('--name', required=True)
+@click.option('--semester', default=None, help='Học kỳ áp dụng (bỏ trống = mọi học kỳ)')
+@click.option('--subject', 'subject_code', default=None, help='Mã môn áp dụng (bỏ trống = mọi môn)')
+@click.option('--midterm-weight', type=float, required=True)
+@click.option('--final-weight', type=float, required=True)
+@click.option('--scale', required=True, help='VD: "A+:9,A:8.5,B+:8,B:7,C+:6.5,C:5.5,D+:5,D:4"')
+@click.option('--fail-grade', default='F')
+@click.option('--decimals', type=int, default=2)
+@click.option('--rounding', type=click.Choice(grading.ROUNDING_MODES), default='half_even')
+def grading_add_command(name, semester, subject_code, midterm_weight, final_weight, scale,
+                        fail_grade, decimals, rounding):
+    """Thêm version mới của chính sách tính điểm"""
+    subject_id = None
+    if subject_code:
+        subject = Subject.query.filter_by(subject_code=subject_code).first()
+        if not subject:
+            raise click.ClickException(f'Không tìm thấy môn học {subject_code}')
+        subject_id = subject.id
+    try:
+        policy = grading.add_policy(name, midterm_weight, final_weight, _parse_grade_scale(scale),
+                                    semester=semester, subject_id=subject_id,
+                                    fail_grade=fail_grade, decimals=decimals, rounding=rounding)
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    print(f"✓ Đã lưu chính sách #{policy.id} (version {policy.version}). "
+          f"Chạy 'flask grading regrade' để áp dụng cho điểm đã có.")
+
+@grading_cli.command('regrade')
+@click.option('--semester', default=None)
+@click.option('--subject', 'subject_code', default=None)
+@click.option('--chunk-size', type=int, default=grading.REGRADE_CHUNK_SIZE)
+@click.option('--background', is_flag=True, help='Đưa vào hàng đợi tác vụ nền thay vì chạy ngay')
+def grading_regrade_command(semester, subject_code, chunk_size, background):
+    """Tính lại điểm TB/điểm chữ đã lưu theo chính sách hiện hành"""
+    subject_id = None
+    if subject_code:
+        subject = Subject.query.filter_by(subject_code=subject_code).first()
+        if not subject:
+            raise click.ClickException(f'Không tìm thấy môn học {subject_code}')
+        subject_id = subject.id
+
+    if background:
+        job = jobs.submit('regrade', {'semester': semester, 'subject_id': subject_id})
+        print(f"✓ Đã đưa vào hàng đợi tác vụ #{job.id} ({job.status})")
+        return
+
+    def report(processed, changed):
+        print(f"  ... {processed} bản ghi, {changed} thay đổi")
+
+    processed, changed = grading.regrade(semester=semester, subject_id=subject_id,
+                                         chunk_size=chunk_size, progress=report)
+    print(f"✓ Đã tính lại {processed} bản ghi điểm, {changed} bản ghi thay đổi")
+
+jobs_cli = AppGroup('jobs', help='Hàng đợi tác vụ nền (import, export, tính lại điểm, snapshot)')
+
+@jobs_cli.command('worker')
+@click.option('--processes', type=int, default=None, help='Số tiến trình worker (mặc định JOB_WORKERS)')
+def jobs_worker_command(processes):
+    """Chạy pool tiến trình worker xử lý hàng đợi (dừng bằng Ctrl+C/SIGTERM)"""
+    config = current_app.config
+    jobs.run_pool(processes or config['JOB_WORKERS'], config['JOB_POLL_INTERVAL'],
+                  config['JOB_STALE_SECONDS'])
+
+@jobs_cli.command('requeue')
+@click.option('--max-age', type=int, default=None, help='Số giây (mặc định JOB_STALE_SECONDS)')
+def jobs_requeue_command(max_age):
+    """Đưa lại hàng đợi các việc đang chạy quá lâu (worker đã chết)"""
+    if max_age is None:
+        max_age = current_app.config['JOB_STALE_SECONDS']
+    print(f"✓ Đã đưa lại hàng đợi {jobs.requeue_stale(max_age)} việc")
+
+@jobs_cli.command('purge')
+@click.option('--days', type=int, default=7)
+def jobs_purge_command(days):
+    """Xóa job đã xong/thất bại cũ hơn --days ngày cùng file kết quả"""
+    print(f"✓ Đã xóa {jobs.purge(days)} tác vụ")
+
+assets_cli = AppGroup('assets', help='Asset tĩnh: tải thư viện front-end, build bản có hash và nén sẵn')
+
+@assets_cli.command('vendor')
+@click.option('--force', is_flag=True, help='Tải lại cả các file đã có')
+def assets_vendor_command(force):
+    """Tải CSS/JS/font front-end (phiên bản cố định trong assets.VENDOR) vào static/vendor"""
+    fetched = assets.vendor(force)
+    print(f"✓ Đã tải {len(fetched)} file" + (': ' + ', '.join(fetched) if fetched else ''))
+
+@assets_cli.command('build')
+def assets_build_command():
+    """Ghi static/dist: tên file có hash nội dung, bản .br/.gz nén sẵn và manifest.json"""
+    built = assets.build()
+    for logical, name, size, compressed in built:
+        sizes = ', '.join(f'{encoding} {value / 1024:.1f}KB' for encoding, value in compressed.items())
+        print(f"  {logical} -> {name} ({size / 1024:.1f}KB{', ' + sizes if sizes else ''})")
+    print(f"✓ Đã build {len(built)} asset vào static/dist")
+
+analytics_cli = AppGroup('analytics', help='Snapshot Parquet của bảng điểm cho truy vấn phân tích')
+
+@analytics_cli.command('snapshot')
+@click.option('--full', is_flag=True, help='Ghi lại mọi học kỳ thay vì chỉ học kỳ có thay đổi')
+@click.option('--background', is_flag=True, help='Đưa vào hàng đợi tác vụ nền thay vì chạy ngay')
+def analytics_snapshot_command(full, background):
+    """Refresh snapshot Parquet (theo học kỳ) của điểm + sinh viên + môn học"""
+    if background:
+        job = jobs.submit('snapshot', {'full': full})
+        print(f"✓ Đã đưa vào hàng đợi tác vụ #{job.id} ({job.status})")
+        return
+
+    import analytics
+
+    def report(semester, result):
+        print(f"  ... {semester or '(không có học kỳ)'}: {result['rows']} bản ghi, "
+              f"{result['bytes'] / 1024:.1f}KB")
+
+    state, results = analytics.refresh(full, progress=report)
+    print(f"✓ Đã ghi lại {len(results)} học kỳ; snapshot có {state['rows']} bản ghi điểm "
+          f"({len(state['partitions'])} học kỳ) tại {analytics.root_dir()}")
+
+changes_cli = AppGroup('changes', help='Nhật ký thay đổi cho feed đồng bộ /api/v1/changes')
+
+@changes_cli.command('purge')
+@click.option('--days', type=int, default=30, show_default=True)
+def changes_purge_command(days):
+    """Xóa nhật ký thay đổi cũ hơn --days ngày (client có cursor cũ hơn phải đồng bộ lại toàn bộ)"""
+    print(f"✓ Đã xóa {changes.purge(days)} dòng nhật ký thay đổi")
+
+DEFAULT_USERS = [
+    {'username': 'admin', 'password': 'admin123', 'role': 'admin',
+     'full_name': 'Quản trị viên', 'email': 'admin@example.com'},
+    {'username': 'teacher', 'password': 'teacher123', 'role': 'teacher',
+     'full_name': 'Nguyễn Văn Giáo', 'email': 'teacher@example.com'},
+    {'username': 'student', 'password': 'student123', 'role': 'student',
+     'full_name': 'Trần Thị Sinh Viên', 'email': 'student@example.com'},
+]
+
+def bootstrap_db():
+    """Tạo bảng, chạy migration và tạo các tài khoản mặc định còn thiếu (cần app context)"""
+    migrations.upgrade()
+
+    existing = {username for (username,) in
+                db.session.query(User.username)
+                .filter(User.username.in_([u['username'] for u in DEFAULT_USERS]))}
+    for data in DEFAULT_USERS:
+        if data['username'] in existing:
+            continue
+        user = User(username=data['username'], role=data['role'],
+                    full_name=data['full_name'], email=data['email'])
+        user.set_password(data['password'])
+        db.session.add(user)
+        print(f"✓ {data['role'].capitalize()} user created: username='{data['username']}', "
+              f"password='{data['password']}'")
 
-# Tự động khởi tạo DB khi app khởi động (cho Render)
-# Tự động khởi tạo DB khi app khởi động (cho Render)
-def ensure_db_initialized():
-    """Đảm bảo database đã được khởi tạo"""
+    db.session.commit()
+    gpa.ensure_gpa_summary()
+
+# Chạy một lần khi deploy (trước khi khởi động gunicorn), không chạy ở mỗi worker
+@bp.cli.command('bootstrap')
+def bootstrap_command():
+    """Khởi tạo database: migration + tài khoản mặc định"""
     try:
-        with app.app_context():
-            # Tạo tất cả các bảng nếu chưa có
-            db.create_all()
-            
-            # Tạo admin user
-            admin = User.query.filter_by(username='admin').first()
-            if not admin:
-                admin = User(
-                    username='admin',
-                    role='admin',
-                    full_name='Quản trị viên',
-                    email='admin@example.com'
-                )
-                admin.set_password('admin123')
-                db.session.add(admin)
-                print("✓ Admin user created: username='admin', password='admin123'")
-            
-            # Tạo teacher user
-            teacher = User.query.filter_by(username='teacher').first()
-            if not teacher:
-                teacher = User(
-                    username='teacher',
-                    role='teacher',
-                    full_name='Nguyễn Văn Giáo',
-                    email='teacher@example.com'
-                )
-                teacher.set_password('teacher123')
-                db.session.add(teacher)
-                print("✓ Teacher user created: username='teacher', password='teacher123'")
-            
-            # Tạo student user
-            student = User.query.filter_by(username='student').first()
-            if not student:
-                student = User(
-                    username='student',
-                    role='student',
-                    full_name='Trần Thị Sinh Viên',
-                    email='student@example.com'
-                )
-                student.set_password('student123')
-                db.session.add(student)
-                print("✓ Student user created: username='student', password='student123'")
-            
-            # Commit tất cả thay đổi
-            db.session.commit()
-            print("✓ Database initialization completed!")
-                
-    except Exception as e:
-        # Log lỗi nhưng không crash app
-        print(f"⚠️ DB initialization error: {e}")
-        db.session.rollback()
+        bootstrap_db()
+    except migrations.MigrationError as e:
+        raise click.ClickException(str(e))
+    print("✓ Database initialization completed!")
+
+# Module nặng được import lười (grading.py, gradebook.py, importer.py, exporter.py)
+PRELOAD_MODULES = ('numpy', 'openpyxl', 'analytics')
+
+def preload(app):
+    """
+    Chạy trong tiến trình master của gunicorn ở chế độ preload_app (xem
+    gunicorn.conf.py): import trước các module nặng và biên dịch mọi template để
+    các worker fork ra dùng chung các trang bộ nhớ này (copy-on-write) thay vì
+    mỗi worker tự nạp một bản. Không mở kết nối database.
+    """
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def after_fork(app):
+    """Trong worker vừa fork: bỏ pool kết nối kế thừa từ master mà không đóng kết nối của master"""
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
 
-# Gọi hàm khởi tạo DB
-ensure_db_initialized()
+app = create_app()
 
 if __name__ == '__main__':
+    with app.app_context():
+        bootstrap_db()
+    if app.config['JOB_EXECUTOR'] == 'queue':
+        jobs.start_workers(app.config['JOB_WORKERS'], app.config['JOB_POLL_INTERVAL'])
     port = int(os.environ.get('PORT', 5000))
-    app.run(host='0.0.0.0', port=port, debug=False)
\ No newline at end of file
+    app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,244 @@
+"""
+Chế độ chạy ASGI (bất đồng bộ) cho các view chỉ đọc
+
+Chạy: uvicorn asgi:app --workers 2 (Docker: SERVER_MODE=asgi).
+
+- View trong ASYNC_ENDPOINTS (danh sách, dashboard, /api/statistics, API v1)
+  chạy trên event loop: cả view Flask (decorator, template, hook) được gọi bên
+  trong AsyncSession.run_sync và db.session của request đó là session đồng bộ
+  của AsyncSession, nên mọi truy vấn sẵn có (Model.query, search, stats,
+  counters) đi qua driver async (asyncpg / aiosqlite). Trong lúc một request chờ
+  database, event loop phục vụ request khác: số request đang xử lý không còn bị
+  giới hạn bởi số thread mà bởi pool kết nối (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+- Các route còn lại (ghi dữ liệu, upload, file tải về dạng luồng, static) chạy
+  nguyên như WSGI trong pool ASGI_WSGI_THREADS thread với engine đồng bộ.
+- Render template vẫn dùng CPU trên event loop: mỗi worker chỉ dùng một core,
+  chọn --workers theo số core như gunicorn.
+"""
+
+import asyncio
+import contextvars
+import io
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from werkzeug.exceptions import HTTPException
+
+import database
+import profiling
+from app import app as flask_app
+from config import async_database_url, async_engine_options
+from models import db
+
+ASYNC_ENDPOINTS = frozenset({
+    'main.admin_dashboard',
+    'main.teacher_dashboard',
+    'main.student_dashboard',
+    'main.list_students',
+    'main.list_subjects',
+    'main.list_scores',
+    'main.api_statistics',
+    'api_v1.list_students',
+    'api_v1.list_subjects',
+    'api_v1.list_scores',
+})
+ASYNC_METHODS = ('GET', 'HEAD')
+
+
+class BridgeSession(database.RoutingSession):
+    """
+    Session đồng bộ nằm trong AsyncSession: chọn primary/replica như
+    RoutingSession rồi chuyển sang engine async tương ứng
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        return self.info['async_engines'].get(engine, engine)
+
+
+def _environ(scope, body):
+    """Dựng environ WSGI từ scope HTTP của ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode('utf-8').decode('latin-1'),
+        'PATH_INFO': path.encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope['query_string'].decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin-1')
+        if name == 'content-type':
+            key = 'CONTENT_TYPE'
+        elif name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        value = value.decode('latin-1')
+        environ[key] = f'{environ[key]},{value}' if key in environ else value
+    return environ
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] != 'http.request':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+def _start_message(status, headers):
+    return {
+        'type': 'http.response.start',
+        'status': int(status.split(' ', 1)[0]),
+        'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers],
+    }
+
+
+def _call_wsgi(wsgi_app, environ):
+    """Gọi app WSGI và đọc hết body; trả về (status, headers, body)"""
+    started = []
+
+    def start_response(status, headers, exc_info=None):
+        started[:] = [status, headers]
+
+    result = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return started[0], started[1], body
+
+
+class AsyncApp:
+    """Ứng dụng ASGI bọc app Flask (xem docstring của module)"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(wsgi_app.config['ASGI_WSGI_THREADS'],
+                                           thread_name_prefix='wsgi')
+        self.url_adapter = wsgi_app.url_map.bind('localhost')
+        self.engines = []
+        self._sessionmaker = None
+
+    def sessionmaker(self):
+        """Tạo engine async cho primary và replica ở lần gọi đầu (trong tiến trình worker)"""
+        if self._sessionmaker is None:
+            config = self.wsgi_app.config
+            urls = {None: config['SQLALCHEMY_DATABASE_URI']}
+            urls.update((key, bind['url']) for key, bind in config.get('SQLALCHEMY_BINDS', {}).items())
+            async_engines = {}
+            with self.wsgi_app.app_context():
+                for key, url in urls.items():
+                    engine = create_async_engine(async_database_url(url), **async_engine_options(url, config))
+                    database.configure_engine(self.wsgi_app, engine.sync_engine)
+                    profiling.instrument_engine(self.wsgi_app, engine.sync_engine)
+                    async_engines[db.engines[key]] = engine.sync_engine
+                    self.engines.append(engine)
+            self._sessionmaker = async_sessionmaker(sync_session_class=partial(BridgeSession, db),
+                                                    info={'async_engines': async_engines})
+        return self._sessionmaker
+
+    def is_async(self, environ):
+        if environ['REQUEST_METHOD'] not in ASYNC_METHODS:
+            return False
+        try:
+            endpoint, _ = self.url_adapter.match(environ['PATH_INFO'], environ['REQUEST_METHOD'])
+        except HTTPException:
+            return False
+        return endpoint in ASYNC_ENDPOINTS
+
+    def _dispatch(self, sync_session, environ):
+        """Chạy trong greenlet của AsyncSession.run_sync: I/O database không chặn event loop"""
+        with self.wsgi_app.app_context():
+            # Request này dùng session của AsyncSession thay cho session mặc định;
+            # teardown của Flask-SQLAlchemy đóng session khi app context kết thúc
+            db.session.registry.set(sync_session)
+            return _call_wsgi(self.wsgi_app, environ)
+
+    async def _run_async(self, environ, send):
+        async with self.sessionmaker()() as session:
+            status, headers, body = await session.run_sync(self._dispatch, environ)
+        await send(_start_message(status, headers))
+        await send({'type': 'http.response.body', 'body': body})
+
+    async def _run_wsgi(self, environ, send):
+        """Route đồng bộ chạy trong thread pool; response dạng luồng được gửi từng phần"""
+        loop = asyncio.get_running_loop()
+        # Mọi bước của request dùng chung một context (stream_with_context giữ
+        # request context giữa các lần đọc body)
+        context = contextvars.copy_context()
+
+        def run(function, *args):
+            return loop.run_in_executor(self.executor, context.run, function, *args)
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [status, headers]
+
+        result = await run(self.wsgi_app, environ, start_response)
+        try:
+            iterator = iter(result)
+            chunk = await run(next, iterator, None)
+            await send(_start_message(*started))
+            while chunk is not None:
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+                chunk = await run(next, iterator, None)
+            await send({'type': 'http.response.body', 'body': b''})
+        finally:
+            if hasattr(result, 'close'):
+                await run(result.close)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                for engine in self.engines:
+                    await engine.dispose()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise RuntimeError(f"Không hỗ trợ kết nối ASGI loại {scope['type']}")
+
+        environ = _environ(scope, await _read_body(receive))
+        if self.is_async(environ):
+            await self._run_async(environ, send)
+        else:
+            await self._run_wsgi(environ, send)
+
+
+app = AsyncApp(flask_app)
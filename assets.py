@@ -0,0 +1,202 @@
+"""
+Asset tĩnh tự host: tên file có dấu vân tay (hash nội dung), nén sẵn lúc build
+
+- static/vendor/: CSS/JS/font của Bootstrap, Bootstrap Icons và Chart.js đúng
+  phiên bản ghi trong VENDOR, tải về bằng `flask assets vendor`; static/css,
+  static/js: asset của ứng dụng.
+- `flask assets build` ghi vào static/dist/ bản có hash trong tên
+  (vendor/bootstrap.min.<hash>.css) kèm bản .br/.gz nén ở mức cao nhất và
+  manifest.json (tên gốc -> tên có hash). url() trong CSS (font icon) được đổi
+  sang tên có hash, chú thích sourceMappingURL bị bỏ (không vendor file .map).
+- /assets/<tên có hash> trả bản nén phù hợp Accept-Encoding với Cache-Control
+  immutable hạn một năm: nội dung đổi thì tên đổi, trình duyệt không cần hỏi lại.
+- Template gọi asset_url('vendor/bootstrap.min.css'). Chưa build (môi trường
+  dev) thì trả về file trong static/, chưa vendor thì trả về URL CDN gốc.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+
+try:
+    import brotli
+except ImportError:  # Brotli là tùy chọn: thiếu thì chỉ nén sẵn bản .gz
+    brotli = None
+
+from flask import abort, current_app, request, send_file, url_for
+from werkzeug.security import safe_join
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+DIST_DIR = os.path.join(STATIC_DIR, 'dist')
+MANIFEST_FILE = 'manifest.json'
+SOURCE_DIRS = ('vendor', 'css', 'js')
+MAX_AGE = 365 * 24 * 3600
+# woff/woff2 đã được nén sẵn trong định dạng font
+PRECOMPRESSED_EXTENSIONS = frozenset({'.css', '.js', '.svg', '.json', '.txt'})
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+CDN = 'https://cdn.jsdelivr.net/npm'
+VENDOR = {
+    'vendor/bootstrap.min.css': f'{CDN}/bootstrap@5.3.0/dist/css/bootstrap.min.css',
+    'vendor/bootstrap.bundle.min.js': f'{CDN}/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js',
+    'vendor/bootstrap-icons.css': f'{CDN}/bootstrap-icons@1.10.0/font/bootstrap-icons.css',
+    'vendor/fonts/bootstrap-icons.woff2': f'{CDN}/bootstrap-icons@1.10.0/font/fonts/bootstrap-icons.woff2',
+    'vendor/fonts/bootstrap-icons.woff': f'{CDN}/bootstrap-icons@1.10.0/font/fonts/bootstrap-icons.woff',
+    'vendor/chart.umd.min.js': f'{CDN}/chart.js@4.4.0/dist/chart.umd.min.js',
+}
+
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+_SOURCE_MAP = re.compile(rb'\n?/[*/]# sourceMappingURL=[^\n]*')
+
+
+def _static_path(logical):
+    return os.path.join(STATIC_DIR, *logical.split('/'))
+
+
+def vendor(force=False):
+    """Tải các file trong VENDOR vào static/; trả về danh sách file đã tải"""
+    fetched = []
+    for logical, url in VENDOR.items():
+        path = _static_path(logical)
+        if os.path.exists(path) and not force:
+            continue
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with urllib.request.urlopen(url, timeout=30) as response, open(path + '.part', 'wb') as f:
+            shutil.copyfileobj(response, f)
+        os.replace(path + '.part', path)
+        fetched.append(logical)
+    return fetched
+
+
+def _sources():
+    """(tên gốc, đường dẫn) của các asset nguồn; CSS xếp cuối để url() trỏ tới file đã có hash"""
+    sources = []
+    for top in SOURCE_DIRS:
+        for dirpath, _, filenames in os.walk(os.path.join(STATIC_DIR, top)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                sources.append((os.path.relpath(path, STATIC_DIR).replace(os.sep, '/'), path))
+    return sorted(sources, key=lambda item: (item[0].endswith('.css'), item[0]))
+
+
+def fingerprinted_name(logical, content):
+    stem, extension = posixpath.splitext(logical)
+    return f'{stem}.{hashlib.sha256(content).hexdigest()[:12]}{extension}'
+
+
+def _rewrite_css_urls(logical, content, manifest):
+    base = posixpath.dirname(logical)
+
+    def replace(match):
+        quote, target = match.groups()
+        if target.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        path, _, fragment = target.partition('#')
+        resolved = posixpath.normpath(posixpath.join(base, path.split('?', 1)[0]))
+        if resolved not in manifest:
+            return match.group(0)
+        # File có hash nằm cùng thư mục tương đối với file gốc
+        rewritten = posixpath.relpath(manifest[resolved], base)
+        if fragment:
+            rewritten += '#' + fragment
+        return f'url({quote}{rewritten}{quote})'
+
+    return _CSS_URL.sub(replace, content.decode('utf-8')).encode('utf-8')
+
+
+def _precompress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=11) if brotli is not None else None
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def build(output_dir=DIST_DIR):
+    """
+    Dựng static/dist từ các asset nguồn (xem docstring của module).
+    Trả về danh sách (tên gốc, tên có hash, byte gốc, {encoding: byte đã nén}).
+    """
+    if os.path.isdir(output_dir):
+        shutil.rmtree(output_dir)
+    manifest = {}
+    built = []
+    for logical, path in _sources():
+        with open(path, 'rb') as f:
+            content = f.read()
+        extension = posixpath.splitext(logical)[1]
+        if extension in ('.css', '.js'):
+            content = _SOURCE_MAP.sub(b'', content)
+        if extension == '.css':
+            content = _rewrite_css_urls(logical, content, manifest)
+
+        name = fingerprinted_name(logical, content)
+        manifest[logical] = name
+        target = os.path.join(output_dir, *name.split('/'))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(content)
+
+        sizes = {}
+        if extension in PRECOMPRESSED_EXTENSIONS:
+            for encoding, suffix in ENCODING_SUFFIXES.items():
+                compressed = _precompress(content, encoding)
+                if compressed is not None and len(compressed) < len(content):
+                    with open(target + suffix, 'wb') as f:
+                        f.write(compressed)
+                    sizes[encoding] = len(compressed)
+        built.append((logical, name, len(content), sizes))
+
+    with open(os.path.join(output_dir, MANIFEST_FILE), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return built
+
+
+def load_manifest(output_dir=DIST_DIR):
+    try:
+        with open(os.path.join(output_dir, MANIFEST_FILE), encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def asset_url(logical):
+    """URL của asset cho template: bản có hash nếu đã build, nếu không thì static/ hoặc CDN"""
+    name = current_app.extensions['assets'].get(logical)
+    if name is not None:
+        return url_for('assets', filename=name)
+    if logical in VENDOR and not os.path.exists(_static_path(logical)):
+        return VENDOR[logical]
+    return url_for('static', filename=logical)
+
+
+def serve_asset(filename):
+    """File có hash trong static/dist, ưu tiên bản nén sẵn mà client chấp nhận"""
+    path = safe_join(DIST_DIR, filename)
+    if path is None or filename == MANIFEST_FILE or not os.path.isfile(path):
+        abort(404)
+    encoding, variant = None, path
+    for candidate, suffix in ENCODING_SUFFIXES.items():
+        if request.accept_encodings[candidate] and os.path.isfile(path + suffix):
+            encoding, variant = candidate, path + suffix
+            break
+
+    response = send_file(variant, download_name=os.path.basename(path),
+                         conditional=True, max_age=MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    if os.path.splitext(path)[1] in PRECOMPRESSED_EXTENSIONS:
+        response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def init_app(app):
+    """Đọc manifest của static/dist, đăng ký route /assets và hàm asset_url cho template"""
+    app.extensions['assets'] = load_manifest()
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.add_template_global(asset_url)
@@ -0,0 +1,298 @@
+"""
+Nạp người dùng đăng nhập cho Flask-Login mà không truy vấn database mỗi request
+
+Session lưu "id:session_version" (User.get_id). Mỗi worker giữ ảnh chụp người
+dùng trong một LRU có giới hạn kích thước và TTL, khóa theo id; bản ghi chỉ được
+dùng khi version trong session khớp. session_version tăng khi đổi mật khẩu hoặc
+vai trò, nên session cũ hết hiệu lực (phải đăng nhập lại): ngay lập tức ở worker
+thực hiện thay đổi, và ở các worker khác chậm nhất sau USER_CACHE_TTL giây khi
+ảnh chụp cũ hết hạn.
+
+Config: USER_CACHE_SIZE (mặc định 1024), USER_CACHE_TTL (giây, mặc định 60).
+
+Đăng nhập (authenticate):
+- Kiểm tra mật khẩu chạy trong một thread pool giới hạn (AUTH_HASH_WORKERS luồng,
+  tối đa AUTH_HASH_QUEUE yêu cầu chờ); khi pool đầy, đăng nhập bị từ chối ngay
+  thay vì chiếm hết CPU của worker. scrypt/pbkdf2 nhả GIL nên các request khác
+  vẫn chạy song song. AUTH_HASH_WORKERS=0 kiểm tra trực tiếp trong request.
+- Hash cũ (khác AUTH_HASH_METHOD) được băm lại sau khi đăng nhập thành công.
+- Token bucket trong bộ nhớ theo username và theo IP (AUTH_RATE_LIMIT_USERNAME,
+  AUTH_RATE_LIMIT_IP, dạng "số lần/giây"), kiểm tra trước khi băm mật khẩu;
+  lần đăng nhập thành công được hoàn lại token nên chỉ lần sai bị tính.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from flask import current_app
+from flask_login import UserMixin
+from sqlalchemy import event, inspect, update
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from models import db, User
+
+DEFAULT_CACHE_SIZE = 1024
+DEFAULT_CACHE_TTL = 60
+DEFAULT_HASH_METHOD = 'scrypt:32768:8:1'
+
+
+class CachedUser(UserMixin):
+    """Ảnh chụp các thuộc tính của User dùng cho current_user (không gắn với session ORM)"""
+
+    def __init__(self, id, username, role, full_name, email, session_version):
+        self.id = id
+        self.username = username
+        self.role = role
+        self.full_name = full_name
+        self.email = email
+        self.session_version = session_version
+
+    @classmethod
+    def from_user(cls, user):
+        return cls(user.id, user.username, user.role, user.full_name, user.email,
+                   user.session_version)
+
+    def get_id(self):
+        return f'{self.id}:{self.session_version}'
+
+
+class UserCache:
+    """LRU + TTL, an toàn với nhiều thread; khóa là user id"""
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE, ttl=DEFAULT_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, version):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                user, expires_at = entry
+                if expires_at > time.monotonic() and user.session_version >= version:
+                    self._entries.move_to_end(user_id)
+                    self.hits += 1
+                    return user
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+
+    def put(self, user):
+        with self._lock:
+            self._entries[user.id] = (user, time.monotonic() + self.ttl)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def evict(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl,
+                    'hits': self.hits, 'misses': self.misses}
+
+
+user_cache = UserCache()
+
+
+class LoginRateLimited(Exception):
+    def __init__(self, retry_after):
+        super().__init__('Quá nhiều lần đăng nhập')
+        self.retry_after = retry_after
+
+
+class AuthBusy(Exception):
+    pass
+
+
+class TokenBucketLimiter:
+    """Token bucket theo khóa; số khóa được giới hạn, khóa cũ nhất bị bỏ trước"""
+
+    def __init__(self, capacity, period, max_keys=10000):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets = OrderedDict()
+
+    def acquire(self, key):
+        """Lấy một token; trả về 0 nếu được phép, ngược lại số giây cần chờ"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated_at) * self.rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0.0
+            else:
+                wait = (1 - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+    def refund(self, key):
+        """Trả lại token đã lấy (dùng khi đăng nhập thành công)"""
+        with self._lock:
+            if key in self._buckets:
+                tokens, updated_at = self._buckets[key]
+                self._buckets[key] = (min(self.capacity, tokens + 1), updated_at)
+
+
+def _parse_rate(value):
+    count, _, period = str(value).partition('/')
+    return int(count), float(period or 60)
+
+
+class PasswordHasher:
+    """Kiểm tra/băm mật khẩu trong thread pool giới hạn"""
+
+    def __init__(self, workers=2, queue=8, method=DEFAULT_HASH_METHOD, timeout=10):
+        self.method = method
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix='auth-hash') if workers else None
+        self._slots = threading.BoundedSemaphore(workers + queue) if workers else None
+        self._dummy_hash = None
+
+    def _run(self, func, *args):
+        if self._executor is None:
+            return func(*args)
+        if not self._slots.acquire(blocking=False):
+            raise AuthBusy()
+        try:
+            future = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # Slot chỉ được trả khi tác vụ thật sự xong, kể cả khi request đã hết thời gian chờ
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()
+            raise AuthBusy() from None
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify_dummy(self, password):
+        # Người dùng không tồn tại vẫn tốn thời gian như khi sai mật khẩu
+        if self._dummy_hash is None:
+            self._dummy_hash = generate_password_hash('dummy-password', self.method)
+        return self.verify(self._dummy_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.method
+
+
+def init_app(app, login_manager):
+    user_cache.maxsize = app.config.get('USER_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+    user_cache.ttl = app.config.get('USER_CACHE_TTL', DEFAULT_CACHE_TTL)
+    login_manager.user_loader(load_user)
+
+    app.extensions['auth_hasher'] = PasswordHasher(
+        workers=app.config.get('AUTH_HASH_WORKERS', 2),
+        queue=app.config.get('AUTH_HASH_QUEUE', 8),
+        method=app.config.get('AUTH_HASH_METHOD', DEFAULT_HASH_METHOD),
+        timeout=app.config.get('AUTH_HASH_TIMEOUT', 10),
+    )
+    app.extensions['auth_limiters'] = {
+        'username': TokenBucketLimiter(*_parse_rate(app.config.get('AUTH_RATE_LIMIT_USERNAME', '5/60'))),
+        'ip': TokenBucketLimiter(*_parse_rate(app.config.get('AUTH_RATE_LIMIT_IP', '30/60'))),
+    }
+
+
+def _parse_session_id(value):
+    user_id, sep, version = str(value).partition(':')
+    if not sep:
+        # Session tạo trước khi có session_version: yêu cầu đăng nhập lại
+        return None, None
+    try:
+        return int(user_id), int(version)
+    except ValueError:
+        return None, None
+
+
+def load_user(value):
+    """user_loader của Flask-Login: đọc từ cache, chỉ truy vấn khi chưa có/hết hạn"""
+    user_id, version = _parse_session_id(value)
+    if user_id is None:
+        return None
+
+    cached = user_cache.get(user_id, version)
+    if cached is not None:
+        return cached if cached.session_version == version else None
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        return None
+    cached = CachedUser.from_user(user)
+    user_cache.put(cached)
+    return cached if cached.session_version == version else None
+
+
+@event.listens_for(User, 'before_update')
+def _bump_session_version(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.password.history.has_changes() or state.attrs.role.history.has_changes():
+        target.session_version = (target.session_version or 1) + 1
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _evict_user(mapper, connection, target):
+    user_cache.evict(target.id)
+
+
+def authenticate(username, password, remote_addr):
+    """
+    Kiểm tra đăng nhập; trả về User (ORM) hoặc None nếu sai thông tin.
+    Ném LoginRateLimited khi vượt giới hạn, AuthBusy khi pool băm mật khẩu đã đầy.
+    """
+    limiters = current_app.extensions['auth_limiters']
+    hasher = current_app.extensions['auth_hasher']
+    username = (username or '').strip()
+
+    keys = {'ip': remote_addr or '-', 'username': username.lower()}
+    charged = []
+    for kind, key in keys.items():
+        wait = limiters[kind].acquire(key)
+        if wait:
+            # Bị chặn ở một bucket thì hoàn lại token đã lấy ở các bucket trước
+            for charged_kind, charged_key in charged:
+                limiters[charged_kind].refund(charged_key)
+            raise LoginRateLimited(math.ceil(wait))
+        charged.append((kind, key))
+
+    user = User.query.filter_by(username=username).first() if username else None
+    if user is None:
+        hasher.verify_dummy(password or '')
+        return None
+    if not hasher.verify(user.password, password or ''):
+        return None
+    # Chỉ lần đăng nhập sai mới bị tính vào giới hạn
+    for kind, key in keys.items():
+        limiters[kind].refund(key)
+
+    if hasher.needs_rehash(user.password):
+        # Cập nhật bằng câu UPDATE trực tiếp: băm lại không phải đổi mật khẩu nên
+        # không tăng session_version
+        new_hash = hasher.hash(password)
+        db.session.execute(update(User).where(User.id == user.id).values(password=new_hash))
+        db.session.commit()
+    return user
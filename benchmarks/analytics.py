@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+"""
+So sánh thống kê trên database (stats.py) với snapshot Parquet (analytics.py)
+
+Tạo (nếu chưa có) database SQLite với --scores bản ghi điểm bằng datagen, ghi
+snapshot đầy đủ vào --analytics-dir, sửa --changes bản ghi điểm của một học kỳ
+rồi đo lần refresh tăng dần (chỉ ghi lại học kỳ đó). Sau đó chạy từng
+truy vấn --repeat lần trên cả hai đường và in thời gian trung vị.
+
+Chạy: python benchmarks/analytics.py [--db /tmp/analytics_bench.db] [--scores 1000000]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='/tmp/analytics_bench.db', help='File SQLite (bỏ trống để dùng DATABASE_URL)')
+    parser.add_argument('--analytics-dir', default='/tmp/analytics_bench')
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--subjects', type=int, default=100)
+    parser.add_argument('--scores', type=int, default=1000000)
+    parser.add_argument('--changes', type=int, default=500, help='Số bản ghi điểm sửa trước lần refresh tăng dần')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON')
+    return parser.parse_args()
+
+
+def _median_seconds(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return round(statistics.median(timings), 4)
+
+
+def main():
+    args = parse_args()
+    if args.db:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+    os.environ['ANALYTICS_DIR'] = os.path.abspath(args.analytics_dir)
+    os.environ['ANALYTICS_OVERLAP_SECONDS'] = '0'
+
+    import app as app_module
+    import analytics
+    import datagen
+    import stats
+    from models import db, Score
+
+    app = app_module.app
+    with app.app_context():
+        app_module.bootstrap_db()
+        existing = db.session.execute(db.select(db.func.count()).select_from(Score)).scalar()
+        if existing < args.scores:
+            result = datagen.generate(args.students, args.subjects, args.scores - existing, seed=42)
+            print(f"Đã sinh dữ liệu trong {result['seconds']}s", file=sys.stderr)
+
+        results = {'dialect': db.engine.dialect.name, 'refresh': {}, 'queries': {}}
+        started = time.perf_counter()
+        state, _ = analytics.refresh(full=True)
+        results['refresh']['full_seconds'] = round(time.perf_counter() - started, 3)
+        results['scores'] = state['rows']
+        results['snapshot_mb'] = round(sum(
+            os.path.getsize(os.path.join(directory, name))
+            for directory, _, names in os.walk(analytics.root_dir()) for name in names) / 1024 / 1024, 2)
+
+        semester = db.session.execute(db.select(Score.semester).where(Score.semester.isnot(None))
+                                      .order_by(Score.semester.desc()).limit(1)).scalar()
+        changed_ids = db.session.execute(db.select(Score.id).where(Score.semester == semester)
+                                         .order_by(Score.id).limit(args.changes)).scalars().all()
+        # UPDATE qua Core: onupdate của Score.updated_at vẫn được áp dụng
+        db.session.execute(db.update(Score).where(Score.id.in_(changed_ids))
+                           .values(midterm_score=Score.midterm_score))
+        db.session.commit()
+        started = time.perf_counter()
+        _, rewritten = analytics.refresh()
+        results['refresh']['incremental'] = {
+            'changed_scores': len(changed_ids),
+            'semesters_rewritten': len(rewritten),
+            'rows_rewritten': sum(r['rows'] for r in rewritten),
+            'seconds': round(time.perf_counter() - started, 3),
+        }
+
+        cases = {
+            'distribution+mean': (lambda f, g: stats.get_statistics(f, g),
+                                  lambda f, g: (analytics.distribution(f, g), analytics.average(f, g))),
+            'pass_rate': (None, analytics.pass_rate),
+            'gpa': (None, analytics.gpa_summary),
+        }
+        for label, filters, group_by in (('all', {}, None), ('by_major', {}, 'major'),
+                                         ('one_semester', {'semester': semester}, 'subject')):
+            for name, (db_query, arrow_query) in cases.items():
+                key = f'{name}:{label}'
+                results['queries'][key] = {
+                    'database_s': _median_seconds(lambda: db_query(filters, group_by), args.repeat)
+                    if db_query else None,
+                    'arrow_s': _median_seconds(lambda: arrow_query(filters, group_by), args.repeat),
+                }
+                db.session.rollback()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    incremental = results['refresh']['incremental']
+    print(f"{results['dialect']}, {results['scores']} bản ghi điểm; snapshot {results['snapshot_mb']} MB")
+    print(f"  refresh đầy đủ: {results['refresh']['full_seconds']}s; tăng dần sau khi sửa {incremental['changed_scores']} "
+          f"điểm: {incremental['seconds']}s ({incremental['semesters_rewritten']} học kỳ, "
+          f"{incremental['rows_rewritten']} dòng)")
+    for key, r in results['queries'].items():
+        database_s = f"{r['database_s'] * 1000:9.1f}ms" if r['database_s'] is not None else f"{'-':>11}"
+        print(f"  {key:32} database {database_s}  arrow {r['arrow_s'] * 1000:9.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
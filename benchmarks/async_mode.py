@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+"""
+So sánh request/s giữa chế độ WSGI (gunicorn) và ASGI (uvicorn asgi:app)
+
+Script sinh database SQLite tạm bằng datagen (hoặc dùng --database-url, ví dụ
+PostgreSQL, nơi chế độ async có lợi nhất), lần lượt chạy từng server với cùng số
+worker rồi cho --clients client song song (mỗi client một phiên đăng nhập giáo
+viên) gọi liên tục các view chỉ đọc trong PATHS suốt --duration giây. Kết quả
+(req/s, p50/p95/p99, lỗi) in cạnh nhau và ghi JSON vào benchmarks/results.
+
+Client chạy trên cùng máy với server: trên máy ít core, phần CPU của client cũng
+làm giảm số liệu của cả hai chế độ như nhau.
+
+Chạy: python benchmarks/async_mode.py [--clients 200] [--duration 30] [--workers 2]
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from loadtest import RESULTS_DIR, ROOT, Client, _stats  # noqa: E402
+
+PATHS = ('/students', '/scores', '/api/statistics', '/teacher/dashboard')
+STARTUP_TIMEOUT = 60
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(mode, port, args):
+    if mode == 'wsgi':
+        return [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+                '--workers', str(args.workers), '--threads', str(args.threads),
+                '--timeout', '120', '--log-level', 'warning', 'app:app']
+    return [sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(args.workers), '--log-level', 'warning', '--no-access-log']
+
+
+def prepare_database(args, env):
+    """Tạo schema, tài khoản mặc định và dữ liệu tổng hợp (chạy trong tiến trình con)"""
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'bootstrap'],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'seed',
+                    '--students', str(args.students), '--subjects', str(args.subjects),
+                    '--scores', str(args.scores)],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+
+def wait_ready(url, process):
+    deadline = time.monotonic() + STARTUP_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f'Server thoát với mã {process.returncode}')
+        try:
+            if Client(url).request('GET', '/login') == 200:
+                return
+        except (OSError, urllib.error.URLError):
+            pass
+        time.sleep(0.2)
+    raise SystemExit(f'Server {url} không sẵn sàng sau {STARTUP_TIMEOUT}s')
+
+
+def run_clients(url, args):
+    """--clients thread gọi PATHS xoay vòng, không nghỉ; trả về (thời gian, lỗi) của từng request"""
+    clients = [Client(url) for _ in range(args.clients)]
+    for client in clients:
+        if client.login('teacher', 'teacher123') != 302:
+            raise SystemExit('Không đăng nhập được bằng tài khoản teacher')
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    samples = []
+    failures = [0]
+
+    def worker(index, client):
+        position = index
+        while not stop.is_set():
+            path = PATHS[position % len(PATHS)]
+            position += 1
+            started = time.perf_counter()
+            try:
+                ok = client.request('GET', path) == 200
+            except OSError:
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                samples.append(elapsed)
+                if not ok:
+                    failures[0] += 1
+
+    threads = [threading.Thread(target=worker, args=(i, c), daemon=True) for i, c in enumerate(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return _stats(samples, failures[0], time.perf_counter() - started)
+
+
+def bench_mode(mode, args, env):
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}'
+    process = subprocess.Popen(server_command(mode, port, args), cwd=ROOT, env=env)
+    try:
+        wait_ready(url, process)
+        return run_clients(url, args)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4, help='Số thread mỗi worker gunicorn (WSGI)')
+    parser.add_argument('--modes', default='wsgi,asgi')
+    parser.add_argument('--database-url', help='Database có sẵn dữ liệu (bỏ trống để sinh SQLite tạm)')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--subjects', type=int, default=60)
+    parser.add_argument('--scores', type=int, default=100000)
+    parser.add_argument('--output', help='File JSON kết quả (mặc định benchmarks/results/async-<thời gian>.json)')
+    args = parser.parse_args()
+
+    started_at = datetime.now()
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   APP_PROFILE='production',
+                   SECRET_KEY='bench-async-mode',
+                   DATABASE_URL=args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   AUTH_RATE_LIMIT_USERNAME='1000000/1',
+                   AUTH_RATE_LIMIT_IP='1000000/1')
+        if not args.database_url:
+            print(f'Sinh dữ liệu: {args.students} sinh viên, {args.scores} bản ghi điểm...')
+            prepare_database(args, env)
+        for mode in args.modes.split(','):
+            print(f'Đo chế độ {mode}: {args.clients} client, {args.duration:.0f}s...')
+            results[mode] = bench_mode(mode, args, env)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'async-{started_at:%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'started_at': started_at.isoformat(timespec='seconds'),
+                'clients': args.clients,
+                'duration': args.duration,
+                'workers': args.workers,
+                'threads': args.threads,
+                'paths': PATHS,
+                'database': 'external' if args.database_url else 'sqlite',
+            },
+            'modes': results,
+        }, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'chế độ':8} {'số req':>8} {'lỗi':>6} {'req/s':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for mode, r in results.items():
+        print(f"{mode:8} {r['requests']:8} {r['failures']:6} {r['rps']:8.1f} "
+              f"{r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['p99_ms']:7.1f}ms")
+    if 'wsgi' in results and 'asgi' in results and results['wsgi']['rps']:
+        print(f"ASGI/WSGI: {results['asgi']['rps'] / results['wsgi']['rps']:.2f}x req/s")
+    print(f'Đã ghi kết quả: {os.path.relpath(output)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+Micro-benchmark các route nóng bằng pytest-benchmark
+
+Mỗi benchmark gọi route qua Flask test client (không qua mạng) trên database
+SQLite tạm sinh bằng datagen.generate(); quy mô chỉnh bằng biến môi trường
+BENCH_STUDENTS, BENCH_SUBJECTS, BENCH_SCORES. Tác vụ nền (import, export Excel)
+chạy với JOB_EXECUTOR=inline để đo trọn thời gian xử lý. Route phụ thuộc dữ liệu
+(/import/students) dùng file mới ở mỗi vòng để luôn đo đường insert.
+
+Chạy: make bench-routes (kết quả JSON lưu trong benchmarks/results; từ lần chạy
+thứ hai so sánh với lần gần nhất và báo lỗi nếu median chậm hơn 20%), hoặc:
+  pip install -r benchmarks/requirements.txt
+  python -m pytest benchmarks/bench_routes.py --benchmark-json=ket_qua.json
+"""
+
+import io
+import itertools
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+STUDENTS = int(os.environ.get('BENCH_STUDENTS', 5000))
+SUBJECTS = int(os.environ.get('BENCH_SUBJECTS', 60))
+SCORES = int(os.environ.get('BENCH_SCORES', 100000))
+IMPORT_ROWS = 200
+
+
+@pytest.fixture(scope='session')
+def app():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(APP_PROFILE='development',
+                          DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          JOB_EXECUTOR='inline',
+                          JOB_DIR=os.path.join(tmp, 'jobs'),
+                          AUTH_RATE_LIMIT_USERNAME='1000000/1',
+                          AUTH_RATE_LIMIT_IP='1000000/1')
+        import app as app_module
+        import datagen
+
+        app = app_module.app
+        with app.app_context():
+            app_module.bootstrap_db()
+            datagen.generate(STUDENTS, SUBJECTS, SCORES)
+            app_module.db.session.remove()
+        yield app
+        with app.app_context():
+            app_module.db.engine.dispose()
+
+
+def _login(app, username, password):
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture(scope='session')
+def teacher(app):
+    return _login(app, 'teacher', 'teacher123')
+
+
+@pytest.fixture(scope='session')
+def admin(app):
+    return _login(app, 'admin', 'admin123')
+
+
+def _get(client, url):
+    response = client.get(url)
+    assert response.status_code == 200, (url, response.status_code)
+    return response.get_data()
+
+
+def test_students_page(benchmark, teacher):
+    benchmark(_get, teacher, '/students')
+
+
+def test_students_search(benchmark, teacher):
+    benchmark(_get, teacher, '/students?search=nguyen van')
+
+
+def test_scores_page(benchmark, teacher):
+    benchmark(_get, teacher, '/scores')
+
+
+def test_scores_page_filtered(benchmark, teacher):
+    benchmark(_get, teacher, '/scores?semester=HK1-2023')
+
+
+def test_api_statistics(benchmark, teacher):
+    benchmark(_get, teacher, '/api/statistics')
+
+
+def test_export_students_csv(benchmark, teacher):
+    body = benchmark(_get, teacher, '/export/students?format=csv')
+    assert body.count(b'\n') > STUDENTS
+
+
+def _export_xlsx(client):
+    response = client.get('/export/students')
+    assert response.status_code == 302
+    job_url = response.headers['Location']
+    return _get(client, f'{job_url}/download')
+
+
+def test_export_students_xlsx(benchmark, teacher):
+    benchmark.pedantic(_export_xlsx, args=(teacher,), rounds=3)
+
+
+def test_import_students(benchmark, admin):
+    import datagen
+
+    batches = itertools.count(1)
+
+    def setup():
+        start = next(batches) * IMPORT_ROWS
+        data = datagen.student_import_csv(IMPORT_ROWS, start=start, seed=start)
+        return (admin, data), {}
+
+    def run(client, data):
+        response = client.post('/import/students', data={'file': (io.BytesIO(data), 'students.csv')},
+                               content_type='multipart/form-data')
+        assert response.status_code == 302
+
+    benchmark.pedantic(run, setup=setup, rounds=10)
+
+
+def test_login(benchmark, app):
+    benchmark.pedantic(_login, args=(app, 'teacher', 'teacher123'), rounds=10)
@@ -0,0 +1,339 @@
+#!/usr/bin/env python
+"""
+Kiểm thử tải các route nóng qua HTTP (tương tự Locust, không cần cài thêm gói)
+
+--users người dùng ảo chạy song song, mỗi người một cookie jar riêng, đăng nhập
+rồi lặp lại các tác vụ trong TASKS theo trọng số, nghỉ ngẫu nhiên 0..--wait giây
+giữa hai request, trong --duration giây. Kết quả theo từng tác vụ (số request,
+lỗi, request/s, p50/p95/p99) được in ra và ghi thành JSON để so sánh giữa các lần
+chạy: --compare <file JSON cũ> báo chênh lệch và trả exit code 1 nếu p95 của một
+tác vụ chậm hơn quá --max-regression %.
+
+Không có --url: script tự sinh database SQLite tạm bằng datagen (--students,
+--subjects, --scores) và chạy app bằng server đa luồng của Werkzeug trong tiến
+trình con. Với --url (ví dụ gunicorn đang chạy) cần tắt giới hạn đăng nhập
+(AUTH_RATE_LIMIT_USERNAME / AUTH_RATE_LIMIT_IP) trên server, nếu không tác vụ
+login sẽ nhận 429.
+
+Chạy: python benchmarks/loadtest.py [--users 10] [--duration 30] [--url http://127.0.0.1:5000]
+"""
+
+import argparse
+import http.cookiejar
+import itertools
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+IMPORT_ROWS = 100
+
+import datagen  # noqa: E402
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Không theo redirect: mỗi tác vụ chỉ đo đúng một request"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Client:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, method, path, data=None, headers=None):
+        """Trả về mã HTTP; đọc hết body để tính cả thời gian truyền dữ liệu"""
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers=headers or {})
+        try:
+            with self.opener.open(req, timeout=120) as response:
+                while response.read(65536):
+                    pass
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def login(self, username, password):
+        body = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+        return self.request('POST', '/login', body,
+                            {'Content-Type': 'application/x-www-form-urlencoded'})
+
+
+def _multipart(field, filename, content):
+    boundary = uuid.uuid4().hex
+    body = (f'--{boundary}\r\nContent-Disposition: form-data; name="{field}"; filename="{filename}"\r\n'
+            f'Content-Type: text/csv\r\n\r\n').encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, {'Content-Type': f'multipart/form-data; boundary={boundary}'}
+
+
+def task_students(user):
+    return user.client.request('GET', '/students')
+
+
+def task_search(user):
+    return user.client.request('GET', '/students?' + urllib.parse.urlencode(
+        {'search': user.rng.choice(['nguyen', 'tran thi', 'le van', 'minh', 'SV00001'])}))
+
+
+def task_scores(user):
+    return user.client.request('GET', '/scores')
+
+
+def task_statistics(user):
+    return user.client.request('GET', '/api/statistics')
+
+
+def task_export(user):
+    return user.client.request('GET', '/export/students?format=csv')
+
+
+def task_import(user):
+    start = next(user.state.import_batches) * IMPORT_ROWS
+    content = datagen.student_import_csv(IMPORT_ROWS, start=start, prefix=user.state.import_prefix)
+    body, headers = _multipart('file', 'students.csv', content)
+    return user.client.request('POST', '/import/students', body, headers)
+
+
+def task_login(user):
+    return Client(user.client.base_url).login(user.state.username, user.state.password)
+
+
+# (tên, trọng số, hàm): tỉ lệ xấp xỉ lưu lượng thật của giáo viên / phòng đào tạo
+TASKS = [
+    ('GET /students', 25, task_students),
+    ('GET /students?search', 10, task_search),
+    ('GET /scores', 25, task_scores),
+    ('GET /api/statistics', 15, task_statistics),
+    ('GET /export/students', 5, task_export),
+    ('POST /import/students', 3, task_import),
+    ('POST /login', 10, task_login),
+]
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+class LoadState:
+    def __init__(self, args):
+        self.args = args
+        self.username = args.username
+        self.password = args.password
+        self.import_prefix = f'LT{int(time.time()) % 100000:05d}'
+        self.import_batches = itertools.count()
+        self.stop = threading.Event()
+        self.lock = threading.Lock()
+        self.samples = {name: [] for name, _, _ in TASKS}
+        self.failures = {name: 0 for name, _, _ in TASKS}
+
+    def record(self, name, elapsed, ok):
+        with self.lock:
+            self.samples[name].append(elapsed)
+            if not ok:
+                self.failures[name] += 1
+
+
+class VirtualUser(threading.Thread):
+    def __init__(self, state, index):
+        super().__init__(daemon=True)
+        self.state = state
+        self.rng = random.Random(index)
+        self.client = Client(state.args.url)
+        self.error = None
+
+    def run(self):
+        state = self.state
+        names = [name for name, _, _ in TASKS]
+        weights = [weight for _, weight, _ in TASKS]
+        functions = {name: function for name, _, function in TASKS}
+        if self.client.login(state.username, state.password) != 302:
+            self.error = f'Không đăng nhập được với tài khoản {state.username}'
+            return
+        while not state.stop.is_set():
+            name = self.rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                status = functions[name](self)
+            except OSError:
+                status = None
+            state.record(name, time.perf_counter() - started, status is not None and status < 400)
+            if state.args.wait:
+                state.stop.wait(self.rng.uniform(0, state.args.wait))
+
+
+def summarize(state, elapsed):
+    tasks = {}
+    all_samples = []
+    for name, samples in state.samples.items():
+        all_samples.extend(samples)
+        tasks[name] = _stats(samples, state.failures[name], elapsed)
+    return tasks, _stats(all_samples, sum(state.failures.values()), elapsed)
+
+
+def _stats(samples, failures, elapsed):
+    return {
+        'requests': len(samples),
+        'failures': failures,
+        'rps': round(len(samples) / elapsed, 2),
+        'mean_ms': round(sum(samples) / len(samples) * 1000, 1) if samples else 0.0,
+        'p50_ms': round(percentile(samples, 0.5) * 1000, 1),
+        'p95_ms': round(percentile(samples, 0.95) * 1000, 1),
+        'p99_ms': round(percentile(samples, 0.99) * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1) if samples else 0.0,
+    }
+
+
+def serve(args):
+    """Tiến trình con: sinh dữ liệu rồi phục vụ app, in cổng đã mở khi sẵn sàng"""
+    import app as app_module
+    from werkzeug.serving import make_server
+
+    app = app_module.app
+    with app.app_context():
+        app_module.bootstrap_db()
+        datagen.generate(args.students, args.subjects, args.scores)
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    print(f'PORT {server.server_port}', flush=True)
+    server.serve_forever()
+
+
+def start_server(args, tmp):
+    env = dict(os.environ,
+               APP_PROFILE='development',
+               DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'loadtest.db')}",
+               JOB_EXECUTOR='inline',
+               JOB_DIR=os.path.join(tmp, 'jobs'),
+               AUTH_RATE_LIMIT_USERNAME='1000000/1',
+               AUTH_RATE_LIMIT_IP='1000000/1')
+    process = subprocess.Popen([sys.executable, os.path.abspath(__file__), '--serve',
+                                '--students', str(args.students), '--subjects', str(args.subjects),
+                                '--scores', str(args.scores)],
+                               cwd=ROOT, env=env, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                               text=True)
+    # bootstrap_db() cũng in ra stdout: bỏ qua tới dòng báo cổng
+    for line in process.stdout:
+        if line.startswith('PORT '):
+            return process, f'http://127.0.0.1:{line.split()[1]}'
+    process.wait()
+    raise SystemExit('Không khởi động được server (chạy lại với --serve để xem lỗi)')
+
+
+def compare(results, baseline, max_regression):
+    """In chênh lệch so với lần chạy trước; trả về danh sách tác vụ bị chậm đi quá ngưỡng"""
+    regressions = []
+    print(f"\nSo với {baseline['meta']['started_at']}:")
+    for name, current in results['tasks'].items():
+        previous = baseline['tasks'].get(name)
+        if not previous or not previous['p95_ms'] or not current['requests']:
+            continue
+        change = (current['p95_ms'] - previous['p95_ms']) / previous['p95_ms'] * 100
+        flag = ''
+        if change > max_regression:
+            regressions.append(name)
+            flag = '  <-- chậm hơn'
+        print(f"  {name:24} p95 {previous['p95_ms']:8.1f} -> {current['p95_ms']:8.1f}ms ({change:+.0f}%)  "
+              f"req/s {previous['rps']:7.1f} -> {current['rps']:7.1f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', help='Server đang chạy (bỏ trống để tự khởi động server tạm)')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--duration', type=float, default=30)
+    parser.add_argument('--wait', type=float, default=0.5, help='Thời gian nghỉ tối đa giữa hai request (giây)')
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='admin123')
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--subjects', type=int, default=60)
+    parser.add_argument('--scores', type=int, default=100000)
+    parser.add_argument('--output', help='File JSON kết quả (mặc định benchmarks/results/load-<thời gian>.json)')
+    parser.add_argument('--compare', help='File JSON của lần chạy trước để so sánh')
+    parser.add_argument('--max-regression', type=float, default=20, help='Ngưỡng p95 chậm đi (%%)')
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        server = None
+        if not args.url:
+            server, args.url = start_server(args, tmp)
+        try:
+            state = LoadState(args)
+            users = [VirtualUser(state, i) for i in range(args.users)]
+            started_at = datetime.now()
+            started = time.perf_counter()
+            for user in users:
+                user.start()
+            time.sleep(args.duration)
+            state.stop.set()
+            for user in users:
+                user.join()
+            elapsed = time.perf_counter() - started
+        finally:
+            if server:
+                server.terminate()
+                server.wait()
+
+    errors = {user.error for user in users if user.error}
+    if errors:
+        raise SystemExit('; '.join(errors))
+
+    tasks, total = summarize(state, elapsed)
+    results = {
+        'meta': {
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'url': args.url if not server else 'local',
+            'users': args.users,
+            'duration': round(elapsed, 1),
+            'wait': args.wait,
+            'dataset': None if not server else {
+                'students': args.students, 'subjects': args.subjects, 'scores': args.scores},
+        },
+        'tasks': tasks,
+        'total': total,
+    }
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print(f"{args.users} người dùng ảo, {elapsed:.0f}s, {total['requests']} request "
+          f"({total['rps']} req/s, {total['failures']} lỗi)")
+    print(f"{'tác vụ':24} {'số req':>7} {'lỗi':>5} {'req/s':>7} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for name, r in tasks.items():
+        print(f"{name:24} {r['requests']:7} {r['failures']:5} {r['rps']:7.1f} "
+              f"{r['p50_ms']:7.1f}ms {r['p95_ms']:7.1f}ms {r['p99_ms']:7.1f}ms")
+    print(f"Đã ghi kết quả: {os.path.relpath(output)}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.max_regression)
+        if regressions:
+            raise SystemExit(f"p95 chậm hơn quá {args.max_regression:g}%: {', '.join(regressions)}")
+
+
+if __name__ == '__main__':
+    main()
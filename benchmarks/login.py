@@ -0,0 +1,151 @@
+#!/usr/bin/env python
+"""
+Đo thông lượng đăng nhập khi có traffic trang song song
+
+Tạo database SQLite tạm với --users tài khoản, rồi trong --duration giây chạy
+song song --login-threads luồng đăng nhập liên tục và --page-threads luồng tải
+trang /subjects bằng tài khoản đã đăng nhập. So sánh hai chế độ:
+- inline: băm mật khẩu ngay trong request (AUTH_HASH_WORKERS=0)
+- pool:   băm trong thread pool giới hạn (AUTH_HASH_WORKERS=--hash-workers)
+
+Chạy: python benchmarks/login.py [--duration 10] [--login-threads 8] [--page-threads 4]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PASSWORD = 'bench-password'
+
+
+def percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def run_mode(args):
+    """Chạy trong tiến trình con: cấu hình lấy từ biến môi trường do main() đặt"""
+    sys.path.insert(0, ROOT)
+    import app as app_module
+    from models import db, User
+    from werkzeug.security import generate_password_hash
+
+    app = app_module.app
+    with app.app_context():
+        app_module.bootstrap_db()
+        password_hash = generate_password_hash(PASSWORD, app.config['AUTH_HASH_METHOD'])
+        db.session.add_all([User(username=f'bench{i}', password=password_hash, role='teacher',
+                                 full_name=f'Bench {i}') for i in range(args.users)])
+        db.session.commit()
+
+    stop = threading.Event()
+    lock = threading.Lock()
+    logins, login_errors, pages = [], 0, []
+
+    def login_loop(index):
+        nonlocal login_errors
+        i = index
+        while not stop.is_set():
+            client = app.test_client()
+            started = time.perf_counter()
+            response = client.post('/login', data={'username': f'bench{i % args.users}', 'password': PASSWORD})
+            elapsed = time.perf_counter() - started
+            with lock:
+                if response.status_code == 302:
+                    logins.append(elapsed)
+                else:
+                    login_errors += 1
+            i += args.login_threads
+
+    def page_loop(index):
+        client = app.test_client()
+        client.post('/login', data={'username': f'bench{index % args.users}', 'password': PASSWORD})
+        while not stop.is_set():
+            started = time.perf_counter()
+            client.get('/subjects')
+            elapsed = time.perf_counter() - started
+            with lock:
+                pages.append(elapsed)
+
+    page_threads = [threading.Thread(target=page_loop, args=(i,)) for i in range(args.page_threads)]
+    for thread in page_threads:
+        thread.start()
+    time.sleep(0.5)
+    with lock:
+        pages.clear()
+    login_threads = [threading.Thread(target=login_loop, args=(i,)) for i in range(args.login_threads)]
+    started = time.perf_counter()
+    for thread in login_threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in login_threads + page_threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        'hash_workers': app.config['AUTH_HASH_WORKERS'],
+        'logins_per_sec': round(len(logins) / elapsed, 2),
+        'login_rejected': login_errors,
+        'login_p50_ms': round(percentile(logins, 0.5) * 1000, 1),
+        'login_p95_ms': round(percentile(logins, 0.95) * 1000, 1),
+        'pages_per_sec': round(len(pages) / elapsed, 2),
+        'page_p50_ms': round(percentile(pages, 0.5) * 1000, 1),
+        'page_p95_ms': round(percentile(pages, 0.95) * 1000, 1),
+        'page_mean_ms': round(statistics.mean(pages) * 1000, 1) if pages else 0.0,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--login-threads', type=int, default=8)
+    parser.add_argument('--page-threads', type=int, default=4)
+    parser.add_argument('--hash-workers', type=int, default=2)
+    parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args)
+        return
+
+    results = {}
+    for mode, workers in (('inline', 0), ('pool', args.hash_workers)):
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ,
+                       APP_PROFILE='development',
+                       DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                       AUTH_HASH_WORKERS=str(workers),
+                       AUTH_HASH_QUEUE=str(args.login_threads),
+                       AUTH_RATE_LIMIT_USERNAME='1000000/1',
+                       AUTH_RATE_LIMIT_IP='1000000/1')
+            output = subprocess.run([sys.executable, os.path.abspath(__file__), '--child',
+                                     '--duration', str(args.duration), '--users', str(args.users),
+                                     '--login-threads', str(args.login_threads),
+                                     '--page-threads', str(args.page_threads)],
+                                    cwd=ROOT, env=env, check=True, capture_output=True, text=True).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{args.login_threads} luồng đăng nhập + {args.page_threads} luồng tải trang, {args.duration:g}s")
+    print(f"{'chế độ':8} {'login/s':>8} {'login p95':>10} {'trang/s':>8} {'trang p50':>10} {'trang p95':>10}")
+    for mode, r in results.items():
+        print(f"{mode:8} {r['logins_per_sec']:8.1f} {r['login_p95_ms']:8.1f}ms {r['pages_per_sec']:8.1f} "
+              f"{r['page_p50_ms']:8.1f}ms {r['page_p95_ms']:8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
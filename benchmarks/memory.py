@@ -0,0 +1,186 @@
+#!/usr/bin/env python
+"""
+Đo thời gian import (-X importtime) và bộ nhớ của từng worker gunicorn
+
+1. Chạy `python -X importtime -c "import app"` trong tiến trình mới: in tổng
+   thời gian import app, các gói tốn thời gian nhất (cộng thời gian "self" theo
+   gói gốc) và module nặng nào đã bị nạp ngay lúc import.
+2. Với từng chế độ trong --modes (preload: GUNICORN_PRELOAD=1, nopreload), chạy
+   gunicorn --workers N trên database SQLite tạm sinh bằng datagen, gọi các
+   trang trong PATHS (cùng một lượt export Excel để nạp openpyxl) rồi đọc
+   /proc/<pid>/smaps_rollup của master và từng worker: RSS, PSS (phần bộ nhớ
+   dùng chung chia đều cho các tiến trình) và USS (bộ nhớ riêng, phần mỗi
+   worker thêm vào thực sự tốn).
+   Ước lượng số worker vừa --memory-limit MB: (giới hạn - PSS master) / USS
+   trung bình của worker.
+
+Chỉ chạy trên Linux (đọc /proc). Kết quả ghi JSON vào benchmarks/results.
+
+Chạy: python benchmarks/memory.py [--workers 4] [--memory-limit 512]
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from async_mode import _free_port, prepare_database, wait_ready  # noqa: E402
+from loadtest import RESULTS_DIR, ROOT, Client  # noqa: E402
+
+PATHS = ('/teacher/dashboard', '/students', '/scores', '/subjects', '/api/statistics',
+         '/api/v1/students?limit=200')
+HEAVY_MODULES = ('numpy', 'openpyxl', 'pandas')
+IMPORTTIME_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)')
+SMAPS_FIELDS = ('Rss', 'Pss', 'Private_Clean', 'Private_Dirty')
+
+
+def import_profile(env, top=12):
+    """Tổng thời gian import app và các gói tốn thời gian nhất (ms)"""
+    code = 'import sys, json, app; print(json.dumps([m for m in %r if m in sys.modules]))' % (HEAVY_MODULES,)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=ROOT, env=env, check=True, capture_output=True, text=True)
+    by_package = Counter()
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        by_package[name.split('.')[0]] += int(self_us)
+        if name == 'app' and not indent:
+            total_us = int(cumulative_us)
+    return {
+        'import_app_ms': round(total_us / 1000, 1),
+        'top_packages_ms': {name: round(us / 1000, 1) for name, us in by_package.most_common(top)},
+        'heavy_modules_loaded': json.loads(result.stdout.strip().splitlines()[-1]),
+    }
+
+
+def memory_of(pid):
+    """RSS/PSS/USS (KB) của một tiến trình từ /proc/<pid>/smaps_rollup"""
+    values = dict.fromkeys(SMAPS_FIELDS, 0)
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            name, _, rest = line.partition(':')
+            if name in values:
+                values[name] = int(rest.split()[0])
+    return {'rss_kb': values['Rss'], 'pss_kb': values['Pss'],
+            'uss_kb': values['Private_Clean'] + values['Private_Dirty']}
+
+
+def children_of(pid):
+    children = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # Trường thứ 4 là ppid; tên tiến trình (trường 2) có thể chứa dấu cách
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+
+def warm_up(url, rounds):
+    """Gọi các trang trong PATHS và một lượt export Excel qua nhiều kết nối để mọi worker đều phục vụ"""
+    clients = [Client(url) for _ in range(rounds)]
+    for client in clients:
+        client.login('admin', 'admin123')
+        for path in PATHS:
+            client.request('GET', path)
+    clients[0].request('GET', '/export/students?format=xlsx')
+
+
+def bench_mode(mode, args, env):
+    port = _free_port()
+    url = f'http://127.0.0.1:{port}'
+    env = dict(env, GUNICORN_PRELOAD='1' if mode == 'preload' else '0')
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}',
+                                '--workers', str(args.workers), '--log-level', 'warning', 'app:app'],
+                               cwd=ROOT, env=env)
+    try:
+        wait_ready(url, process)
+        warm_up(url, args.workers * 4)
+        time.sleep(0.5)
+        workers = [memory_of(pid) for pid in children_of(process.pid)]
+        master = memory_of(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+    mean = lambda key: sum(w[key] for w in workers) / len(workers)  # noqa: E731
+    result = {
+        'master': master,
+        'workers': workers,
+        'worker_mean_rss_mb': round(mean('rss_kb') / 1024, 1),
+        'worker_mean_pss_mb': round(mean('pss_kb') / 1024, 1),
+        'worker_mean_uss_mb': round(mean('uss_kb') / 1024, 1),
+        'total_pss_mb': round((master['pss_kb'] + sum(w['pss_kb'] for w in workers)) / 1024, 1),
+    }
+    if args.memory_limit:
+        result['workers_fit'] = int((args.memory_limit * 1024 - master['pss_kb']) // mean('uss_kb'))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--modes', default='nopreload,preload')
+    parser.add_argument('--memory-limit', type=int, default=512, help='MB của container để ước lượng số worker')
+    parser.add_argument('--students', type=int, default=2000)
+    parser.add_argument('--subjects', type=int, default=30)
+    parser.add_argument('--scores', type=int, default=20000)
+    parser.add_argument('--output', help='File JSON kết quả (mặc định benchmarks/results/memory-<thời gian>.json)')
+    args = parser.parse_args()
+
+    started_at = datetime.now()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ,
+                   APP_PROFILE='production',
+                   SECRET_KEY='bench-memory',
+                   DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                   JOB_EXECUTOR='inline',
+                   JOB_DIR=os.path.join(tmp, 'jobs'),
+                   AUTH_RATE_LIMIT_USERNAME='1000000/1',
+                   AUTH_RATE_LIMIT_IP='1000000/1')
+        imports = import_profile(env)
+        print(f"Import app: {imports['import_app_ms']}ms; module nặng đã nạp: "
+              f"{', '.join(imports['heavy_modules_loaded']) or 'không'}")
+        for name, ms in imports['top_packages_ms'].items():
+            print(f'  {name:24} {ms:8.1f}ms')
+
+        print(f'Sinh dữ liệu: {args.students} sinh viên, {args.scores} bản ghi điểm...')
+        prepare_database(args, env)
+        modes = {}
+        for mode in args.modes.split(','):
+            print(f'Đo chế độ {mode}: {args.workers} worker...')
+            modes[mode] = bench_mode(mode, args, env)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'memory-{started_at:%Y%m%d-%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'meta': {'started_at': started_at.isoformat(timespec='seconds'),
+                            'workers': args.workers, 'memory_limit_mb': args.memory_limit},
+                   'imports': imports, 'modes': modes}, f, indent=2, ensure_ascii=False)
+
+    print(f"\n{'chế độ':10} {'master RSS':>11} {'worker RSS':>11} {'worker PSS':>11} "
+          f"{'worker USS':>11} {'tổng PSS':>9} {'vừa ' + str(args.memory_limit) + 'MB':>9}")
+    for mode, r in modes.items():
+        print(f"{mode:10} {r['master']['rss_kb'] / 1024:9.1f}MB {r['worker_mean_rss_mb']:9.1f}MB "
+              f"{r['worker_mean_pss_mb']:9.1f}MB {r['worker_mean_uss_mb']:9.1f}MB "
+              f"{r['total_pss_mb']:7.1f}MB {r.get('workers_fit', '-'):>9}")
+    print(f'Đã ghi kết quả: {os.path.relpath(output)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Đo thời gian các báo cáo trong reports.py trên tập dữ liệu tổng hợp lớn
+
+Tạo (nếu chưa có) database SQLite với --students sinh viên, --subjects môn học và
+--scores bản ghi điểm (mặc định 1 triệu) bằng datagen.generate(), rồi với mỗi báo
+cáo: chạy toàn bộ truy vấn và ghi CSV ra /dev/null, ghi lại số dòng, thời gian,
+tốc độ và bộ nhớ tối đa của tiến trình.
+
+Chạy: python benchmarks/reports.py [--db /tmp/reports_bench.db] [--scores 1000000]
+Dùng PostgreSQL: đặt DATABASE_URL và bỏ --db.
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--db', default='/tmp/reports_bench.db', help='File SQLite (bỏ trống để dùng DATABASE_URL)')
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--subjects', type=int, default=100)
+    parser.add_argument('--scores', type=int, default=1000000)
+    parser.add_argument('--years', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.db:
+        os.environ['DATABASE_URL'] = f'sqlite:///{os.path.abspath(args.db)}'
+
+    import app as app_module
+    import datagen
+    import reports
+    from models import db, Score, Student
+
+    app = app_module.app
+    with app.app_context():
+        app_module.bootstrap_db()
+        existing = db.session.execute(db.select(db.func.count()).select_from(Score)).scalar()
+        if existing < args.scores:
+            result = datagen.generate(args.students, args.subjects, args.scores - existing,
+                                      years=args.years, seed=args.seed)
+            print(f"Đã sinh dữ liệu trong {result['seconds']}s", file=sys.stderr)
+        total_scores = db.session.execute(db.select(db.func.count()).select_from(Score)).scalar()
+
+        one_class = db.session.execute(db.select(Student.class_name).where(Student.class_name.isnot(None))
+                                       .order_by(Student.class_name).limit(1)).scalar()
+        results = {'dialect': db.engine.dialect.name, 'scores': total_scores, 'reports': {}}
+        for name in reports.REPORTS:
+            for label, filters in (('all', {}), ('one_class', {'class_name': one_class})):
+                started = time.perf_counter()
+                rows = sum(chunk.count(b'\n') for chunk in reports.report_csv(name, filters)) - 1
+                elapsed = time.perf_counter() - started
+                results['reports'][f'{name}:{label}'] = {
+                    'rows': rows,
+                    'seconds': round(elapsed, 3),
+                    'rows_per_sec': round(rows / elapsed) if elapsed else None,
+                    'max_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+                }
+                db.session.rollback()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['dialect']}, {results['scores']} bản ghi điểm")
+    for key, r in results['reports'].items():
+        print(f"  {key:22} {r['rows']:>9} dòng  {r['seconds']:8.2f}s  {r['rows_per_sec'] or 0:>9} dòng/s  "
+              f"RSS tối đa {r['max_rss_mb']} MB")
+
+
+if __name__ == '__main__':
+    main()
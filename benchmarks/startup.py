@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+Đo thời gian khởi động nguội (cold start) của một worker
+
+Mỗi lần đo chạy một tiến trình Python mới: import app (tương đương gunicorn nạp
+app:app) rồi phục vụ request đầu tiên (GET /login). Kết quả gồm thời gian import,
+thời gian tới request đầu tiên và số kết nối database đã mở trong lúc import.
+
+Chạy: python benchmarks/startup.py [--runs 10] [--bootstrap]
+  --bootstrap  chạy thêm bootstrap_db() sau khi import để so sánh với cách cũ
+               (mỗi worker tự tạo bảng và kiểm tra tài khoản mặc định).
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = r'''
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+app = app_module.app
+with app.app_context():
+    pool = app_module.db.engine.pool
+    connections = pool.checkedin() + pool.checkedout() if hasattr(pool, 'checkedin') else 0
+    if BOOTSTRAP:
+        app_module.bootstrap_db()
+bootstrapped = time.perf_counter()
+response = app.test_client().get('/login')
+finished = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'bootstrap_ms': (bootstrapped - imported) * 1000,
+    'first_request_ms': (finished - started) * 1000,
+    'status': response.status_code,
+    'connections_at_import': connections,
+}))
+'''
+
+
+def run_once(bootstrap):
+    code = CHILD.replace('BOOTSTRAP', 'True' if bootstrap else 'False')
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize(values):
+    values = sorted(values)
+    p95 = values[min(len(values) - 1, int(round(0.95 * (len(values) - 1))))]
+    return {'median': round(statistics.median(values), 1), 'p95': round(p95, 1),
+            'min': round(values[0], 1), 'max': round(values[-1], 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--bootstrap', action='store_true')
+    parser.add_argument('--json', action='store_true', help='In kết quả dạng JSON')
+    args = parser.parse_args()
+
+    samples = [run_once(args.bootstrap) for _ in range(args.runs)]
+    result = {
+        'runs': args.runs,
+        'bootstrap': args.bootstrap,
+        'import_ms': summarize([s['import_ms'] for s in samples]),
+        'bootstrap_ms': summarize([s['bootstrap_ms'] for s in samples]),
+        'first_request_ms': summarize([s['first_request_ms'] for s in samples]),
+        'connections_at_import': max(s['connections_at_import'] for s in samples),
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(f"Cold start ({args.runs} lần{', có bootstrap' if args.bootstrap else ''}):")
+    for key in ('import_ms', 'bootstrap_ms', 'first_request_ms'):
+        stats = result[key]
+        print(f"  {key:18} median={stats['median']:8.1f}  p95={stats['p95']:8.1f}  "
+              f"min={stats['min']:8.1f}  max={stats['max']:8.1f}")
+    print(f"  Kết nối DB mở khi import: {result['connections_at_import']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+"""
+Đo số byte gửi qua mạng của các trang nặng, không nén và có nén
+
+Script sinh database SQLite tạm bằng datagen rồi gọi từng trang trong PATHS qua
+Flask test client ba lần: không Accept-Encoding, gzip, và br (nếu đã cài
+Brotli); in kích thước body và tỉ lệ giảm. Nếu đã chạy `flask assets build`,
+in thêm tổng byte của các asset trong base.html ở lần tải đầu (các lần sau
+trình duyệt dùng cache vì Cache-Control immutable).
+
+Chạy: python benchmarks/wire_size.py [--students 5000] [--scores 100000]
+"""
+
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PATHS = ('/students', '/scores', '/subjects', '/teacher/dashboard', '/api/v1/students?limit=500')
+ASSET_LINK = re.compile(r'(?:href|src)="(/assets/[^"]+)"')
+
+
+def measure(client, path, encodings):
+    sizes = {}
+    for encoding in encodings:
+        headers = {'Accept-Encoding': encoding} if encoding != 'identity' else {}
+        response = client.get(path, headers=headers)
+        assert response.status_code == 200, (path, response.status_code)
+        assert response.headers.get('Content-Encoding', 'identity') in (encoding, 'identity'), path
+        sizes[encoding] = len(response.get_data())
+    return sizes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--students', type=int, default=5000)
+    parser.add_argument('--subjects', type=int, default=60)
+    parser.add_argument('--scores', type=int, default=100000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(APP_PROFILE='development',
+                          DATABASE_URL=f"sqlite:///{os.path.join(tmp, 'bench.db')}",
+                          COMPRESS_ENABLED='1',
+                          AUTH_RATE_LIMIT_USERNAME='1000000/1',
+                          AUTH_RATE_LIMIT_IP='1000000/1')
+        import app as app_module
+        import compression
+        import datagen
+
+        app = app_module.app
+        with app.app_context():
+            app_module.bootstrap_db()
+            datagen.generate(args.students, args.subjects, args.scores)
+            app_module.db.session.remove()
+
+        encodings = ['identity', 'gzip'] + (['br'] if compression.brotli is not None else [])
+        client = app.test_client()
+        client.post('/login', data={'username': 'teacher', 'password': 'teacher123'})
+        client.get('/teacher/dashboard')  # bỏ flash "đăng nhập thành công" khỏi lần đo
+
+        print(f"{'trang':32} " + ' '.join(f'{e:>10}' for e in encodings) + f" {'giảm':>7}")
+        for path in PATHS:
+            sizes = measure(client, path, encodings)
+            best = min(sizes.values())
+            print(f'{path:32} ' + ' '.join(f'{sizes[e]:10}' for e in encodings)
+                  + f" {sizes['identity'] / best:6.1f}x")
+
+        links = ASSET_LINK.findall(client.get('/students').get_data(as_text=True))
+        if links:
+            totals = dict.fromkeys(encodings, 0)
+            for link in links:
+                for encoding, size in measure(client, link, encodings).items():
+                    totals[encoding] += size
+            print(f"{'asset lần tải đầu (' + str(len(links)) + ' file)':32} "
+                  + ' '.join(f'{totals[e]:10}' for e in encodings)
+                  + f" {totals['identity'] / min(totals.values()):6.1f}x")
+        else:
+            print('Chưa build asset (flask assets build): trang đang dùng static/ hoặc CDN')
+
+        with app.app_context():
+            app_module.db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
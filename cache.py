@@ -0,0 +1,200 @@
+"""
+Cache kết quả truy vấn và fragment HTML theo thế hệ (generation) của bảng
+
+- Mỗi model được cache (Student, Subject, Score) có một số thế hệ lưu trong bảng
+  app_counter (tên 'generation:<bảng>'), dùng chung giữa các worker. Số này tăng
+  trong cùng transaction với thao tác ghi: event after_flush của Session cho thay
+  đổi qua ORM, do_orm_execute cho INSERT/UPDATE/DELETE hàng loạt chạy qua
+  db.session.execute (import sinh viên, nhập bảng điểm, tính lại điểm). Mỗi bảng
+  chỉ tăng một lần trong một transaction.
+- Khóa cache chứa thế hệ hiện tại của các bảng mà kết quả phụ thuộc: sau khi
+  ghi, khóa mới không khớp mục cũ nên không cần xóa cache; mục cũ bị đẩy ra
+  theo LRU. Thế hệ được đọc một lần mỗi request (truy vấn theo khóa chính).
+- LRU trong bộ nhớ của từng worker, giới hạn CACHE_MAX_ENTRIES mục và
+  CACHE_MAX_BYTES byte (ước lượng). CACHE_ENABLED=0 tắt cache.
+
+Ghi thẳng bằng Connection (không qua Session) phải tự gọi bump() trong cùng
+transaction.
+"""
+
+import pickle
+import threading
+from collections import OrderedDict
+
+from flask import current_app, g, has_app_context
+from markupsafe import Markup
+from sqlalchemy import event, select, update
+from sqlalchemy.orm import Session
+
+from models import db, AppCounter, Score, Student, Subject
+
+GENERATION_PREFIX = 'generation:'
+CACHED_MODELS = {model.__table__.name: model for model in (Student, Subject, Score)}
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+_MISSING = object()
+
+
+def generation_name(model):
+    return GENERATION_PREFIX + model.__table__.name
+
+
+GENERATION_NAMES = tuple(generation_name(model) for model in CACHED_MODELS.values())
+
+
+class LRUCache:
+    """LRU giới hạn số mục và tổng kích thước ước lượng, an toàn với nhiều thread"""
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, size):
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (value, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def stats(self):
+        with self._lock:
+            return {'entries': len(self._entries), 'max_entries': self.max_entries,
+                    'bytes': self.size, 'max_bytes': self.max_bytes,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+store = LRUCache()
+
+
+def init_app(app):
+    store.max_entries = app.config.get('CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES)
+    store.max_bytes = app.config.get('CACHE_MAX_BYTES', DEFAULT_MAX_BYTES)
+
+
+def setup_generations(conn):
+    """Tạo các dòng thế hệ còn thiếu trong app_counter (chạy bởi migration)"""
+    table = AppCounter.__table__
+    existing = set(conn.execute(select(table.c.name).where(table.c.name.in_(GENERATION_NAMES))).scalars())
+    for name in GENERATION_NAMES:
+        if name not in existing:
+            conn.execute(table.insert().values(name=name, value=0))
+
+
+def generations(*models):
+    """Thế hệ hiện tại của các model; đọc từ database một lần mỗi request"""
+    current = g.get('_cache_generations') if has_app_context() else None
+    if current is None:
+        rows = db.session.execute(select(AppCounter.name, AppCounter.value)
+                                  .where(AppCounter.name.in_(GENERATION_NAMES))).all()
+        current = {name: int(value) for name, value in rows}
+        if has_app_context():
+            g._cache_generations = current
+    return tuple(current.get(generation_name(model), 0) for model in models)
+
+
+def bump(connection, *models):
+    """Tăng thế hệ của các model trong transaction hiện tại của connection"""
+    table = AppCounter.__table__
+    connection.execute(update(table)
+                       .where(table.c.name.in_([generation_name(model) for model in models]))
+                       .values(value=table.c.value + 1))
+
+
+def _enabled():
+    return current_app.config.get('CACHE_ENABLED', True)
+
+
+def memoize(name, models, compute, *vary):
+    """
+    Kết quả compute() theo thế hệ của `models` và các giá trị `vary` (tham số
+    lọc...). Chỉ dùng cho dữ liệu thuần (dict/list/tuple), không phải đối tượng
+    ORM; người gọi không được sửa kết quả trả về.
+    """
+    if not _enabled():
+        return compute()
+    key = ('query', name, generations(*models), vary)
+    value = store.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        store.put(key, value, len(pickle.dumps(value, pickle.HIGHEST_PROTOCOL)))
+    return value
+
+
+def fragment(name, models, render, *vary):
+    """HTML do render() trả về (thường là render_template của một template con), cache như memoize"""
+    if not _enabled():
+        return Markup(render())
+    key = ('fragment', name, generations(*models), vary)
+    html = store.get(key, _MISSING)
+    if html is _MISSING:
+        html = Markup(render())
+        store.put(key, html, len(html))
+    return html
+
+
+def _bump_once(session, table_names, connection):
+    bumped = session.info.setdefault('_cache_bumped', set())
+    pending = [CACHED_MODELS[name] for name in table_names
+               if name in CACHED_MODELS and name not in bumped]
+    if pending:
+        bump(connection, *pending)
+        bumped.update(model.__table__.name for model in pending)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_after_flush(session, flush_context):
+    # Trong after_flush, new/dirty/deleted vẫn là trạng thái trước khi flush
+    changed = {type(obj).__table__.name for obj in (*session.new, *session.dirty, *session.deleted)}
+    if changed & CACHED_MODELS.keys():
+        _bump_once(session, changed, session.connection())
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bump_bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    table = getattr(orm_execute_state.statement, 'table', None)
+    if table is not None and table.name in CACHED_MODELS:
+        session = orm_execute_state.session
+        _bump_once(session, [table.name], session.connection(bind_arguments=orm_execute_state.bind_arguments))
+
+
+@event.listens_for(Session, 'after_transaction_end')
+def _reset_bumped(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('_cache_bumped', None)
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_generations(session):
+    if has_app_context():
+        g.pop('_cache_generations', None)
@@ -0,0 +1,175 @@
+"""
+Nhật ký thay đổi (change log) của student, subject, score cho đồng bộ hệ thống khác
+
+- Trigger trong database ghi một dòng change_log (bảng, id bản ghi, thao tác,
+  thời điểm) cho mỗi dòng được INSERT/UPDATE/DELETE, trong cùng transaction với
+  thay đổi. Mọi đường ghi đều được ghi nhận: ORM, insert/update hàng loạt qua
+  Core (import, nhập bảng điểm, tính lại điểm, flask seed) và cả SQL chạy tay.
+  PostgreSQL dùng trigger FOR EACH STATEMENT với transition table (một câu
+  INSERT ... SELECT cho cả lô), SQLite dùng trigger FOR EACH ROW.
+- Bản ghi bị xóa không còn trong bảng gốc; dòng 'delete' trong change_log là
+  tombstone, thời điểm của nó là deleted_at trong feed. Cột updated_at của ba
+  bảng (migration 0006) cho biết lần sửa cuối.
+- read_changes() đọc change_log theo id (cursor) và gộp nhiều thay đổi của cùng
+  bản ghi thành một; chi phí tỉ lệ với số thay đổi, không phụ thuộc kích thước
+  bảng. Trên PostgreSQL id lấy từ sequence lúc INSERT nên transaction commit
+  muộn có thể để lại "lỗ" id nhỏ hơn id đã thấy: feed dừng trước lỗ mới hơn
+  CHANGES_SETTLE_SECONDS để không bỏ sót, lỗ cũ hơn được coi là transaction đã
+  rollback.
+- purge() xóa nhật ký cũ; cursor nằm trong phần đã xóa bị từ chối
+  (CursorExpired) để client biết phải đồng bộ lại toàn bộ.
+"""
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import delete, func, select, text
+
+from models import db, AppCounter, ChangeLog
+
+TABLES = ('student', 'subject', 'score')
+OPS = ('insert', 'update', 'delete')
+PURGED_THROUGH = 'change_log:purged_through'
+DEFAULT_SETTLE_SECONDS = 60
+
+
+class CursorExpired(LookupError):
+    """Cursor cũ hơn phần nhật ký đã bị purge"""
+
+
+# --- Trigger ------------------------------------------------------------------
+
+_PG_FUNCTION = """
+CREATE OR REPLACE FUNCTION change_log_record() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO change_log (table_name, row_id, op, changed_at)
+        SELECT TG_TABLE_NAME, id, 'delete', clock_timestamp() AT TIME ZONE 'utc'
+        FROM old_rows ORDER BY id;
+    ELSE
+        INSERT INTO change_log (table_name, row_id, op, changed_at)
+        SELECT TG_TABLE_NAME, id, lower(TG_OP), clock_timestamp() AT TIME ZONE 'utc'
+        FROM new_rows ORDER BY id;
+    END IF;
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+# Thời điểm UTC cùng định dạng SQLAlchemy lưu DateTime trên SQLite (6 chữ số thập phân)
+_SQLITE_NOW = "strftime('%Y-%m-%d %H:%M:%f000', 'now')"
+
+
+def _setup_postgresql(conn):
+    conn.execute(text(_PG_FUNCTION))
+    for table in TABLES:
+        for op, transition in (('insert', 'NEW TABLE AS new_rows'), ('update', 'NEW TABLE AS new_rows'),
+                               ('delete', 'OLD TABLE AS old_rows')):
+            name = f'change_log_{table}_{op}'
+            conn.execute(text(f'DROP TRIGGER IF EXISTS {name} ON {table}'))
+            conn.execute(text(
+                f'CREATE TRIGGER {name} AFTER {op.upper()} ON {table} '
+                f'REFERENCING {transition} FOR EACH STATEMENT EXECUTE FUNCTION change_log_record()'
+            ))
+
+
+def _setup_sqlite(conn):
+    for table in TABLES:
+        for op, row in (('insert', 'new'), ('update', 'new'), ('delete', 'old')):
+            conn.execute(text(
+                f'CREATE TRIGGER IF NOT EXISTS change_log_{table}_{op} AFTER {op.upper()} ON {table} BEGIN '
+                f"INSERT INTO change_log (table_name, row_id, op, changed_at) "
+                f"VALUES ('{table}', {row}.id, '{op}', {_SQLITE_NOW}); END"
+            ))
+
+
+def setup_change_log(conn):
+    """
+    Tạo trigger ghi change_log và ghi một dòng 'insert' cho mỗi bản ghi đã có,
+    để client đồng bộ lần đầu từ since=0 (chạy bởi migration).
+    """
+    if conn.dialect.name == 'postgresql':
+        _setup_postgresql(conn)
+    elif conn.dialect.name == 'sqlite':
+        _setup_sqlite(conn)
+    else:
+        raise RuntimeError(f'Change log chưa hỗ trợ database {conn.dialect.name}')
+    now = datetime.utcnow()
+    for table in TABLES:
+        changed_at = 'COALESCE(updated_at, created_at, :now)' if table != 'subject' else 'COALESCE(updated_at, :now)'
+        conn.execute(text(
+            f'INSERT INTO change_log (table_name, row_id, op, changed_at) '
+            f"SELECT '{table}', id, 'insert', {changed_at} FROM {table} ORDER BY id"
+        ), {'now': now})
+
+
+# --- Đọc ----------------------------------------------------------------------
+
+def purged_through():
+    return db.session.execute(select(AppCounter.value).where(AppCounter.name == PURGED_THROUGH)).scalar() or 0
+
+
+def cursor_at(moment):
+    """Cursor bắt đầu từ các thay đổi tại/sau thời điểm `moment`"""
+    first = db.session.execute(select(func.min(ChangeLog.id)).where(ChangeLog.changed_at >= moment)).scalar()
+    if first is None:
+        return db.session.execute(select(func.max(ChangeLog.id))).scalar() or 0
+    return first - 1
+
+
+def read_changes(since, limit, tables=None):
+    """
+    Đọc tối đa `limit` dòng nhật ký sau cursor `since`. Trả về (changes,
+    next_cursor, has_more): changes là danh sách dict {cursor, table, id, op,
+    changed_at, created}, mỗi bản ghi một lần với thay đổi cuối cùng (cursor lớn
+    nhất), theo thứ tự cursor; `created` cho biết bản ghi được tạo trong đoạn này.
+    `tables` lọc theo bảng nhưng cursor vẫn tiến qua các dòng bị lọc.
+    """
+    if since < purged_through():
+        raise CursorExpired(f'Nhật ký trước cursor {purged_through()} đã bị xóa, cần đồng bộ lại toàn bộ')
+    rows = db.session.execute(
+        select(ChangeLog.id, ChangeLog.table_name, ChangeLog.row_id, ChangeLog.op, ChangeLog.changed_at)
+        .where(ChangeLog.id > since).order_by(ChangeLog.id).limit(limit)).all()
+
+    settle = current_app.config.get('CHANGES_SETTLE_SECONDS', DEFAULT_SETTLE_SECONDS)
+    recent = datetime.utcnow() - timedelta(seconds=settle)
+    latest = {}
+    next_cursor = since
+    has_more = len(rows) == limit
+    for row in rows:
+        if row.id != next_cursor + 1 and row.changed_at > recent:
+            # id nhỏ hơn thuộc transaction chưa commit: dừng lại, lần đọc sau tiếp tục từ đây
+            has_more = True
+            break
+        next_cursor = row.id
+        if tables and row.table_name not in tables:
+            continue
+        key = (row.table_name, row.row_id)
+        previous = latest.pop(key, None)
+        latest[key] = {
+            'cursor': row.id,
+            'table': row.table_name,
+            'id': row.row_id,
+            'op': row.op,
+            'changed_at': row.changed_at,
+            'created': row.op == 'insert' or bool(previous and previous['created']),
+        }
+    return list(latest.values()), next_cursor, has_more
+
+
+# --- Dọn dẹp ------------------------------------------------------------------
+
+def purge(days):
+    """Xóa nhật ký cũ hơn `days` ngày; trả về số dòng đã xóa"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    last_id = db.session.execute(select(func.max(ChangeLog.id)).where(ChangeLog.changed_at < cutoff)).scalar()
+    if last_id is None:
+        return 0
+    deleted = db.session.execute(delete(ChangeLog).where(ChangeLog.id <= last_id)).rowcount
+    marker = db.session.get(AppCounter, PURGED_THROUGH)
+    if marker is None:
+        db.session.add(AppCounter(name=PURGED_THROUGH, value=last_id))
+    else:
+        marker.value = max(marker.value, last_id)
+    db.session.commit()
+    return deleted
@@ -0,0 +1,87 @@
+"""
+Nén response động (brotli/gzip) theo Accept-Encoding của client
+
+- Chỉ nén response kiểu văn bản (HTML, JSON, CSV, JS, CSS, SVG...) có kích
+  thước từ COMPRESS_MIN_SIZE byte trở lên: response nhỏ hơn nén gần như không
+  giảm byte mà vẫn tốn CPU.
+- Ưu tiên brotli (COMPRESS_BROTLI_QUALITY) nếu đã cài gói Brotli và client chấp
+  nhận, nếu không dùng gzip (COMPRESS_LEVEL). Mức mặc định ưu tiên tốc độ vì
+  nén chạy ở mỗi request; asset tĩnh được nén sẵn ở mức cao nhất (xem assets.py).
+- Bỏ qua response dạng luồng hoặc file (export CSV, file tác vụ, asset tĩnh):
+  nội dung không nằm trong bộ nhớ, asset đã có bản nén sẵn.
+- ETag mạnh được đổi thành ETag yếu (W/"...") như nginx vì byte gửi đi khác nội
+  dung gốc; If-None-Match so sánh yếu nên 304 của API vẫn hoạt động.
+"""
+
+import gzip
+
+try:
+    import brotli
+except ImportError:  # Brotli là tùy chọn: thiếu thì chỉ dùng gzip
+    brotli = None
+
+from flask import current_app, request
+
+COMPRESSIBLE_TYPES = frozenset({
+    'application/json',
+    'application/javascript',
+    'application/x-ndjson',
+    'application/xml',
+    'image/svg+xml',
+})
+# Không có body (204, 304) hoặc là một phần của file (206)
+SKIPPED_STATUSES = frozenset({204, 206, 304})
+
+
+def choose_encoding(accept_encodings):
+    """'br', 'gzip' hoặc None theo header Accept-Encoding (đã parse)"""
+    if brotli is not None and accept_encodings['br']:
+        return 'br'
+    if accept_encodings['gzip']:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding, level=6, brotli_quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=brotli_quality)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def _compressible(response):
+    return response.mimetype.startswith('text/') or response.mimetype in COMPRESSIBLE_TYPES
+
+
+def _weaken_etag(response):
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+
+def _compress_response(response):
+    if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+            or 'Content-Encoding' in response.headers or not _compressible(response)):
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.accept_encodings)
+    if encoding is None:
+        return response
+    if response.status_code in SKIPPED_STATUSES:
+        # 304 mang cùng ETag (yếu) với bản 200 đã nén mà client đang giữ
+        _weaken_etag(response)
+        return response
+
+    data = response.get_data()
+    config = current_app.config
+    if len(data) < config['COMPRESS_MIN_SIZE']:
+        return response
+    response.set_data(compress(data, encoding, config['COMPRESS_LEVEL'], config['COMPRESS_BROTLI_QUALITY']))
+    response.headers['Content-Encoding'] = encoding
+    _weaken_etag(response)
+    return response
+
+
+def init_app(app):
+    """Đăng ký hook nén (nếu COMPRESS_ENABLED); gọi sau profiling.init_app để thời gian nén được đo"""
+    if app.config.get('COMPRESS_ENABLED', True):
+        app.after_request(_compress_response)
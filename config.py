@@ -0,0 +1,225 @@
+"""
+Cấu hình ứng dụng theo profile triển khai
+
+APP_PROFILE chọn bộ giá trị mặc định (development | production | testing); từng
+giá trị có thể ghi đè bằng biến môi trường:
+
+- DATABASE_URL, DATABASE_REPLICA_URL (read-replica cho các view chỉ đọc)
+- DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE: pool kết nối
+  của mỗi worker; tổng kết nối tối đa = số worker x (pool_size + max_overflow)
+- DB_STATEMENT_TIMEOUT_MS: statement_timeout của PostgreSQL
+- SQLITE_WAL: bật WAL + các pragma cho SQLite (1/0)
+- REPLICA_STICKY_SECONDS: sau khi ghi, các request của cùng người dùng đọc từ
+  primary trong khoảng thời gian này để luôn thấy dữ liệu vừa ghi
+- METRICS_ENABLED, METRICS_TOKEN, NPLUSONE_THRESHOLD: đo request/SQL và /metrics
+- PROFILE_REQUESTS, PROFILER, PROFILE_DIR: profile một request (xem profiling.py)
+- JOB_EXECUTOR (queue | inline), JOB_WORKERS, JOB_DIR, JOB_CHUNK_ROWS,
+  JOB_POLL_INTERVAL, JOB_STALE_SECONDS: tác vụ nền (xem jobs.py)
+- ASGI_WSGI_THREADS: số thread chạy các route đồng bộ ở chế độ ASGI (xem asgi.py)
+- CACHE_ENABLED, CACHE_MAX_ENTRIES, CACHE_MAX_BYTES: cache truy vấn/fragment
+  theo thế hệ bảng (xem cache.py)
+- COMPRESS_ENABLED, COMPRESS_MIN_SIZE, COMPRESS_LEVEL, COMPRESS_BROTLI_QUALITY:
+  nén response động (xem compression.py)
+- ANALYTICS_DIR, ANALYTICS_OVERLAP_SECONDS: snapshot Parquet cho truy vấn phân
+  tích (xem analytics.py)
+- CHANGES_SETTLE_SECONDS: feed /api/v1/changes chờ transaction commit muộn tối
+  đa bao lâu (xem changes.py)
+"""
+
+import os
+import tempfile
+
+from sqlalchemy.engine import make_url
+
+import database
+
+PROFILES = {
+    'development': {
+        'DATABASE_URL': 'sqlite:///students.db',
+        'DB_POOL_SIZE': 5,
+        'DB_MAX_OVERFLOW': 5,
+        'DB_POOL_TIMEOUT': 10,
+        'DB_POOL_RECYCLE': 300,
+        'DB_STATEMENT_TIMEOUT_MS': 30000,
+        'SQLITE_WAL': True,
+        'REPLICA_STICKY_SECONDS': 5,
+        'METRICS_ENABLED': True,
+        'PROFILE_REQUESTS': True,
+        'JOB_EXECUTOR': 'queue',
+        'CACHE_ENABLED': True,
+        'COMPRESS_ENABLED': True,
+    },
+    'production': {
+        'DATABASE_URL': 'sqlite:///students.db',
+        'DB_POOL_SIZE': 10,
+        'DB_MAX_OVERFLOW': 10,
+        'DB_POOL_TIMEOUT': 30,
+        'DB_POOL_RECYCLE': 300,
+        'DB_STATEMENT_TIMEOUT_MS': 30000,
+        'SQLITE_WAL': True,
+        'REPLICA_STICKY_SECONDS': 5,
+        'METRICS_ENABLED': True,
+        'PROFILE_REQUESTS': False,
+        'JOB_EXECUTOR': 'queue',
+        'CACHE_ENABLED': True,
+        'COMPRESS_ENABLED': True,
+    },
+    'testing': {
+        'DATABASE_URL': 'sqlite://',
+        'DB_POOL_SIZE': 2,
+        'DB_MAX_OVERFLOW': 0,
+        'DB_POOL_TIMEOUT': 5,
+        'DB_POOL_RECYCLE': 300,
+        'DB_STATEMENT_TIMEOUT_MS': 30000,
+        'SQLITE_WAL': False,
+        'REPLICA_STICKY_SECONDS': 0,
+        'METRICS_ENABLED': False,
+        'PROFILE_REQUESTS': False,
+        'JOB_EXECUTOR': 'inline',
+        'CACHE_ENABLED': False,
+        'COMPRESS_ENABLED': False,
+    },
+}
+
+DEFAULT_PROFILE = 'development'
+
+
+def normalize_database_url(database_url):
+    # Fix postgres:// to postgresql:// for SQLAlchemy
+    if database_url.startswith('postgres://'):
+        database_url = database_url.replace('postgres://', 'postgresql://', 1)
+
+    # For Render internal URLs, use postgresql+psycopg2://
+    if 'render.com' in database_url and not database_url.startswith('postgresql+psycopg2://'):
+        database_url = database_url.replace('postgresql://', 'postgresql+psycopg2://', 1)
+    return database_url
+
+
+def _setting(defaults, name, cast=int):
+    value = os.environ.get(name)
+    if value is None or value == '':
+        return defaults[name]
+    if cast is bool:
+        return value.strip().lower() in ('1', 'true', 'yes', 'on')
+    return cast(value)
+
+
+def engine_options(database_url, settings):
+    """SQLALCHEMY_ENGINE_OPTIONS phù hợp với loại database của URL"""
+    url = make_url(database_url)
+    options = {}
+    if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+        # SQLite trong bộ nhớ dùng StaticPool (một kết nối), không có tham số pool
+        return options
+
+    options.update({
+        'poolclass': database.TimedQueuePool,
+        'pool_pre_ping': True,
+        'pool_recycle': settings['DB_POOL_RECYCLE'],
+        'pool_size': settings['DB_POOL_SIZE'],
+        'max_overflow': settings['DB_MAX_OVERFLOW'],
+        'pool_timeout': settings['DB_POOL_TIMEOUT'],
+    })
+    if url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {
+            'connect_timeout': 10,
+            'options': f"-c statement_timeout={settings['DB_STATEMENT_TIMEOUT_MS']}",
+        }
+    return options
+
+
+ASYNC_DRIVERS = {
+    'postgresql': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def async_database_url(database_url):
+    """URL tương ứng dùng driver async (asyncpg / aiosqlite) cho chế độ ASGI"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'Chế độ ASGI chưa hỗ trợ database {backend}')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def async_engine_options(database_url, settings):
+    """Tham số engine async: cùng kích thước pool, connect_args theo cú pháp asyncpg"""
+    options = engine_options(database_url, settings)
+    # Engine async phải dùng AsyncAdaptedQueuePool mặc định
+    options.pop('poolclass', None)
+    if 'connect_args' in options:
+        options['connect_args'] = {
+            'timeout': 10,
+            'server_settings': {'statement_timeout': str(settings['DB_STATEMENT_TIMEOUT_MS'])},
+        }
+    return options
+
+
+def load_config(profile=None):
+    """Dựng dict cấu hình Flask cho profile (mặc định lấy từ APP_PROFILE)"""
+    profile = profile or os.environ.get('APP_PROFILE', DEFAULT_PROFILE)
+    if profile not in PROFILES:
+        raise ValueError(f"APP_PROFILE không hợp lệ: {profile} (chọn một trong: {', '.join(PROFILES)})")
+    defaults = PROFILES[profile]
+
+    settings = {
+        'DB_POOL_SIZE': _setting(defaults, 'DB_POOL_SIZE'),
+        'DB_MAX_OVERFLOW': _setting(defaults, 'DB_MAX_OVERFLOW'),
+        'DB_POOL_TIMEOUT': _setting(defaults, 'DB_POOL_TIMEOUT', float),
+        'DB_POOL_RECYCLE': _setting(defaults, 'DB_POOL_RECYCLE'),
+        'DB_STATEMENT_TIMEOUT_MS': _setting(defaults, 'DB_STATEMENT_TIMEOUT_MS'),
+        'SQLITE_WAL': _setting(defaults, 'SQLITE_WAL', bool),
+        'REPLICA_STICKY_SECONDS': _setting(defaults, 'REPLICA_STICKY_SECONDS', float),
+        'METRICS_ENABLED': _setting(defaults, 'METRICS_ENABLED', bool),
+        'PROFILE_REQUESTS': _setting(defaults, 'PROFILE_REQUESTS', bool),
+        'JOB_EXECUTOR': _setting(defaults, 'JOB_EXECUTOR', str),
+        'CACHE_ENABLED': _setting(defaults, 'CACHE_ENABLED', bool),
+        'COMPRESS_ENABLED': _setting(defaults, 'COMPRESS_ENABLED', bool),
+    }
+    database_url = normalize_database_url(os.environ.get('DATABASE_URL') or defaults['DATABASE_URL'])
+
+    config = dict(settings)
+    config.update({
+        'APP_PROFILE': profile,
+        'TESTING': profile == 'testing',
+        'SECRET_KEY': os.environ.get('SECRET_KEY', 'dev-secret-key-change-in-production'),
+        'SQLALCHEMY_DATABASE_URI': database_url,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(database_url, settings),
+        'COUNTER_BACKEND': os.environ.get('COUNTER_BACKEND', 'table'),
+        'COUNTER_CACHE_TTL': int(os.environ.get('COUNTER_CACHE_TTL', 30)),
+        'USER_CACHE_SIZE': int(os.environ.get('USER_CACHE_SIZE', 1024)),
+        'USER_CACHE_TTL': int(os.environ.get('USER_CACHE_TTL', 60)),
+        'AUTH_HASH_WORKERS': int(os.environ.get('AUTH_HASH_WORKERS', 2)),
+        'AUTH_HASH_QUEUE': int(os.environ.get('AUTH_HASH_QUEUE', 8)),
+        'AUTH_HASH_METHOD': os.environ.get('AUTH_HASH_METHOD', 'scrypt:32768:8:1'),
+        'AUTH_RATE_LIMIT_USERNAME': os.environ.get('AUTH_RATE_LIMIT_USERNAME', '5/60'),
+        'AUTH_RATE_LIMIT_IP': os.environ.get('AUTH_RATE_LIMIT_IP', '30/60'),
+        'METRICS_TOKEN': os.environ.get('METRICS_TOKEN', ''),
+        'NPLUSONE_THRESHOLD': int(os.environ.get('NPLUSONE_THRESHOLD', 10)),
+        'PROFILER': os.environ.get('PROFILER', 'cprofile'),
+        'PROFILE_DIR': os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'student-profiles')),
+        'JOB_WORKERS': int(os.environ.get('JOB_WORKERS', os.cpu_count() or 1)),
+        'JOB_DIR': os.environ.get('JOB_DIR', os.path.join(tempfile.gettempdir(), 'student-jobs')),
+        'JOB_CHUNK_ROWS': int(os.environ.get('JOB_CHUNK_ROWS', 20000)),
+        'JOB_POLL_INTERVAL': float(os.environ.get('JOB_POLL_INTERVAL', 1.0)),
+        'JOB_STALE_SECONDS': int(os.environ.get('JOB_STALE_SECONDS', 900)),
+        'ASGI_WSGI_THREADS': int(os.environ.get('ASGI_WSGI_THREADS', 8)),
+        'CACHE_MAX_ENTRIES': int(os.environ.get('CACHE_MAX_ENTRIES', 2048)),
+        'CACHE_MAX_BYTES': int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024)),
+        'COMPRESS_MIN_SIZE': int(os.environ.get('COMPRESS_MIN_SIZE', 1024)),
+        'COMPRESS_LEVEL': int(os.environ.get('COMPRESS_LEVEL', 6)),
+        'COMPRESS_BROTLI_QUALITY': int(os.environ.get('COMPRESS_BROTLI_QUALITY', 4)),
+        'ANALYTICS_DIR': os.environ.get('ANALYTICS_DIR', os.path.join(tempfile.gettempdir(), 'student-analytics')),
+        'ANALYTICS_OVERLAP_SECONDS': int(os.environ.get('ANALYTICS_OVERLAP_SECONDS', 300)),
+        'CHANGES_SETTLE_SECONDS': int(os.environ.get('CHANGES_SETTLE_SECONDS', 60)),
+    })
+
+    replica_url = os.environ.get('DATABASE_REPLICA_URL')
+    if replica_url:
+        replica_url = normalize_database_url(replica_url)
+        config['SQLALCHEMY_BINDS'] = {
+            database.REPLICA_BIND: dict(engine_options(replica_url, settings), url=replica_url),
+        }
+    return config
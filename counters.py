@@ -0,0 +1,208 @@
+"""
+Bộ đếm cho dashboard (tổng sinh viên, sinh viên đang học, môn học, bản ghi điểm)
+
+Thay vì COUNT(*) trên các bảng lớn mỗi lần tải trang, các con số được lưu trong
+bảng app_counter và cộng/trừ trong cùng transaction với thao tác ghi (event của
+ORM, hoặc gọi adjust() ở các đường ghi hàng loạt bỏ qua ORM). UPDATE/DELETE hàng
+loạt qua db.session.execute được tính tự động: DELETE trừ theo số dòng bị xóa,
+số sinh viên đang học được đếm lại (COUNT theo index trạng thái). Mỗi worker
+giữ một bản sao trong bộ nhớ với TTL ngắn; commit của chính worker đó xóa bản
+sao ngay nên người vừa ghi luôn thấy số mới.
+
+Config:
+- COUNTER_BACKEND: 'table' (mặc định, dùng chung giữa các worker) hoặc 'local'
+  (không có bảng dùng chung, đếm lại bằng COUNT(*) khi bản sao hết hạn).
+- COUNTER_CACHE_TTL: số giây giữ bản sao trong bộ nhớ (mặc định 30).
+"""
+
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event, func, inspect, select, update
+from sqlalchemy.orm import Session
+
+from models import db, AppCounter, Score, Student, Subject
+
+TOTAL_STUDENTS = 'total_students'
+ACTIVE_STUDENTS = 'active_students'
+TOTAL_SUBJECTS = 'total_subjects'
+TOTAL_SCORES = 'total_scores'
+COUNTER_NAMES = (TOTAL_STUDENTS, ACTIVE_STUDENTS, TOTAL_SUBJECTS, TOTAL_SCORES)
+
+DEFAULT_TTL = 30
+
+
+class _LocalCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._expires_at = 0.0
+
+    def get(self):
+        with self._lock:
+            if self._values is not None and time.monotonic() < self._expires_at:
+                return dict(self._values)
+        return None
+
+    def set(self, values, ttl):
+        with self._lock:
+            self._values = dict(values)
+            self._expires_at = time.monotonic() + ttl
+
+    def invalidate(self):
+        with self._lock:
+            self._values = None
+
+
+_cache = _LocalCache()
+
+
+def _backend():
+    return current_app.config.get('COUNTER_BACKEND', 'table')
+
+
+def _count_all(connection):
+    """Đếm chính xác bằng COUNT(*) - chỉ dùng khi dựng lại hoặc ở backend 'local'"""
+    return {
+        TOTAL_STUDENTS: connection.execute(select(func.count()).select_from(Student)).scalar(),
+        ACTIVE_STUDENTS: connection.execute(
+            select(func.count()).select_from(Student).where(Student.status == 'active')).scalar(),
+        TOTAL_SUBJECTS: connection.execute(select(func.count()).select_from(Subject)).scalar(),
+        TOTAL_SCORES: connection.execute(select(func.count()).select_from(Score)).scalar(),
+    }
+
+
+def get_counts():
+    """Các bộ đếm dashboard, đọc từ bộ nhớ nếu còn hạn"""
+    values = _cache.get()
+    if values is not None:
+        return values
+
+    if _backend() == 'table':
+        rows = db.session.execute(
+            select(AppCounter.name, AppCounter.value).where(AppCounter.name.in_(COUNTER_NAMES))
+        ).all()
+        values = {name: 0 for name in COUNTER_NAMES}
+        values.update({name: int(value) for name, value in rows})
+    else:
+        values = _count_all(db.session.connection())
+    _cache.set(values, current_app.config.get('COUNTER_CACHE_TTL', DEFAULT_TTL))
+    return values
+
+
+def current(name):
+    """Giá trị mới nhất của một bộ đếm, không qua bản sao trong bộ nhớ"""
+    if _backend() == 'table':
+        value = db.session.execute(select(AppCounter.value).where(AppCounter.name == name)).scalar()
+        return int(value or 0)
+    return _count_all(db.session.connection())[name]
+
+
+def adjust(connection, name, delta):
+    """Cộng delta vào bộ đếm trong transaction hiện tại của connection"""
+    if not delta or _backend() != 'table':
+        return
+    table = AppCounter.__table__
+    connection.execute(update(table).where(table.c.name == name)
+                       .values(value=table.c.value + delta))
+
+
+def rebuild(connection=None):
+    """Đếm lại chính xác toàn bộ bộ đếm và ghi vào bảng app_counter"""
+    connection = connection if connection is not None else db.session.connection()
+    values = _count_all(connection)
+    table = AppCounter.__table__
+    existing = set(connection.execute(select(table.c.name)).scalars())
+    for name, value in values.items():
+        if name in existing:
+            connection.execute(update(table).where(table.c.name == name).values(value=value))
+        else:
+            connection.execute(table.insert().values(name=name, value=value))
+    _cache.invalidate()
+    return values
+
+
+@event.listens_for(Student, 'after_insert')
+def _student_inserted(mapper, connection, target):
+    adjust(connection, TOTAL_STUDENTS, 1)
+    if target.status == 'active':
+        adjust(connection, ACTIVE_STUDENTS, 1)
+
+
+@event.listens_for(Student, 'after_update')
+def _student_updated(mapper, connection, target):
+    history = inspect(target).attrs.status.history
+    if not history.has_changes():
+        return
+    was_active = 'active' in (history.deleted or ())
+    if was_active != (target.status == 'active'):
+        adjust(connection, ACTIVE_STUDENTS, -1 if was_active else 1)
+
+
+@event.listens_for(Student, 'after_delete')
+def _student_deleted(mapper, connection, target):
+    adjust(connection, TOTAL_STUDENTS, -1)
+    # Trạng thái đang lưu trong DB (bỏ qua thay đổi chưa flush nếu có)
+    history = inspect(target).attrs.status.history
+    stored_status = history.deleted[0] if history.deleted else target.status
+    if stored_status == 'active':
+        adjust(connection, ACTIVE_STUDENTS, -1)
+
+
+@event.listens_for(Subject, 'after_insert')
+def _subject_inserted(mapper, connection, target):
+    adjust(connection, TOTAL_SUBJECTS, 1)
+
+
+@event.listens_for(Subject, 'after_delete')
+def _subject_deleted(mapper, connection, target):
+    adjust(connection, TOTAL_SUBJECTS, -1)
+
+
+@event.listens_for(Score, 'after_insert')
+def _score_inserted(mapper, connection, target):
+    adjust(connection, TOTAL_SCORES, 1)
+
+
+@event.listens_for(Score, 'after_delete')
+def _score_deleted(mapper, connection, target):
+    adjust(connection, TOTAL_SCORES, -1)
+
+
+def _recount_active(connection):
+    table = AppCounter.__table__
+    active = connection.execute(
+        select(func.count()).select_from(Student).where(Student.status == 'active')).scalar()
+    connection.execute(update(table).where(table.c.name == ACTIVE_STUDENTS).values(value=active))
+
+
+_BULK_DELETE_COUNTERS = {
+    Student.__table__.name: TOTAL_STUDENTS,
+    Subject.__table__.name: TOTAL_SUBJECTS,
+    Score.__table__.name: TOTAL_SCORES,
+}
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _bulk_write(orm_execute_state):
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return None
+    table = getattr(orm_execute_state.statement, 'table', None)
+    name = _BULK_DELETE_COUNTERS.get(getattr(table, 'name', None))
+    if name is None or (orm_execute_state.is_update and name != TOTAL_STUDENTS):
+        return None
+    # invoke_statement chạy cả các handler do_orm_execute còn lại (cache.py)
+    result = orm_execute_state.invoke_statement()
+    connection = orm_execute_state.session.connection(bind_arguments=orm_execute_state.bind_arguments)
+    if orm_execute_state.is_delete:
+        adjust(connection, name, -result.rowcount)
+    if name == TOTAL_STUDENTS and _backend() == 'table':
+        # Không biết trạng thái cũ của từng dòng nên đếm lại
+        _recount_active(connection)
+    return result
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    _cache.invalidate()
@@ -0,0 +1,141 @@
+"""
+Engine và pool kết nối database
+
+- TimedQueuePool: QueuePool ghi lại thời gian chờ lấy kết nối để xem trên
+  /admin/pool-stats (số liệu theo từng worker).
+- SQLite: bật WAL và các pragma phù hợp cho chạy local / một node.
+- Read-replica: view gắn @read_replica đọc từ bind 'replica' (nếu có cấu hình
+  DATABASE_REPLICA_URL); flush/ghi luôn đi vào primary. Sau khi một request ghi
+  dữ liệu, người dùng đó đọc từ primary trong REPLICA_STICKY_SECONDS giây.
+"""
+
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.pool import QueuePool
+
+REPLICA_BIND = 'replica'
+PRIMARY_UNTIL_KEY = '_db_primary_until'
+
+SQLITE_PRAGMAS = (
+    ('journal_mode', 'WAL'),
+    ('synchronous', 'NORMAL'),
+    ('busy_timeout', '5000'),
+    ('temp_store', 'MEMORY'),
+    ('cache_size', '-20000'),
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool đo thời gian chờ khi lấy kết nối"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except Exception:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with self._stats_lock:
+                self.checkouts += 1
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'pool_size': self.size(),
+                'max_overflow': self._max_overflow,
+                'timeout': self._timeout,
+                'checked_in': self.checkedin(),
+                'checked_out': self.checkedout(),
+                'overflow': self.overflow(),
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': round(self.wait_total / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'wait_max_ms': round(self.wait_max * 1000, 3),
+            }
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for name, value in SQLITE_PRAGMAS:
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+class RoutingSession(Session):
+    """Session của Flask-SQLAlchemy, chuyển truy vấn đọc sang replica khi được bật"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context()
+                and g.get('db_use_replica')):
+            engine = self._db.engines.get(REPLICA_BIND)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _remember_write(session_, flush_context):
+    if has_request_context():
+        g.db_wrote = True
+
+
+def read_replica(view):
+    """Cho view chỉ đọc dùng read-replica (nếu có cấu hình và người dùng vừa không ghi)"""
+    @wraps(view)
+    def decorated_function(*args, **kwargs):
+        if session.get(PRIMARY_UNTIL_KEY, 0) <= time.time():
+            g.db_use_replica = True
+        return view(*args, **kwargs)
+    return decorated_function
+
+
+def _stick_to_primary(response):
+    sticky = current_app.config.get('REPLICA_STICKY_SECONDS', 0)
+    if g.get('db_wrote') and sticky and REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        session[PRIMARY_UNTIL_KEY] = time.time() + sticky
+    return response
+
+
+def configure_engine(app, engine):
+    """Gắn pragma SQLite (nếu bật SQLITE_WAL) cho engine"""
+    if engine.dialect.name == 'sqlite' and app.config.get('SQLITE_WAL'):
+        event.listen(engine, 'connect', _set_sqlite_pragmas)
+
+
+def init_app(app, db):
+    """Gắn pragma SQLite và cơ chế read-your-writes cho replica; không mở kết nối"""
+    with app.app_context():
+        for engine in db.engines.values():
+            configure_engine(app, engine)
+    app.after_request(_stick_to_primary)
+
+
+def pool_stats(db):
+    """Trạng thái pool của từng engine trong worker hiện tại"""
+    result = {}
+    for key, engine in db.engines.items():
+        pool = engine.pool
+        name = 'primary' if key is None else key
+        if isinstance(pool, TimedQueuePool):
+            result[name] = dict(pool.stats(), pool_class=type(pool).__name__)
+        else:
+            result[name] = {'pool_class': type(pool).__name__, 'status': pool.status()}
+    return result
@@ -0,0 +1,275 @@
+"""
+Sinh dữ liệu tổng hợp quy mô lớn cho môi trường phát triển và đo hiệu năng
+
+generate() tạo N sinh viên, M môn học và K bản ghi điểm trông giống dữ liệu
+thật: họ tên tiếng Việt theo tần suất họ phổ biến, tên đệm/tên theo giới tính,
+lớp theo ngành và khóa, điểm thuộc các học kỳ HK1/HK2/HK3 kể từ năm nhập học
+(học kỳ hè ít bản ghi hơn, nên các năm sau có nhiều bản ghi hơn), điểm phụ thuộc
+năng lực sinh viên và độ khó môn học.
+
+Dữ liệu được ghi bằng insert hàng loạt qua Core (bỏ qua event ORM); sau đó
+đếm lại bộ đếm dashboard và tính lại bảng tổng hợp GPA. Có thể chạy nhiều lần:
+mã SV / mã môn mới được đánh tiếp sau các bản ghi đã có.
+
+Chạy: flask --app app seed --students 20000 --subjects 100 --scores 1000000
+"""
+
+import csv
+import io
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert, select
+
+import counters
+import gpa
+import grading
+from importer import OPTIONAL_COLUMNS, REQUIRED_COLUMNS
+from models import db, Score, Student, Subject
+from search import build_search_text, fold_text
+
+BATCH_SIZE = 10000
+CLASS_SIZE = 50
+STUDENT_PREFIX = 'SV'
+SUBJECT_PREFIX = 'HP'
+
+# (họ, tỉ trọng) - xấp xỉ tần suất các họ phổ biến ở Việt Nam
+SURNAMES = [
+    ('Nguyễn', 38), ('Trần', 11), ('Lê', 9.5), ('Phạm', 7), ('Hoàng', 4), ('Huỳnh', 4),
+    ('Phan', 4.5), ('Vũ', 3.9), ('Võ', 3), ('Đặng', 2.1), ('Bùi', 2), ('Đỗ', 1.4),
+    ('Hồ', 1.3), ('Ngô', 1.3), ('Dương', 1), ('Lý', 0.5), ('Đinh', 0.6), ('Trương', 0.6),
+    ('Lâm', 0.4), ('Mai', 0.4), ('Tạ', 0.3), ('Cao', 0.3), ('Lương', 0.3), ('Trịnh', 0.3),
+]
+MIDDLE_NAMES = {
+    'male': ['Văn', 'Hữu', 'Đức', 'Minh', 'Quang', 'Thanh', 'Công', 'Xuân', 'Gia', 'Tuấn',
+             'Hoàng', 'Anh', 'Quốc', 'Trọng', 'Ngọc', 'Đình'],
+    'female': ['Thị', 'Ngọc', 'Thu', 'Thanh', 'Minh', 'Khánh', 'Phương', 'Hồng', 'Bảo',
+               'Mai', 'Thùy', 'Kim', 'Diệu', 'Hoài', 'Quỳnh', 'Như'],
+}
+GIVEN_NAMES = {
+    'male': ['An', 'Bảo', 'Bình', 'Cường', 'Dũng', 'Duy', 'Đạt', 'Hải', 'Hiếu', 'Hoàng',
+             'Hùng', 'Huy', 'Khang', 'Khoa', 'Kiên', 'Long', 'Lộc', 'Minh', 'Nam', 'Nghĩa',
+             'Phát', 'Phong', 'Phúc', 'Quân', 'Sơn', 'Tài', 'Thắng', 'Thành', 'Thịnh', 'Trung',
+             'Tú', 'Tuấn', 'Việt', 'Vinh', 'Vũ'],
+    'female': ['Anh', 'Châu', 'Chi', 'Dung', 'Giang', 'Hà', 'Hạnh', 'Hằng', 'Hiền', 'Hoa',
+               'Huyền', 'Hương', 'Lan', 'Linh', 'Loan', 'Mai', 'My', 'Ngân', 'Ngọc', 'Nhi',
+               'Nhung', 'Oanh', 'Phương', 'Quyên', 'Tâm', 'Thảo', 'Thu', 'Trang', 'Trâm', 'Uyên',
+               'Vân', 'Vy', 'Yến'],
+}
+# (tên ngành, viết tắt dùng cho tên lớp, tỉ trọng)
+MAJORS = [
+    ('Công nghệ thông tin', 'CNTT', 30), ('Kỹ thuật phần mềm', 'KTPM', 20),
+    ('Khoa học máy tính', 'KHMT', 15), ('Hệ thống thông tin', 'HTTT', 10),
+    ('An toàn thông tin', 'ATTT', 8), ('Khoa học dữ liệu', 'KHDL', 8),
+    ('Mạng máy tính', 'MMT', 5), ('Trí tuệ nhân tạo', 'TTNT', 4),
+]
+SUBJECT_NAMES = [
+    'Lập trình căn bản', 'Cấu trúc dữ liệu và giải thuật', 'Cơ sở dữ liệu', 'Mạng máy tính',
+    'Công nghệ web', 'Toán rời rạc', 'Giải tích', 'Đại số tuyến tính', 'Xác suất thống kê',
+    'Kiến trúc máy tính', 'Hệ điều hành', 'Lập trình hướng đối tượng', 'Phân tích thiết kế hệ thống',
+    'Công nghệ phần mềm', 'Kiểm thử phần mềm', 'Trí tuệ nhân tạo', 'Học máy', 'Xử lý ngôn ngữ tự nhiên',
+    'Thị giác máy tính', 'An toàn thông tin', 'Mật mã học', 'Điện toán đám mây', 'Lập trình di động',
+    'Hệ quản trị cơ sở dữ liệu', 'Khai phá dữ liệu', 'Phát triển ứng dụng web', 'Đồ họa máy tính',
+    'Lý thuyết đồ thị', 'Chương trình dịch', 'Hệ phân tán', 'Quản lý dự án phần mềm',
+    'Tiếng Anh chuyên ngành', 'Triết học Mác - Lênin', 'Kinh tế chính trị', 'Tư tưởng Hồ Chí Minh',
+    'Pháp luật đại cương', 'Giáo dục thể chất', 'Kỹ năng mềm', 'Thực tập tốt nghiệp', 'Đồ án chuyên ngành',
+]
+PHONE_PREFIXES = ['090', '091', '093', '094', '096', '097', '098', '032', '033', '035',
+                  '037', '038', '070', '077', '079', '081', '083', '085', '086', '088']
+# Tỉ trọng bản ghi điểm theo học kỳ trong năm: học kỳ hè (HK3) ít sinh viên đăng ký
+TERM_WEIGHTS = {'HK1': 0.47, 'HK2': 0.45, 'HK3': 0.08}
+
+
+def _weighted(items):
+    """(giá trị, xác suất) từ danh sách bộ mà phần tử cuối là tỉ trọng"""
+    import numpy as np
+    values = [item[0] if len(item) == 2 else item[:-1] for item in items]
+    weights = np.array([item[-1] for item in items], dtype=float)
+    return values, weights / weights.sum()
+
+
+def semester_list(years, start_year):
+    """Các học kỳ theo thứ tự thời gian, ví dụ HK1-2020, HK2-2020, HK3-2020, HK1-2021..."""
+    return [f'{term}-{start_year + y}' for y in range(years) for term in TERM_WEIGHTS]
+
+
+def semester_weights(semesters):
+    """Tỉ trọng từng học kỳ theo loại học kỳ (HK1/HK2/HK3)"""
+    import numpy as np
+    weights = np.array([TERM_WEIGHTS[s.split('-')[0]] for s in semesters])
+    return weights / weights.sum()
+
+
+def _next_number(column, prefix):
+    """Số thứ tự tiếp theo cho mã có dạng <prefix><số> để không trùng dữ liệu đã có"""
+    codes = db.session.execute(select(column).where(column.like(f'{prefix}%'))).scalars()
+    numbers = [int(code[len(prefix):]) for code in codes if code[len(prefix):].isdigit()]
+    return max(numbers, default=0) + 1
+
+
+def _student_rows(rng, count, start, start_year, years, prefix=STUDENT_PREFIX):
+    surnames, surname_p = _weighted(SURNAMES)
+    majors, major_p = _weighted(MAJORS)
+    genders = rng.random(count) < 0.5
+    surname_idx = rng.choice(len(surnames), size=count, p=surname_p)
+    major_idx = rng.choice(len(majors), size=count, p=major_p)
+    cohort = rng.integers(0, years, size=count)
+    birth_offset = rng.integers(0, 365, size=count)
+    phones = rng.integers(0, 10 ** 7, size=count)
+    phone_prefix = rng.integers(0, len(PHONE_PREFIXES), size=count)
+    middle_idx = rng.integers(0, len(MIDDLE_NAMES['male']), size=count)
+    given_raw = rng.random(count)
+    status = rng.choice(['active', 'suspended', 'graduated'], size=count, p=[0.8, 0.05, 0.15])
+
+    rows = []
+    class_fill = {}
+    for i in range(count):
+        gender = 'male' if genders[i] else 'female'
+        given_names = GIVEN_NAMES[gender]
+        given = given_names[int(given_raw[i] * len(given_names))]
+        middle = MIDDLE_NAMES[gender][middle_idx[i]]
+        surname = surnames[surname_idx[i]]
+        full_name = f'{surname} {middle} {given}'
+        code = f'{prefix}{start + i:07d}'
+
+        major, abbreviation = majors[major_idx[i]]
+        year = start_year + int(cohort[i])
+        course = year - 1955  # khóa K65 nhập học năm 2020
+        key = (abbreviation, course)
+        class_fill[key] = class_fill.get(key, 0) + 1
+        class_name = f'{abbreviation}-K{course}{(class_fill[key] - 1) // CLASS_SIZE + 1:02d}'
+
+        initials = ''.join(word[0] for word in fold_text(f'{surname} {middle}').split())
+        rows.append({
+            'student_id': code,
+            'full_name': full_name,
+            'email': f'{fold_text(given).replace(" ", "")}{initials}.{code.lower()}@student.edu.vn',
+            'phone': f'{PHONE_PREFIXES[phone_prefix[i]]}{phones[i]:07d}',
+            'birth_date': date(year - 18, 1, 1) + timedelta(days=int(birth_offset[i])),
+            'class_name': class_name,
+            'major': major,
+            'status': str(status[i]),
+            'search_text': build_search_text(code, full_name),
+        })
+    return rows, cohort
+
+
+def _subject_rows(rng, count, start, semesters):
+    credits = rng.choice([2, 3, 3, 3, 4, 4], size=count)
+    offered = rng.integers(0, len(semesters), size=count)
+    rows = []
+    for i in range(count):
+        name = SUBJECT_NAMES[i % len(SUBJECT_NAMES)]
+        if i >= len(SUBJECT_NAMES):
+            name = f'{name} {i // len(SUBJECT_NAMES) + 1}'
+        rows.append({'subject_code': f'{SUBJECT_PREFIX}{start + i:04d}', 'subject_name': name,
+                     'credits': int(credits[i]), 'semester': semesters[offered[i]]})
+    return rows
+
+
+def _insert(table, rows, batch_size):
+    for offset in range(0, len(rows), batch_size):
+        db.session.execute(insert(table), rows[offset:offset + batch_size])
+
+
+def generate(students, subjects, scores, years=4, start_year=2020, seed=42,
+             batch_size=BATCH_SIZE, progress=None):
+    """
+    Sinh thêm `students` sinh viên, `subjects` môn học và `scores` bản ghi điểm
+    (chia đều cho các sinh viên mới, mỗi sinh viên học các môn khác nhau trên
+    các môn mới). Trả về dict số bản ghi đã tạo và thời gian chạy.
+    """
+    import numpy as np
+    if students <= 0 or subjects <= 0:
+        raise ValueError('Cần ít nhất một sinh viên và một môn học')
+    if scores > students * subjects:
+        raise ValueError(f'Tối đa {students * subjects} bản ghi điểm '
+                         f'({students} sinh viên x {subjects} môn học)')
+    started = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    semesters = semester_list(years, start_year)
+    term_p = semester_weights(semesters)
+
+    student_start = _next_number(Student.student_id, STUDENT_PREFIX)
+    subject_start = _next_number(Subject.subject_code, SUBJECT_PREFIX)
+    last_student = db.session.execute(select(func.max(Student.id))).scalar() or 0
+    last_subject = db.session.execute(select(func.max(Subject.id))).scalar() or 0
+    _insert(Subject.__table__, _subject_rows(rng, subjects, subject_start, semesters), batch_size)
+    student_rows, cohort = _student_rows(rng, students, student_start, start_year, years)
+    _insert(Student.__table__, student_rows, batch_size)
+    if progress:
+        progress('students', students)
+
+    subject_ids = np.array(db.session.execute(
+        select(Subject.id).where(Subject.id > last_subject).order_by(Subject.id)).scalars().all())
+    student_ids = db.session.execute(
+        select(Student.id).where(Student.id > last_student).order_by(Student.id)).scalars().all()
+
+    # Năng lực sinh viên và độ khó môn học quyết định phân phối điểm
+    ability = rng.normal(0, 1.0, size=len(student_ids))
+    difficulty = rng.normal(0, 0.8, size=len(subject_ids))
+    per_student = np.full(len(student_ids), scores // len(student_ids))
+    per_student[:scores % len(student_ids)] += 1
+
+    resolver = grading.PolicyResolver.load()
+    batch = []
+    inserted = 0
+    for index, student_id in enumerate(student_ids):
+        n = int(per_student[index])
+        if n == 0:
+            continue
+        chosen = rng.choice(len(subject_ids), size=n, replace=False)
+        # Chỉ các học kỳ từ năm nhập học của sinh viên trở đi
+        first_term = int(cohort[index]) * len(TERM_WEIGHTS)
+        terms = first_term + rng.choice(len(semesters) - first_term, size=n,
+                                        p=term_p[first_term:] / term_p[first_term:].sum())
+        base = 6.4 + 1.3 * ability[index] - difficulty[chosen]
+        midterm = np.round(np.clip(base + rng.normal(0, 1.0, n), 0, 10) * 4) / 4
+        final = np.round(np.clip(base + rng.normal(-0.2, 1.3, n), 0, 10) * 4) / 4
+        average = np.empty(n)
+        letters = np.empty(n, dtype=object)
+        # Gom theo chính sách (thường chỉ có một) để tính điểm TB/điểm chữ bằng NumPy
+        groups = {}
+        for j in range(n):
+            policy = resolver.resolve(int(subject_ids[chosen[j]]), semesters[terms[j]])
+            groups.setdefault(policy, []).append(j)
+        for policy, indexes in groups.items():
+            average[indexes], letters[indexes] = policy.apply(midterm[indexes], final[indexes])
+        for j in range(n):
+            batch.append({'student_id': student_id, 'subject_id': int(subject_ids[chosen[j]]),
+                          'semester': semesters[terms[j]],
+                          'midterm_score': float(midterm[j]), 'final_score': float(final[j]),
+                          'average_score': float(average[j]), 'letter_grade': str(letters[j])})
+        if len(batch) >= batch_size:
+            _insert(Score.__table__, batch, batch_size)
+            inserted += len(batch)
+            batch = []
+            if progress:
+                progress('scores', inserted)
+    if batch:
+        _insert(Score.__table__, batch, batch_size)
+        inserted += len(batch)
+        if progress:
+            progress('scores', inserted)
+
+    counters.rebuild()
+    db.session.commit()
+    gpa.rebuild_all()
+    return {'students': students, 'subjects': subjects, 'scores': inserted,
+            'seconds': round(time.perf_counter() - started, 2)}
+
+
+def student_import_csv(count, start=1, prefix='NH', start_year=2024, seed=None):
+    """
+    Nội dung file CSV (bytes, UTF-8) gồm `count` sinh viên mới theo định dạng
+    của trang Import sinh viên; mã SV bắt đầu từ <prefix><start>.
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    rows, _ = _student_rows(rng, count, start, start_year, 1, prefix=prefix)
+    columns = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue().encode('utf-8')
@@ -0,0 +1,96 @@
+"""
+Export danh sách sinh viên dạng luồng (streaming)
+
+Dữ liệu được đọc bằng server-side cursor (yield_per) theo từng lô và ghi ra ngay:
+- CSV: mỗi lô được mã hóa và gửi về client qua generator.
+- Excel: openpyxl write-only ghi từng dòng xuống file tạm trên đĩa, sau đó file
+  được gửi theo từng khối.
+Bộ nhớ của worker vì vậy không phụ thuộc số sinh viên.
+"""
+
+import csv
+import io
+import tempfile
+
+from sqlalchemy import select
+
+from models import db, Student
+
+FETCH_SIZE = 1000
+
+EXPORT_COLUMNS = [
+    ('Mã SV', Student.student_id),
+    ('Họ tên', Student.full_name),
+    ('Email', Student.email),
+    ('Điện thoại', Student.phone),
+    ('Lớp', Student.class_name),
+    ('Chuyên ngành', Student.major),
+    ('Trạng thái', Student.status),
+]
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def iter_rows(stmt, fetch_size=FETCH_SIZE):
+    """Duyệt kết quả của câu SELECT theo từng lô fetch_size dòng (server-side cursor)"""
+    stmt = stmt.execution_options(yield_per=fetch_size)
+    for partition in db.session.execute(stmt).partitions():
+        for row in partition:
+            yield tuple(row)
+
+
+def iter_student_rows(fetch_size=FETCH_SIZE, min_id=None, max_id=None):
+    """Duyệt các dòng (tuple) sinh viên theo thứ tự id, giữ tối đa fetch_size dòng trong bộ nhớ"""
+    stmt = select(*[column for _, column in EXPORT_COLUMNS]).order_by(Student.id)
+    if min_id is not None:
+        stmt = stmt.where(Student.id >= min_id)
+    if max_id is not None:
+        stmt = stmt.where(Student.id <= max_id)
+    return iter_rows(stmt, fetch_size)
+
+
+def csv_chunks(header, rows, chunk_size=FETCH_SIZE):
+    """Sinh nội dung CSV (UTF-8 có BOM để Excel hiển thị đúng tiếng Việt) theo từng khối bytes"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(header)
+
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+        if count % chunk_size == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def xlsx_file(header, rows, sheet_title, output=None):
+    """
+    Ghi file Excel bằng openpyxl write-only vào `output` (đường dẫn hoặc file),
+    mặc định là file tạm; trả về output (file đã seek về đầu)
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append(header)
+    for row in rows:
+        sheet.append(row)
+
+    if output is None:
+        output = tempfile.TemporaryFile()
+    workbook.save(output)
+    if hasattr(output, 'seek'):
+        output.seek(0)
+    return output
+
+
+def generate_csv(fetch_size=FETCH_SIZE):
+    return csv_chunks([label for label, _ in EXPORT_COLUMNS], iter_student_rows(fetch_size), fetch_size)
+
+
+def write_xlsx(fetch_size=FETCH_SIZE):
+    return xlsx_file([label for label, _ in EXPORT_COLUMNS], iter_student_rows(fetch_size), 'Sinh viên')
@@ -0,0 +1,210 @@
+"""
+Bảng tổng hợp GPA (StudentGpa, StudentSemesterGpa)
+
+Mỗi khi một Score được thêm/sửa/xóa qua ORM, phần đóng góp (điểm hệ 4 × tín chỉ,
+tín chỉ) của bản ghi cũ bị trừ đi và của bản ghi mới được cộng vào bằng một câu
+INSERT ... ON CONFLICT DO UPDATE, trong cùng transaction với thay đổi điểm.
+Các đường ghi bỏ qua ORM (bulk insert) gọi refresh_students(); lệnh
+`flask rebuild-gpa` tính lại toàn bộ từ bảng score.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import case, delete, event, func, insert, inspect, select, update
+
+from models import db, Score, Student, StudentGpa, StudentSemesterGpa, Subject
+
+GRADE_POINTS = {
+    'A+': 4.0, 'A': 3.7, 'B+': 3.5, 'B': 3.0,
+    'C+': 2.5, 'C': 2.0, 'D+': 1.5, 'D': 1.0, 'F': 0.0
+}
+
+
+def _semester_key(semester):
+    return semester or ''
+
+
+def _gpa_expr(points, credits):
+    return case((credits > 0, points / credits), else_=0.0)
+
+
+def _upsert(connection, table, keys, points, credits):
+    """Cộng (points, credits) vào dòng tổng hợp có khóa `keys`, tạo mới nếu chưa có"""
+    now = datetime.utcnow()
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table).values(
+            **keys,
+            total_points=points,
+            total_credits=credits,
+            gpa=points / credits if credits > 0 else 0.0,
+            updated_at=now,
+        )
+        new_points = table.c.total_points + stmt.excluded.total_points
+        new_credits = table.c.total_credits + stmt.excluded.total_credits
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={
+                'total_points': new_points,
+                'total_credits': new_credits,
+                'gpa': _gpa_expr(new_points, new_credits),
+                'updated_at': now,
+            },
+        )
+        connection.execute(stmt)
+        return
+
+    condition = [table.c[k] == v for k, v in keys.items()]
+    result = connection.execute(
+        update(table).where(*condition).values(
+            total_points=table.c.total_points + points,
+            total_credits=table.c.total_credits + credits,
+            gpa=_gpa_expr(table.c.total_points + points, table.c.total_credits + credits),
+            updated_at=now,
+        )
+    )
+    if result.rowcount == 0:
+        connection.execute(insert(table).values(
+            **keys,
+            total_points=points,
+            total_credits=credits,
+            gpa=points / credits if credits > 0 else 0.0,
+            updated_at=now,
+        ))
+
+
+def apply_delta(connection, student_id, semester, points, credits):
+    """Cộng phần chênh lệch vào cả bảng tổng hợp toàn khóa và theo học kỳ"""
+    if not points and not credits:
+        return
+    _upsert(connection, StudentGpa.__table__,
+            {'student_id': student_id}, points, credits)
+    _upsert(connection, StudentSemesterGpa.__table__,
+            {'student_id': student_id, 'semester': _semester_key(semester)}, points, credits)
+
+
+def _contribution(connection, subject_id, letter_grade):
+    if not letter_grade or subject_id is None:
+        return 0.0, 0
+    credits = connection.execute(
+        select(Subject.credits).where(Subject.id == subject_id)
+    ).scalar()
+    if not credits:
+        return 0.0, 0
+    return GRADE_POINTS.get(letter_grade, 0) * credits, credits
+
+
+def _previous(target, attr):
+    history = inspect(target).attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(target, attr)
+
+
+@event.listens_for(Score, 'after_insert')
+def _score_inserted(mapper, connection, target):
+    points, credits = _contribution(connection, target.subject_id, target.letter_grade)
+    apply_delta(connection, target.student_id, target.semester, points, credits)
+
+
+@event.listens_for(Score, 'after_update')
+def _score_updated(mapper, connection, target):
+    tracked = ('student_id', 'subject_id', 'semester', 'letter_grade')
+    state = inspect(target)
+    if not any(state.attrs[a].history.has_changes() for a in tracked):
+        return
+    old = {a: _previous(target, a) for a in tracked}
+    old_points, old_credits = _contribution(connection, old['subject_id'], old['letter_grade'])
+    apply_delta(connection, old['student_id'], old['semester'], -old_points, -old_credits)
+    points, credits = _contribution(connection, target.subject_id, target.letter_grade)
+    apply_delta(connection, target.student_id, target.semester, points, credits)
+
+
+@event.listens_for(Score, 'after_delete')
+def _score_deleted(mapper, connection, target):
+    points, credits = _contribution(connection, target.subject_id, target.letter_grade)
+    apply_delta(connection, target.student_id, target.semester, -points, -credits)
+
+
+@event.listens_for(Student, 'after_delete')
+def _student_deleted(mapper, connection, target):
+    # SQLite không bật khóa ngoại mặc định nên ON DELETE CASCADE không chạy
+    connection.execute(delete(StudentGpa.__table__).where(
+        StudentGpa.__table__.c.student_id == target.id))
+    connection.execute(delete(StudentSemesterGpa.__table__).where(
+        StudentSemesterGpa.__table__.c.student_id == target.id))
+
+
+def _aggregate_select(group_by_semester, student_ids=None):
+    points_per_credit = case(GRADE_POINTS, value=Score.letter_grade, else_=0.0)
+    total_points = func.sum(points_per_credit * Subject.credits)
+    total_credits = func.sum(Subject.credits)
+    columns = [Score.student_id]
+    if group_by_semester:
+        columns.append(func.coalesce(Score.semester, '').label('semester'))
+    columns += [
+        total_credits.label('total_credits'),
+        total_points.label('total_points'),
+        _gpa_expr(total_points, total_credits).label('gpa'),
+        func.current_timestamp().label('updated_at'),
+    ]
+    stmt = (select(*columns)
+            .select_from(Score)
+            .join(Subject, Subject.id == Score.subject_id)
+            .where(Score.letter_grade.isnot(None)))
+    if student_ids is not None:
+        stmt = stmt.where(Score.student_id.in_(student_ids))
+    return stmt.group_by(*columns[:2 if group_by_semester else 1])
+
+
+def _rebuild(connection, student_ids=None):
+    for table, by_semester in ((StudentGpa.__table__, False),
+                               (StudentSemesterGpa.__table__, True)):
+        stmt = delete(table)
+        if student_ids is not None:
+            stmt = stmt.where(table.c.student_id.in_(student_ids))
+        connection.execute(stmt)
+        source = _aggregate_select(by_semester, student_ids)
+        connection.execute(insert(table).from_select(
+            [c.name for c in source.selected_columns], source))
+
+
+def refresh_students(student_ids):
+    """Tính lại tổng hợp cho một tập sinh viên (dùng sau bulk insert bỏ qua ORM)"""
+    student_ids = list(set(student_ids))
+    connection = db.session.connection()
+    for i in range(0, len(student_ids), 500):
+        _rebuild(connection, student_ids[i:i + 500])
+
+
+def rebuild_all():
+    """Xóa và tính lại toàn bộ bảng tổng hợp từ bảng score"""
+    _rebuild(db.session.connection())
+    db.session.commit()
+
+
+def ensure_gpa_summary():
+    """Dựng bảng tổng hợp lần đầu cho database đã có điểm từ trước"""
+    has_summary = db.session.execute(select(StudentGpa.student_id).limit(1)).first()
+    if has_summary is None and db.session.execute(select(Score.id).limit(1)).first():
+        rebuild_all()
+
+
+def get_student_gpa(student_id):
+    """GPA và tổng tín chỉ của sinh viên: một lần tra theo khóa chính"""
+    summary = db.session.get(StudentGpa, student_id)
+    if summary is None:
+        return 0.0, 0
+    return round(summary.gpa, 2), summary.total_credits
+
+
+def get_semester_gpas(student_id):
+    return (StudentSemesterGpa.query
+            .filter_by(student_id=student_id)
+            .filter(StudentSemesterGpa.total_credits > 0)
+            .order_by(StudentSemesterGpa.semester)
+            .all())
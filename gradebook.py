@@ -0,0 +1,174 @@
+"""
+Nhập bảng điểm hàng loạt cho một môn học / học kỳ
+
+Điểm trung bình và điểm chữ được tính trên cả mảng bằng NumPy theo chính sách
+tính điểm của môn/học kỳ (grading.py), giống Score.calculate_average. Toàn bộ bảng
+điểm được kiểm tra trước; nếu hợp lệ thì upsert theo (student_id, subject_id,
+semester) trong một transaction.
+"""
+
+from datetime import datetime
+
+from sqlalchemy import bindparam, insert, select, update
+
+import counters
+import gpa
+import grading
+import importer
+from models import db, Score, Student
+
+LOOKUP_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 200
+
+FILE_COLUMNS = ['student_id', 'midterm_score', 'final_score']
+
+
+class GradebookError(ValueError):
+    """Bảng điểm không hợp lệ; `errors` là danh sách (dòng, thông báo)"""
+
+    def __init__(self, errors):
+        super().__init__(f'Bảng điểm có {len(errors)} lỗi')
+        self.errors = errors[:MAX_REPORTED_ERRORS]
+        self.error_count = len(errors)
+
+
+def _parse_score(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        value = value.strip().replace(',', '.')
+    return float(value)
+
+
+def entries_from_json(items):
+    """Chuyển danh sách dict JSON thành (dòng, mã SV, điểm GK, điểm CK)"""
+    if not isinstance(items, list):
+        raise GradebookError([(0, 'scores phải là một danh sách')])
+    return [(index, item.get('student_id'), item.get('midterm_score'), item.get('final_score'))
+            if isinstance(item, dict) else (index, None, None, None)
+            for index, item in enumerate(items, start=1)]
+
+
+def entries_from_file(stream, filename):
+    """Đọc file .xlsx/.csv có các cột student_id (mã SV), midterm_score, final_score"""
+    return [(row_number, record.get('student_id'), record.get('midterm_score'), record.get('final_score'))
+            for row_number, record in importer.iter_records(stream, filename,
+                                                            required=FILE_COLUMNS, optional=[])]
+
+
+def _resolve_students(codes):
+    ids = {}
+    codes = list(codes)
+    for i in range(0, len(codes), LOOKUP_BATCH_SIZE):
+        chunk = codes[i:i + LOOKUP_BATCH_SIZE]
+        ids.update(db.session.execute(
+            select(Student.student_id, Student.id).where(Student.student_id.in_(chunk))
+        ).all())
+    return ids
+
+
+def validate(entries):
+    """
+    Kiểm tra toàn bộ bảng điểm. Trả về (student_ids, midterm, final) dạng mảng,
+    hoặc ném GradebookError chứa mọi dòng lỗi.
+    """
+    import numpy as np
+    errors = []
+    codes, midterm, final, refs = [], [], [], []
+    seen = set()
+    for ref, code, mid, fin in entries:
+        code = str(code).strip() if code not in (None, '') else None
+        if not code:
+            errors.append((ref, 'Thiếu mã sinh viên'))
+            continue
+        if code in seen:
+            errors.append((ref, f'Mã SV {code} bị trùng'))
+            continue
+        try:
+            mid, fin = _parse_score(mid), _parse_score(fin)
+        except (TypeError, ValueError):
+            errors.append((ref, f'Điểm của {code} không phải là số'))
+            continue
+        if mid is None or fin is None:
+            errors.append((ref, f'Thiếu điểm giữa kỳ/cuối kỳ của {code}'))
+            continue
+        seen.add(code)
+        codes.append(code)
+        midterm.append(mid)
+        final.append(fin)
+        refs.append(ref)
+
+    midterm = np.array(midterm, dtype=float)
+    final = np.array(final, dtype=float)
+    out_of_range = ~((midterm >= 0) & (midterm <= 10) & (final >= 0) & (final <= 10))
+    for index in np.flatnonzero(out_of_range):
+        errors.append((refs[index], f'Điểm của {codes[index]} phải nằm trong khoảng 0-10'))
+
+    student_ids = _resolve_students(codes)
+    for ref, code in zip(refs, codes):
+        if code not in student_ids:
+            errors.append((ref, f'Không tìm thấy sinh viên {code}'))
+
+    if not codes and not errors:
+        errors.append((0, 'Bảng điểm rỗng'))
+    if errors:
+        raise GradebookError(sorted(errors, key=lambda e: e[0]))
+    return np.array([student_ids[c] for c in codes], dtype=np.int64), midterm, final
+
+
+def upsert_scores(subject, semester, student_ids, midterm, final):
+    """
+    Ghi bảng điểm đã kiểm tra: cập nhật điểm đã có của (sinh viên, môn, học kỳ),
+    thêm mới phần còn lại, rồi tính lại tổng hợp GPA của các sinh viên liên quan.
+    Trả về (số bản ghi thêm mới, số bản ghi cập nhật).
+    """
+    policy = grading.resolve_policy(subject.id, semester)
+    average, letters = policy.apply(midterm, final)
+    semester_filter = Score.semester.is_(None) if semester is None else Score.semester == semester
+
+    existing = {}
+    id_list = student_ids.tolist()
+    for i in range(0, len(id_list), LOOKUP_BATCH_SIZE):
+        chunk = id_list[i:i + LOOKUP_BATCH_SIZE]
+        existing.update(db.session.execute(
+            select(Score.student_id, Score.id)
+            .where(Score.subject_id == subject.id, semester_filter, Score.student_id.in_(chunk))
+        ).all())
+
+    now = datetime.utcnow()
+    inserts, updates = [], []
+    for student_id, mid, fin, avg, letter in zip(id_list, midterm.tolist(), final.tolist(),
+                                                 average.tolist(), letters.tolist()):
+        values = {
+            'midterm_score': mid,
+            'final_score': fin,
+            'average_score': avg,
+            'letter_grade': letter,
+        }
+        if student_id in existing:
+            updates.append(dict(values, score_id=existing[student_id]))
+        else:
+            inserts.append(dict(values, student_id=student_id, subject_id=subject.id,
+                                semester=semester, created_at=now))
+
+    try:
+        if inserts:
+            db.session.execute(insert(Score.__table__), inserts)
+            counters.adjust(db.session.connection(), counters.TOTAL_SCORES, len(inserts))
+        if updates:
+            table = Score.__table__
+            # Các cột trong SET lấy theo khóa của từng dict tham số (executemany)
+            db.session.execute(update(table).where(table.c.id == bindparam('score_id')), updates)
+        # Ghi qua Core không kích hoạt event của ORM nên tự cập nhật bộ đếm và tổng hợp GPA
+        gpa.refresh_students(id_list)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(inserts), len(updates)
+
+
+def import_gradebook(subject, semester, entries):
+    """Kiểm tra rồi ghi bảng điểm; trả về (số thêm mới, số cập nhật)"""
+    student_ids, midterm, final = validate(entries)
+    return upsert_scores(subject, semester, student_ids, midterm, final)
@@ -0,0 +1,240 @@
+"""
+Engine tính điểm theo chính sách (grading policy)
+
+Một Policy gồm trọng số giữa kỳ/cuối kỳ, thang điểm chữ và cách làm tròn, và
+được áp dụng cho cả mảng điểm bằng NumPy (np.searchsorted để xếp điểm chữ).
+Chính sách lưu trong bảng GradingPolicy, có thể gắn với học kỳ và/hoặc môn học
+và được đánh version; nếu không có chính sách nào khớp thì dùng thang mặc định
+định nghĩa trên Score. regrade() tính lại điểm đã lưu theo từng lô.
+
+NumPy chỉ được import khi tính điểm: worker chỉ phục vụ trang đọc không phải
+nạp nó (xem app.preload cho chế độ gunicorn preload_app).
+"""
+
+import functools
+
+from sqlalchemy import bindparam, func, or_, select, update
+
+import gpa
+from models import db, GradingPolicy, Score
+
+ROUNDING_MODES = ('half_even', 'half_up')
+REGRADE_CHUNK_SIZE = 5000
+
+
+class Policy:
+    """Chính sách tính điểm đã nạp, áp dụng được cho mảng NumPy"""
+
+    def __init__(self, midterm_weight, final_weight, grade_scale, fail_grade='F',
+                 decimals=2, rounding='half_even', name='Mặc định', version=None):
+        import numpy as np
+        scale = sorted(((float(t), g) for t, g in grade_scale), reverse=True)
+        thresholds = [t for t, _ in scale]
+        if len(set(thresholds)) != len(thresholds):
+            raise ValueError('Ngưỡng điểm chữ bị trùng')
+        # Nhãn phải có điểm hệ 4 trong gpa.GRADE_POINTS (các nhãn này đều vừa cột
+        # letter_grade String(2)); nhãn lạ sẽ bị tính 0 điểm mà vẫn cộng tín chỉ
+        unknown = [g for g in [fail_grade] + [g for _, g in scale] if g not in gpa.GRADE_POINTS]
+        if unknown:
+            raise ValueError(f'Điểm chữ không hợp lệ: {", ".join(map(str, unknown))} '
+                             f'(chỉ dùng: {", ".join(gpa.GRADE_POINTS)})')
+        if abs(midterm_weight + final_weight - 1) > 1e-9:
+            raise ValueError('Tổng trọng số giữa kỳ và cuối kỳ phải bằng 1')
+        if rounding not in ROUNDING_MODES:
+            raise ValueError(f'rounding phải là một trong: {", ".join(ROUNDING_MODES)}')
+        if not 0 <= decimals <= 4:
+            raise ValueError('decimals phải nằm trong khoảng 0-4')
+
+        self.name = name
+        self.version = version
+        self.midterm_weight = midterm_weight
+        self.final_weight = final_weight
+        self.grade_scale = scale
+        self.fail_grade = fail_grade
+        self.decimals = decimals
+        self.rounding = rounding
+        # Thang điểm tăng dần cho np.searchsorted; nhãn đầu tiên là điểm trượt
+        self._thresholds = np.array(thresholds[::-1], dtype=float)
+        self._labels = np.array([fail_grade] + [g for _, g in scale][::-1])
+
+    @classmethod
+    def from_record(cls, record):
+        return cls(record.midterm_weight, record.final_weight, record.grade_scale,
+                   fail_grade=record.fail_grade, decimals=record.decimals,
+                   rounding=record.rounding, name=record.name, version=record.version)
+
+    def round(self, values):
+        import numpy as np
+        values = np.asarray(values, dtype=float)
+        factor = 10 ** self.decimals
+        if self.rounding == 'half_up':
+            # Làm tròn trước ở 6 chữ số để loại sai số dấu phẩy động (7.245 -> 724.4999...)
+            return np.floor(np.round(values * factor, 6) + 0.5) / factor
+        # Giống hệt round(x, decimals) của Python: np.round có thể lệch ở các giá
+        # trị sát điểm giữa nên các phần tử đó được tính lại bằng round()
+        rounded = np.round(values, self.decimals)
+        scaled = values * factor
+        near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6
+        if near_tie.any():
+            rounded[near_tie] = [round(float(v), self.decimals) for v in values[near_tie]]
+        return rounded
+
+    def letters(self, averages):
+        import numpy as np
+        return self._labels[np.searchsorted(self._thresholds, averages, side='right')]
+
+    def apply(self, midterm, final):
+        """Tính (average_score, letter_grade) cho cả mảng điểm giữa kỳ / cuối kỳ"""
+        import numpy as np
+        midterm = np.asarray(midterm, dtype=float)
+        final = np.asarray(final, dtype=float)
+        average = self.round(midterm * self.midterm_weight + final * self.final_weight)
+        return average, self.letters(average)
+
+    def grade(self, midterm, final):
+        """Tính cho một cặp điểm; trả về (average_score, letter_grade)"""
+        average, letters = self.apply([midterm], [final])
+        return float(average[0]), str(letters[0])
+
+
+@functools.cache
+def default_policy():
+    """Chính sách mặc định theo thang điểm định nghĩa trên Score (tạo ở lần dùng đầu)"""
+    return Policy(Score.MIDTERM_WEIGHT, Score.FINAL_WEIGHT, Score.GRADE_SCALE,
+                  fail_grade=Score.FAIL_GRADE)
+
+
+def _specificity(record):
+    return (record.subject_id is not None, record.semester is not None, record.version)
+
+
+class PolicyResolver:
+    """Chọn chính sách cho (môn học, học kỳ): khớp cụ thể nhất, rồi version mới nhất"""
+
+    def __init__(self, records):
+        self._records = sorted(records, key=_specificity, reverse=True)
+        self._cache = {}
+
+    @classmethod
+    def load(cls, subject_id=None, semester=None):
+        query = GradingPolicy.query
+        if subject_id is not None:
+            query = query.filter(or_(GradingPolicy.subject_id.is_(None),
+                                     GradingPolicy.subject_id == subject_id))
+        if semester is not None:
+            query = query.filter(or_(GradingPolicy.semester.is_(None),
+                                     GradingPolicy.semester == semester))
+        return cls(query.all())
+
+    def resolve(self, subject_id, semester):
+        key = (subject_id, semester)
+        if key not in self._cache:
+            policy = default_policy()
+            for record in self._records:
+                if record.subject_id not in (None, subject_id):
+                    continue
+                if record.semester not in (None, semester):
+                    continue
+                policy = Policy.from_record(record)
+                break
+            self._cache[key] = policy
+        return self._cache[key]
+
+
+def resolve_policy(subject_id, semester):
+    return PolicyResolver.load(subject_id, semester).resolve(subject_id, semester)
+
+
+def add_policy(name, midterm_weight, final_weight, grade_scale, semester=None, subject_id=None,
+               fail_grade='F', decimals=2, rounding='half_even'):
+    """Lưu một version mới của chính sách cho phạm vi (học kỳ, môn học)"""
+    # Khởi tạo Policy để kiểm tra tham số trước khi lưu
+    Policy(midterm_weight, final_weight, grade_scale, fail_grade, decimals, rounding)
+    latest = db.session.execute(
+        select(func.max(GradingPolicy.version)).where(
+            GradingPolicy.semester.is_(None) if semester is None else GradingPolicy.semester == semester,
+            GradingPolicy.subject_id.is_(None) if subject_id is None else GradingPolicy.subject_id == subject_id,
+        )
+    ).scalar()
+    record = GradingPolicy(
+        name=name,
+        semester=semester,
+        subject_id=subject_id,
+        version=(latest or 0) + 1,
+        midterm_weight=midterm_weight,
+        final_weight=final_weight,
+        grade_scale=[[float(t), g] for t, g in grade_scale],
+        fail_grade=fail_grade,
+        decimals=decimals,
+        rounding=rounding,
+    )
+    db.session.add(record)
+    db.session.commit()
+    return record
+
+
+def regrade(semester=None, subject_id=None, chunk_size=REGRADE_CHUNK_SIZE, progress=None,
+            min_id=None, max_id=None):
+    """
+    Tính lại average_score/letter_grade của các điểm đã lưu theo chính sách hiện hành.
+    Duyệt bảng score theo id từng lô chunk_size dòng, mỗi lô một transaction; chỉ
+    các dòng có kết quả thay đổi mới được UPDATE. min_id/max_id giới hạn khoảng id
+    (tác vụ nền chia bảng thành nhiều khoảng chạy song song, xem jobs.py).
+    Trả về (số dòng đã duyệt, số dòng thay đổi).
+    """
+    import numpy as np
+    resolver = PolicyResolver.load(subject_id, semester)
+    table = Score.__table__
+    update_stmt = update(table).where(table.c.id == bindparam('score_id'))
+    last_id = min_id - 1 if min_id is not None else 0
+    processed = changed = 0
+    while True:
+        stmt = (select(Score.id, Score.student_id, Score.subject_id, Score.semester,
+                       Score.midterm_score, Score.final_score,
+                       Score.average_score, Score.letter_grade)
+                .where(Score.id > last_id,
+                       Score.midterm_score.isnot(None),
+                       Score.final_score.isnot(None))
+                .order_by(Score.id)
+                .limit(chunk_size))
+        if semester is not None:
+            stmt = stmt.where(Score.semester == semester)
+        if subject_id is not None:
+            stmt = stmt.where(Score.subject_id == subject_id)
+        if max_id is not None:
+            stmt = stmt.where(Score.id <= max_id)
+        rows = db.session.execute(stmt).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+        processed += len(rows)
+
+        midterm = np.array([r.midterm_score for r in rows], dtype=float)
+        final = np.array([r.final_score for r in rows], dtype=float)
+        average = np.empty(len(rows))
+        letters = np.empty(len(rows), dtype=object)
+
+        groups = {}
+        for index, row in enumerate(rows):
+            groups.setdefault((row.subject_id, row.semester), []).append(index)
+        for (group_subject, group_semester), indexes in groups.items():
+            policy = resolver.resolve(group_subject, group_semester)
+            indexes = np.array(indexes)
+            average[indexes], letters[indexes] = policy.apply(midterm[indexes], final[indexes])
+
+        updates = []
+        touched_students = set()
+        for row, avg, letter in zip(rows, average.tolist(), letters.tolist()):
+            if row.average_score != avg or row.letter_grade != letter:
+                updates.append({'score_id': row.id, 'average_score': avg, 'letter_grade': letter})
+                if row.letter_grade != letter:
+                    touched_students.add(row.student_id)
+        if updates:
+            db.session.execute(update_stmt, updates)
+            changed += len(updates)
+        if touched_students:
+            gpa.refresh_students(touched_students)
+        db.session.commit()
+        if progress:
+            progress(processed, changed)
+    return processed, changed
@@ -0,0 +1,42 @@
+"""
+Cấu hình gunicorn (gunicorn tự đọc file này trong thư mục làm việc)
+
+Chạy: gunicorn app:app. Tham số dòng lệnh ghi đè các giá trị dưới đây.
+
+- WEB_CONCURRENCY (số worker, mặc định 2), GUNICORN_THREADS (mặc định 4),
+  PORT (mặc định 5000).
+- GUNICORN_PRELOAD=1 (mặc định): master import app một lần, nạp trước module
+  nặng và template (app.preload) rồi mới fork worker; các worker dùng chung
+  những trang bộ nhớ đó (copy-on-write) nên mỗi worker chỉ tốn phần bộ nhớ riêng
+  của nó. gc.freeze() trước khi fork để bộ gom rác của worker không ghi vào các
+  object kế thừa (làm mất chia sẻ). Đổi code cần restart hẳn master, HUP không
+  nạp lại app. GUNICORN_PRELOAD=0: mỗi worker tự import app như trước.
+
+Đo thời gian import và RSS/PSS của từng worker: benchmarks/memory.py.
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+timeout = 120
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def when_ready(server):
+    if server.cfg.preload_app:
+        import app
+        app.preload(app.app)
+
+
+def pre_fork(server, worker):
+    if server.cfg.preload_app:
+        gc.freeze()
+
+
+def post_fork(server, worker):
+    if server.cfg.preload_app:
+        import app
+        app.after_fork(app.app)
@@ -0,0 +1,233 @@
+"""
+Import sinh viên hàng loạt từ file .xlsx hoặc .csv
+
+File được đọc tuần tự từng dòng (openpyxl read-only / csv), gom thành từng lô
+BATCH_SIZE dòng: mỗi lô chỉ cần một truy vấn IN (...) để kiểm tra mã SV đã tồn tại
+và một câu INSERT nhiều dòng (ON CONFLICT DO NOTHING trên PostgreSQL/SQLite).
+"""
+
+import codecs
+import csv
+import time
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+import counters
+from models import db, Student
+from search import build_search_text
+
+BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 200
+
+REQUIRED_COLUMNS = ['student_id', 'full_name']
+OPTIONAL_COLUMNS = ['email', 'phone', 'class_name', 'major']
+SUPPORTED_EXTENSIONS = ('.xlsx', '.csv')
+
+
+class InvalidImportFile(ValueError):
+    """Lỗi khiến không thể đọc file (sai định dạng, thiếu cột...)"""
+
+
+class ImportReport:
+    """Kết quả một lần import"""
+
+    def __init__(self):
+        self.processed = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.errors = []
+        self.error_count = 0
+        self.elapsed = 0.0
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+    @property
+    def rows_per_second(self):
+        return round(self.processed / self.elapsed, 1) if self.elapsed > 0 else float(self.processed)
+
+    def to_dict(self):
+        return {'processed': self.processed, 'inserted': self.inserted, 'skipped': self.skipped,
+                'errors': self.errors, 'error_count': self.error_count, 'elapsed': self.elapsed}
+
+    @classmethod
+    def from_dict(cls, data):
+        report = cls()
+        for name in ('processed', 'inserted', 'skipped', 'error_count', 'elapsed'):
+            setattr(report, name, data.get(name, 0))
+        report.errors = [tuple(error) for error in data.get('errors', [])]
+        return report
+
+
+def _cell_to_str(value):
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    value = str(value).strip()
+    return value or None
+
+
+def _iter_xlsx(stream):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        yield [_cell_to_str(h) for h in header]
+        for row in rows:
+            yield list(row)
+    finally:
+        workbook.close()
+
+
+def _iter_csv(stream):
+    reader = csv.reader(codecs.iterdecode(stream, 'utf-8-sig'))
+    for row in reader:
+        yield row
+
+
+def iter_records(stream, filename, required=REQUIRED_COLUMNS, optional=OPTIONAL_COLUMNS):
+    """
+    Đọc file theo từng dòng, trả về (số dòng trong file, dict cột -> giá trị).
+    Dòng 1 là tiêu đề nên dữ liệu bắt đầu từ dòng 2.
+    """
+    name = (filename or '').lower()
+    if name.endswith('.xlsx'):
+        rows = _iter_xlsx(stream)
+    elif name.endswith('.csv'):
+        rows = _iter_csv(stream)
+    else:
+        raise InvalidImportFile('Vui lòng chọn file Excel (.xlsx) hoặc CSV (.csv)')
+
+    header = next(rows, None)
+    if not header:
+        raise InvalidImportFile('File rỗng')
+    header = [(h or '').strip() for h in header]
+    missing = [c for c in required if c not in header]
+    if missing:
+        raise InvalidImportFile(f'File thiếu cột bắt buộc: {", ".join(missing)}')
+
+    positions = {c: header.index(c) for c in list(required) + list(optional) if c in header}
+    for row_number, row in enumerate(rows, start=2):
+        if not any(v not in (None, '') for v in row):
+            continue
+        yield row_number, {
+            column: _cell_to_str(row[index]) if index < len(row) else None
+            for column, index in positions.items()
+        }
+
+
+def _validate(record):
+    for column in REQUIRED_COLUMNS:
+        if not record.get(column):
+            return f'Thiếu {column}'
+    for column in REQUIRED_COLUMNS + OPTIONAL_COLUMNS:
+        value = record.get(column)
+        limit = Student.__table__.c[column].type.length
+        if value and limit and len(value) > limit:
+            return f'{column} dài quá {limit} ký tự'
+    return None
+
+
+def _insert_statement():
+    table = Student.__table__
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return insert(table)
+    return dialect_insert(table).on_conflict_do_nothing(index_elements=['student_id'])
+
+
+def _flush_batch(batch, report):
+    ids = [record['student_id'] for _, record in batch]
+    existing = set(db.session.execute(
+        select(Student.student_id).where(Student.student_id.in_(ids))
+    ).scalars())
+
+    now = datetime.utcnow()
+    new_rows = []
+    for _, record in batch:
+        if record['student_id'] in existing:
+            report.skipped += 1
+            continue
+        new_rows.append({
+            'student_id': record['student_id'],
+            'full_name': record['full_name'],
+            'email': record.get('email'),
+            'phone': record.get('phone'),
+            'class_name': record.get('class_name'),
+            'major': record.get('major'),
+            'status': 'active',
+            'created_at': now,
+            # Insert qua Core không kích hoạt event của ORM nên tự điền search_text
+            'search_text': build_search_text(record['student_id'], record['full_name']),
+        })
+
+    if new_rows:
+        result = db.session.execute(_insert_statement(), new_rows)
+        inserted = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(new_rows)
+        report.inserted += inserted
+        connection = db.session.connection()
+        counters.adjust(connection, counters.TOTAL_STUDENTS, inserted)
+        counters.adjust(connection, counters.ACTIVE_STUDENTS, inserted)
+        # Dòng bị ON CONFLICT bỏ qua do request khác vừa chèn cùng mã SV
+        report.skipped += len(new_rows) - inserted
+
+
+def validated_records(stream, filename, report):
+    """
+    Duyệt các dòng hợp lệ (số dòng, record) của file; dòng lỗi và mã SV trùng
+    trong file được ghi vào report.
+    """
+    seen = set()
+    for row_number, record in iter_records(stream, filename):
+        report.processed += 1
+        error = _validate(record)
+        if error is None and record['student_id'] in seen:
+            error = f'Mã SV {record["student_id"]} bị trùng trong file'
+        if error:
+            report.add_error(row_number, error)
+            continue
+        seen.add(record['student_id'])
+        yield row_number, record
+
+
+def insert_records(records, report, batch_size=BATCH_SIZE):
+    """Chèn các record đã kiểm tra theo lô, bỏ qua mã SV đã tồn tại (không commit)"""
+    batch = []
+    for item in records:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            _flush_batch(batch, report)
+            batch = []
+    if batch:
+        _flush_batch(batch, report)
+
+
+def import_students(stream, filename, batch_size=BATCH_SIZE):
+    """
+    Import sinh viên từ file, bỏ qua mã SV đã tồn tại. Toàn bộ import nằm trong
+    một transaction; lỗi từng dòng được ghi vào report và không làm dừng import.
+    File lớn nên chạy qua tác vụ nền (jobs.py), nơi các lô được chèn song song.
+    """
+    report = ImportReport()
+    started = time.perf_counter()
+    try:
+        insert_records(validated_records(stream, filename, report), report, batch_size)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        report.elapsed = time.perf_counter() - started
+    return report
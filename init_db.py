@@ -4,56 +4,15 @@ Script khởi tạo database và tạo dữ liệu mẫu
 Chạy: python init_db.py
 """
 
-from app import app, db, User, Student, Subject, Score
+from app import app, bootstrap_db, db, Student, Subject, Score
 from datetime import datetime
 
 def init_database():
     """Khởi tạo database và tạo dữ liệu mẫu"""
     with app.app_context():
         print("Đang tạo database...")
-        db.create_all()
-        print("✓ Database đã được tạo")
-        
-        # Tạo admin user
-        admin = User.query.filter_by(username='admin').first()
-        if not admin:
-            admin = User(
-                username='admin',
-                role='admin',
-                full_name='Quản trị viên',
-                email='admin@example.com'
-            )
-            admin.set_password('admin123')
-            db.session.add(admin)
-            print("✓ Tạo tài khoản admin")
-        
-        # Tạo giáo viên
-        teacher = User.query.filter_by(username='teacher').first()
-        if not teacher:
-            teacher = User(
-                username='teacher',
-                role='teacher',
-                full_name='Nguyễn Văn Giáo',
-                email='teacher@example.com'
-            )
-            teacher.set_password('teacher123')
-            db.session.add(teacher)
-            print("✓ Tạo tài khoản giáo viên")
-        
-        # Tạo sinh viên
-        student_user = User.query.filter_by(username='student').first()
-        if not student_user:
-            student_user = User(
-                username='student',
-                role='student',
-                full_name='Trần Thị Sinh Viên',
-                email='student@example.com'
-            )
-            student_user.set_password('student123')
-            db.session.add(student_user)
-            print("✓ Tạo tài khoản sinh viên")
-        
-        db.session.commit()
+        bootstrap_db()
+        print("✓ Database và tài khoản mặc định đã sẵn sàng")
         
         # Tạo dữ liệu mẫu sinh viên
         if Student.query.count() == 0:
@@ -0,0 +1,516 @@
+"""
+Tác vụ nền: hàng đợi trên database và pool tiến trình worker (không cần broker)
+
+- submit() ghi một Job (status queued) và trả về ngay; request HTTP chỉ lưu file
+  đầu vào rồi chuyển người dùng tới trang theo dõi tiến độ.
+- Worker (flask jobs worker) chạy JOB_WORKERS tiến trình. Mỗi tiến trình lặp:
+  nhận một JobChunk đang chờ, nếu không có thì nhận một Job mới để lập kế hoạch
+  (chia thành các chunk). Chunk của cùng một job được nhiều tiến trình xử lý song
+  song trên các core; tiến trình hoàn thành chunk cuối cùng chạy bước tổng hợp
+  kết quả (ghi file tải về, báo cáo import...).
+- Nhận việc bằng UPDATE ... WHERE status = 'queued' (PostgreSQL thêm SELECT ...
+  FOR UPDATE SKIP LOCKED) nên mỗi việc chỉ được một tiến trình nhận.
+- Chunk chạy quá JOB_STALE_SECONDS (worker chết giữa chừng) được đưa lại hàng đợi.
+- JOB_EXECUTOR=inline chạy job ngay trong request (profile testing, benchmark).
+- Mỗi tiến trình worker ghi heartbeat (AppCounter HEARTBEAT) mỗi HEARTBEAT_SECONDS
+  giây; trang tác vụ cảnh báo khi không có worker nào còn sống (job sẽ chờ mãi).
+
+File đầu vào và kết quả nằm trong JOB_DIR/<job id>/; web và worker phải dùng
+chung thư mục này. Các loại job nằm trong KINDS.
+"""
+
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import signal
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, update
+from sqlalchemy.exc import IntegrityError, OperationalError
+
+import exporter
+import gpa
+import grading
+import importer
+from models import db, AppCounter, Job, JobChunk, Score, Student
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+IMPORT_CHUNK_ROWS = 5000
+# Số lần thử một chunk khi gặp lỗi database tạm thời (SQLite bị khóa, mất kết nối)
+MAX_ATTEMPTS = 3
+HEARTBEAT = 'jobs:worker_heartbeat'
+HEARTBEAT_SECONDS = 15
+
+
+def job_dir(job_id):
+    return os.path.join(current_app.config['JOB_DIR'], str(job_id))
+
+
+def _id_ranges(column, conditions, rows_per_chunk):
+    """Chia khoảng [min(id), max(id)] thỏa điều kiện thành các đoạn rows_per_chunk id"""
+    low, high = db.session.execute(select(func.min(column), func.max(column)).where(*conditions)).one()
+    if low is None:
+        return []
+    return [(start, min(start + rows_per_chunk - 1, high))
+            for start in range(low, high + 1, rows_per_chunk)]
+
+
+# --- Import sinh viên ---------------------------------------------------------
+
+def _plan_import(job):
+    """Đọc và kiểm tra file một lần, ghi các dòng hợp lệ thành từng lô JSON lines"""
+    directory = job_dir(job.id)
+    report = importer.ImportReport()
+    chunks = []
+    out = None
+    with open(os.path.join(directory, job.params['input']), 'rb') as stream:
+        for row_number, record in importer.validated_records(stream, job.params['filename'], report):
+            if out is None or chunks[-1]['rows'] >= IMPORT_CHUNK_ROWS:
+                if out:
+                    out.close()
+                name = f'import-{len(chunks) + 1:04d}.jsonl'
+                out = open(os.path.join(directory, name), 'w', encoding='utf-8')
+                chunks.append({'file': name, 'rows': 0})
+            out.write(json.dumps([row_number, record], ensure_ascii=False) + '\n')
+            chunks[-1]['rows'] += 1
+    if out:
+        out.close()
+    job.result = {'plan': report.to_dict()}
+    return chunks
+
+
+def _import_chunk(job, params):
+    report = importer.ImportReport()
+    with open(os.path.join(job_dir(job.id), params['file']), encoding='utf-8') as f:
+        importer.insert_records((tuple(json.loads(line)) for line in f), report)
+    return {'inserted': report.inserted, 'skipped': report.skipped}
+
+
+def _finish_import(job, results):
+    report = importer.ImportReport.from_dict(job.result['plan'])
+    report.inserted = sum(r['inserted'] for r in results)
+    report.skipped = sum(r['skipped'] for r in results)
+    report.elapsed = (datetime.utcnow() - job.started_at).total_seconds()
+    return {'report': report.to_dict(),
+            'message': (f'Import {report.inserted} sinh viên ({report.processed} dòng, '
+                        f'bỏ qua {report.skipped} mã SV đã tồn tại, {report.error_count} dòng lỗi)')}
+
+
+# --- Export sinh viên ---------------------------------------------------------
+
+EXPORT_FILES = {
+    'xlsx': ('danh_sach_sinh_vien.xlsx', exporter.XLSX_MIMETYPE),
+    'csv': ('danh_sach_sinh_vien.csv', 'text/csv'),  # send_file tự thêm charset=utf-8
+}
+
+
+def _plan_export(job):
+    rows = current_app.config['JOB_CHUNK_ROWS']
+    return [{'min_id': low, 'max_id': high} for low, high in _id_ranges(Student.id, [], rows)]
+
+
+def _export_chunk(job, params):
+    """Ghi các sinh viên trong khoảng id ra một file CSV tạm (không tiêu đề)"""
+    name = f"part-{params['min_id']:010d}.csv"
+    count = 0
+    with open(os.path.join(job_dir(job.id), name), 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        for row in exporter.iter_student_rows(min_id=params['min_id'], max_id=params['max_id']):
+            writer.writerow(row)
+            count += 1
+    return {'file': name, 'rows': count}
+
+
+def _iter_parts(directory, results):
+    for result in results:
+        with open(os.path.join(directory, result['file']), encoding='utf-8', newline='') as f:
+            for row in csv.reader(f):
+                yield [value or None for value in row]
+
+
+def _finish_export(job, results):
+    directory = job_dir(job.id)
+    filename, mimetype = EXPORT_FILES[job.params.get('format', 'xlsx')]
+    header = [label for label, _ in exporter.EXPORT_COLUMNS]
+    path = os.path.join(directory, filename)
+    if filename.endswith('.xlsx'):
+        exporter.xlsx_file(header, _iter_parts(directory, results), 'Sinh viên', output=path)
+    else:
+        with open(path, 'wb') as out:
+            for chunk in exporter.csv_chunks(header, []):
+                out.write(chunk)
+            for result in results:
+                with open(os.path.join(directory, result['file']), 'rb') as part:
+                    shutil.copyfileobj(part, out)
+    rows = sum(r['rows'] for r in results)
+    return {'file': filename, 'filename': filename, 'mimetype': mimetype, 'rows': rows,
+            'message': f'Đã xuất {rows} sinh viên'}
+
+
+# --- Tính lại điểm ------------------------------------------------------------
+
+def _plan_regrade(job):
+    conditions = []
+    if job.params.get('semester'):
+        conditions.append(Score.semester == job.params['semester'])
+    if job.params.get('subject_id'):
+        conditions.append(Score.subject_id == job.params['subject_id'])
+    rows = current_app.config['JOB_CHUNK_ROWS']
+    return [{'min_id': low, 'max_id': high} for low, high in _id_ranges(Score.id, conditions, rows)]
+
+
+def _regrade_chunk(job, params):
+    processed, changed = grading.regrade(semester=job.params.get('semester'),
+                                         subject_id=job.params.get('subject_id'),
+                                         min_id=params['min_id'], max_id=params['max_id'])
+    return {'processed': processed, 'changed': changed}
+
+
+def _finish_regrade(job, results):
+    processed = sum(r['processed'] for r in results)
+    changed = sum(r['changed'] for r in results)
+    if changed:
+        # Các chunk cập nhật GPA song song có thể chồng nhau trên cùng sinh viên
+        gpa.rebuild_all()
+    return {'processed': processed, 'changed': changed,
+            'message': f'Đã tính lại {processed} bản ghi điểm, {changed} bản ghi thay đổi'}
+
+
+# --- Snapshot phân tích (Parquet) ---------------------------------------------
+
+def _plan_snapshot(job):
+    import analytics
+    watermark, semesters, full = analytics.plan(full=job.params.get('full', False))
+    job.result = {'watermark': watermark.isoformat(), 'full': full}
+    return [{'semester': semester} for semester in semesters]
+
+
+def _snapshot_chunk(job, params):
+    import analytics
+    return analytics.write_partition(params['semester'])
+
+
+def _finish_snapshot(job, results):
+    import analytics
+    state = analytics.save_state(datetime.fromisoformat(job.result['watermark']), results,
+                                 job.result['full'])
+    rewritten = sum(r['rows'] for r in results)
+    return {'rows': state['rows'],
+            'message': (f'Đã ghi lại {len(results)} học kỳ ({rewritten} bản ghi), '
+                        f'snapshot có {state["rows"]} bản ghi điểm')}
+
+
+KINDS = {
+    'import_students': {'title': 'Import sinh viên', 'plan': _plan_import,
+                        'chunk': _import_chunk, 'finish': _finish_import},
+    'export_students': {'title': 'Export sinh viên', 'plan': _plan_export,
+                        'chunk': _export_chunk, 'finish': _finish_export},
+    'regrade': {'title': 'Tính lại điểm', 'plan': _plan_regrade,
+                'chunk': _regrade_chunk, 'finish': _finish_regrade},
+    'snapshot': {'title': 'Snapshot phân tích', 'plan': _plan_snapshot,
+                 'chunk': _snapshot_chunk, 'finish': _finish_snapshot},
+}
+
+
+# --- Hàng đợi -----------------------------------------------------------------
+
+def submit(kind, params=None, user_id=None, upload=None):
+    """
+    Đưa job vào hàng đợi, trả về Job. `upload` (FileStorage) được lưu vào thư mục
+    của job. Với JOB_EXECUTOR=inline job chạy xong trước khi hàm trả về.
+    """
+    if kind not in KINDS:
+        raise ValueError(f'Loại tác vụ không tồn tại: {kind}')
+    params = dict(params or {})
+    job = Job(kind=kind, status=QUEUED, params=params, created_by=user_id)
+    db.session.add(job)
+    db.session.flush()
+    directory = job_dir(job.id)
+    os.makedirs(directory, exist_ok=True)
+    if upload is not None:
+        extension = os.path.splitext(upload.filename or '')[1].lower()
+        job.params = dict(params, input=f'input{extension}', filename=upload.filename)
+        upload.save(os.path.join(directory, job.params['input']))
+    db.session.commit()
+
+    if current_app.config.get('JOB_EXECUTOR') == 'inline':
+        run_inline(job.id)
+        db.session.refresh(job)
+    return job
+
+
+def _claim(model, extra_conditions, values):
+    """Nhận một bản ghi đang chờ của model; trả về id hoặc None nếu tiến trình khác nhận trước"""
+    candidate = (select(model.id).where(model.status == QUEUED, *extra_conditions)
+                 .order_by(model.id).limit(1))
+    if db.engine.dialect.name == 'postgresql':
+        candidate = candidate.with_for_update(skip_locked=True)
+    record_id = db.session.execute(candidate).scalar()
+    if record_id is None:
+        db.session.rollback()
+        return None
+    claimed = db.session.execute(
+        update(model).where(model.id == record_id, model.status == QUEUED).values(**values))
+    db.session.commit()
+    return record_id if claimed.rowcount == 1 else None
+
+
+def _fail(job_id, error, chunk_id=None):
+    db.session.rollback()
+    now = datetime.utcnow()
+    if chunk_id is not None:
+        db.session.execute(update(JobChunk).where(JobChunk.id == chunk_id)
+                           .values(status=FAILED, finished_at=now))
+    db.session.execute(update(Job).where(Job.id == job_id, Job.status != FAILED)
+                       .values(status=FAILED, error=str(error)[:2000], finished_at=now))
+    db.session.commit()
+    current_app.logger.exception('Tác vụ nền #%s thất bại', job_id)
+
+
+def _plan(job_id):
+    job = db.session.get(Job, job_id)
+    try:
+        chunks = KINDS[job.kind]['plan'](job)
+        db.session.add_all(JobChunk(job_id=job.id, seq=seq, params=params)
+                           for seq, params in enumerate(chunks))
+        job.chunks_total = len(chunks)
+        db.session.commit()
+    except Exception as e:
+        _fail(job_id, e)
+        return
+    if not chunks:
+        _finish(job_id)
+
+
+def _run_chunk(chunk_id):
+    chunk = db.session.get(JobChunk, chunk_id)
+    job = db.session.get(Job, chunk.job_id)
+    try:
+        chunk.result = KINDS[job.kind]['chunk'](job, chunk.params)
+        chunk.status = DONE
+        chunk.finished_at = datetime.utcnow()
+        db.session.execute(update(Job).where(Job.id == job.id)
+                           .values(chunks_done=Job.chunks_done + 1))
+        done, total = db.session.execute(
+            select(Job.chunks_done, Job.chunks_total).where(Job.id == job.id)).one()
+        db.session.commit()
+    except OperationalError as e:
+        if chunk.attempts >= MAX_ATTEMPTS:
+            _fail(job.id, e, chunk_id)
+            return
+        db.session.rollback()
+        current_app.logger.warning('Chunk %s của tác vụ #%s gặp lỗi database, thử lại: %s', chunk_id, job.id, e)
+        db.session.execute(update(JobChunk).where(JobChunk.id == chunk_id)
+                           .values(status=QUEUED, worker=None, started_at=None))
+        db.session.commit()
+        return
+    except Exception as e:
+        _fail(job.id, e, chunk_id)
+        return
+    if done == total:
+        _finish(job.id)
+
+
+def _finish(job_id):
+    job = db.session.get(Job, job_id)
+    try:
+        results = db.session.execute(select(JobChunk.result).where(JobChunk.job_id == job_id)
+                                     .order_by(JobChunk.seq)).scalars().all()
+        summary = KINDS[job.kind]['finish'](job, results)
+        job.result = dict(job.result or {}, **summary)
+        job.status = DONE
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+    except Exception as e:
+        _fail(job_id, e)
+        return
+    _cleanup_work_files(job)
+
+
+def _cleanup_work_files(job):
+    """Xóa file trung gian, chỉ giữ file kết quả"""
+    directory = job_dir(job.id)
+    keep = (job.result or {}).get('file')
+    for name in os.listdir(directory):
+        if name != keep:
+            os.remove(os.path.join(directory, name))
+
+
+def work_once(worker_name):
+    """Nhận và chạy một việc: ưu tiên chunk của job đang chạy, sau đó lập kế hoạch job mới"""
+    now = datetime.utcnow()
+    running_jobs = select(Job.id).where(Job.status == RUNNING)
+    chunk_id = _claim(JobChunk, [JobChunk.job_id.in_(running_jobs)],
+                      {'status': RUNNING, 'worker': worker_name, 'started_at': now,
+                       'attempts': JobChunk.attempts + 1})
+    if chunk_id is not None:
+        _run_chunk(chunk_id)
+        return True
+    job_id = _claim(Job, [], {'status': RUNNING, 'worker': worker_name, 'started_at': now})
+    if job_id is not None:
+        _plan(job_id)
+        return True
+    return False
+
+
+def run_inline(job_id):
+    """Chạy toàn bộ job trong tiến trình hiện tại (JOB_EXECUTOR=inline)"""
+    worker_name = f'inline:{os.getpid()}'
+    db.session.execute(update(Job).where(Job.id == job_id, Job.status == QUEUED)
+                       .values(status=RUNNING, worker=worker_name, started_at=datetime.utcnow()))
+    db.session.commit()
+    _plan(job_id)
+    chunk_ids = db.session.execute(select(JobChunk.id).where(JobChunk.job_id == job_id)
+                                   .order_by(JobChunk.seq)).scalars().all()
+    for chunk_id in chunk_ids:
+        if db.session.get(Job, job_id).status != RUNNING:
+            break
+        db.session.execute(update(JobChunk).where(JobChunk.id == chunk_id)
+                           .values(status=RUNNING, worker=worker_name, started_at=datetime.utcnow(),
+                                   attempts=JobChunk.attempts + 1))
+        db.session.commit()
+        _run_chunk(chunk_id)
+
+
+def requeue_stale(max_age):
+    """Đưa lại hàng đợi các việc bị bỏ dở (worker chết) quá max_age giây; trả về số việc"""
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age)
+    chunks = db.session.execute(
+        update(JobChunk).where(JobChunk.status == RUNNING, JobChunk.started_at < cutoff)
+        .values(status=QUEUED, worker=None, started_at=None)).rowcount
+    # Job đang lập kế hoạch (chưa có chunk) thì lập lại từ đầu
+    jobs = db.session.execute(
+        update(Job).where(Job.status == RUNNING, Job.chunks_total == 0, Job.started_at < cutoff,
+                          ~Job.id.in_(select(JobChunk.job_id)))
+        .values(status=QUEUED, worker=None, started_at=None)).rowcount
+    db.session.commit()
+    return chunks + jobs
+
+
+def purge(days):
+    """Xóa job (và file kết quả) hoàn thành/thất bại trước `days` ngày; trả về số job"""
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    old = db.session.execute(select(Job.id).where(Job.status.in_([DONE, FAILED]),
+                                                  Job.finished_at < cutoff)).scalars().all()
+    for job_id in old:
+        shutil.rmtree(job_dir(job_id), ignore_errors=True)
+    if old:
+        db.session.execute(JobChunk.__table__.delete().where(JobChunk.job_id.in_(old)))
+        db.session.execute(Job.__table__.delete().where(Job.id.in_(old)))
+    db.session.commit()
+    return len(old)
+
+
+def progress(job):
+    """Phần trăm hoàn thành (lập kế hoạch tính là 0%)"""
+    if job.status == DONE:
+        return 100
+    if not job.chunks_total:
+        return 0
+    return int(job.chunks_done * 100 / job.chunks_total)
+
+
+# --- Tiến trình worker --------------------------------------------------------
+
+def beat():
+    """Ghi thời điểm (giây Unix) worker còn sống"""
+    now = int(time.time())
+    table = AppCounter.__table__
+    try:
+        if not db.session.execute(update(table).where(table.c.name == HEARTBEAT).values(value=now)).rowcount:
+            db.session.execute(table.insert().values(name=HEARTBEAT, value=now))
+        db.session.commit()
+    except (IntegrityError, OperationalError):
+        # Worker khác vừa tạo dòng heartbeat, hoặc SQLite đang bị khóa: lần sau ghi tiếp
+        db.session.rollback()
+
+
+def workers_alive():
+    """Có worker ghi heartbeat gần đây (luôn đúng với JOB_EXECUTOR=inline)"""
+    if current_app.config.get('JOB_EXECUTOR') == 'inline':
+        return True
+    last = db.session.execute(select(AppCounter.value).where(AppCounter.name == HEARTBEAT)).scalar()
+    return last is not None and last >= time.time() - 3 * HEARTBEAT_SECONDS
+
+
+def _heartbeat_loop(app, stop):
+    # Luồng riêng: worker đang chạy một chunk dài vẫn được tính là còn sống
+    with app.app_context():
+        while True:
+            beat()
+            db.session.remove()
+            if stop.wait(HEARTBEAT_SECONDS):
+                return
+
+
+def _worker_main(index, poll_interval):
+    """Điểm vào của tiến trình worker (multiprocessing spawn): tự tạo app và engine riêng"""
+    import app as app_module
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    worker_name = f'{socket.gethostname()}:{os.getpid()}'
+    threading.Thread(target=_heartbeat_loop, args=(app_module.app, stop),
+                     name='job-heartbeat', daemon=True).start()
+    with app_module.app.app_context():
+        while not stop.is_set():
+            try:
+                worked = work_once(worker_name)
+            except OperationalError:
+                # SQLite bị khóa quá busy_timeout, database tạm mất kết nối...
+                db.session.rollback()
+                worked = False
+            finally:
+                db.session.remove()
+            if not worked:
+                stop.wait(poll_interval)
+
+
+def start_workers(processes, poll_interval):
+    """Khởi động `processes` tiến trình worker (spawn: không chia sẻ kết nối với tiến trình cha)"""
+    context = multiprocessing.get_context('spawn')
+    workers = []
+    for index in range(processes):
+        process = context.Process(target=_worker_main, args=(index, poll_interval),
+                                  name=f'job-worker-{index}', daemon=True)
+        process.start()
+        workers.append(process)
+    return workers
+
+
+def run_pool(processes, poll_interval, stale_seconds, echo=print):
+    """
+    Tiến trình giám sát: chạy các worker, khởi động lại worker bị chết và định kỳ
+    đưa lại hàng đợi các việc bị bỏ dở. Dừng khi nhận SIGTERM/SIGINT.
+    """
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    workers = start_workers(processes, poll_interval)
+    echo(f'✓ Đã chạy {processes} tiến trình worker (pid {", ".join(str(w.pid) for w in workers)})')
+    try:
+        while not stop.wait(min(stale_seconds, 30)):
+            requeued = requeue_stale(stale_seconds)
+            db.session.remove()
+            if requeued:
+                echo(f'  ... đưa lại hàng đợi {requeued} việc bị bỏ dở')
+            for index, process in enumerate(workers):
+                if not process.is_alive():
+                    echo(f'  ... worker {process.pid} đã dừng (exit {process.exitcode}), khởi động lại')
+                    workers[index] = start_workers(1, poll_interval)[0]
+    finally:
+        for process in workers:
+            process.terminate()
+        for process in workers:
+            process.join()
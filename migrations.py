@@ -0,0 +1,186 @@
+"""
+Quản lý thay đổi schema (migration) và kiểm tra kế hoạch truy vấn
+
+- Bảng mới được tạo bằng db.create_all(); mọi thay đổi trên bảng đã có (thêm cột,
+  index, ràng buộc) là một migration có mã định danh trong MIGRATIONS, chạy đúng
+  một lần theo thứ tự và được ghi lại trong bảng schema_migrations.
+- check_query_plans() chạy EXPLAIN cho các truy vấn nóng và báo lỗi nếu có truy
+  vấn phải quét toàn bảng (sequential scan).
+
+Lệnh: flask db upgrade | flask db status | flask db check-plans
+"""
+
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, func, inspect, select, text
+
+import cache
+import changes
+import counters
+import search
+from models import db, ChangeLog, Score, Student, Subject
+
+migration_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', migration_metadata,
+    Column('id', String(100), primary_key=True),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class MigrationError(RuntimeError):
+    pass
+
+
+def _create_indexes(conn, model, names):
+    indexes = {index.name: index for index in model.__table__.indexes}
+    for name in names:
+        indexes[name].create(conn, checkfirst=True)
+
+
+def _search_text(conn):
+    search.setup_search_index(conn)
+
+
+def _hot_path_indexes(conn):
+    _create_indexes(conn, Student, ['ix_student_created_at', 'ix_student_status', 'ix_student_class_name'])
+    _create_indexes(conn, Score, ['ix_score_created_at_id', 'ix_score_semester_created_at',
+                                  'ix_score_subject_created_at'])
+
+
+def _score_unique_constraint(conn):
+    duplicates = conn.execute(
+        select(Score.student_id, Score.subject_id, Score.semester, func.count().label('n'))
+        .group_by(Score.student_id, Score.subject_id, Score.semester)
+        .having(func.count() > 1)
+        .limit(10)
+    ).all()
+    if duplicates:
+        sample = ', '.join(f'(student={d.student_id}, subject={d.subject_id}, semester={d.semester}) x{d.n}'
+                           for d in duplicates)
+        raise MigrationError('Bảng score có bản ghi trùng (student_id, subject_id, semester), '
+                             f'cần xử lý trước khi tạo ràng buộc duy nhất: {sample}')
+    _create_indexes(conn, Score, ['uq_score_student_subject_semester'])
+
+
+def _app_counters(conn):
+    counters.rebuild(conn)
+
+
+def _user_session_version(conn):
+    columns = {c['name'] for c in inspect(conn).get_columns('user')}
+    if 'session_version' not in columns:
+        table = conn.dialect.identifier_preparer.quote('user')
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN session_version INTEGER NOT NULL DEFAULT 1'))
+
+
+def _updated_at_columns(conn):
+    for table, backfill in (('student', 'created_at'), ('subject', None), ('score', 'created_at')):
+        columns = {c['name'] for c in inspect(conn).get_columns(table)}
+        if 'updated_at' not in columns:
+            conn.execute(text(f'ALTER TABLE {table} ADD COLUMN updated_at TIMESTAMP'))
+        source = f'COALESCE({backfill}, :now)' if backfill else ':now'
+        conn.execute(text(f'UPDATE {table} SET updated_at = {source} WHERE updated_at IS NULL'),
+                     {'now': datetime.utcnow()})
+    _create_indexes(conn, Student, ['ix_student_updated_at'])
+    _create_indexes(conn, Subject, ['ix_subject_updated_at'])
+    _create_indexes(conn, Score, ['ix_score_updated_at'])
+
+
+def _cache_generations(conn):
+    cache.setup_generations(conn)
+
+
+def _change_log(conn):
+    changes.setup_change_log(conn)
+
+
+# Thứ tự chạy; không sửa/xóa migration đã phát hành, chỉ thêm mới vào cuối
+MIGRATIONS = [
+    ('0001_student_search_text', _search_text),
+    ('0002_hot_path_indexes', _hot_path_indexes),
+    ('0003_score_unique_student_subject_semester', _score_unique_constraint),
+    ('0004_app_counters', _app_counters),
+    ('0005_user_session_version', _user_session_version),
+    ('0006_updated_at_columns', _updated_at_columns),
+    ('0007_cache_generations', _cache_generations),
+    ('0008_change_log', _change_log),
+]
+
+
+def applied_migrations(conn):
+    migration_metadata.create_all(conn)
+    return set(conn.execute(select(schema_migrations.c.id)).scalars())
+
+
+def upgrade(echo=print):
+    """Tạo bảng còn thiếu rồi chạy các migration chưa được áp dụng, mỗi migration một transaction"""
+    db.create_all()
+    engine = db.engine
+    with engine.begin() as conn:
+        done = applied_migrations(conn)
+    applied = []
+    for migration_id, migrate in MIGRATIONS:
+        if migration_id in done:
+            continue
+        with engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(id=migration_id, applied_at=datetime.utcnow()))
+        applied.append(migration_id)
+        if echo:
+            echo(f'✓ Migration {migration_id}')
+    return applied
+
+
+def status():
+    """Danh sách (mã migration, đã áp dụng?)"""
+    with db.engine.begin() as conn:
+        done = applied_migrations(conn)
+    return [(migration_id, migration_id in done) for migration_id, _ in MIGRATIONS]
+
+
+def hot_queries():
+    """Các truy vấn nóng của ứng dụng cần được phục vụ bằng index"""
+    return {
+        'scores: trang mới nhất': select(Score.id).order_by(Score.created_at.desc(), Score.id.desc()).limit(51),
+        'scores: lọc học kỳ': select(Score.id).where(Score.semester == 'HK1-2024')
+        .order_by(Score.created_at.desc(), Score.id.desc()).limit(51),
+        'scores: lọc môn học': select(Score.id).where(Score.subject_id == 1)
+        .order_by(Score.created_at.desc(), Score.id.desc()).limit(51),
+        'scores: của một sinh viên': select(Score.id).where(Score.student_id == 1),
+        'students: mới nhất': select(Student.id).order_by(Student.created_at.desc()).limit(5),
+        'students: đang học': select(func.count()).select_from(Student).where(Student.status == 'active'),
+        'students: theo lớp': select(Student.id).where(Student.class_name == 'CNTT-K17'),
+        'changes: feed theo cursor': select(ChangeLog.id).where(ChangeLog.id > 1000).order_by(ChangeLog.id).limit(1000),
+        'changes: cursor theo thời điểm': select(func.min(ChangeLog.id))
+        .where(ChangeLog.changed_at >= datetime(2024, 1, 1)),
+    }
+
+
+def _plan_sqlite(conn, sql):
+    rows = conn.execute(text('EXPLAIN QUERY PLAN ' + sql)).all()
+    details = [row[-1] for row in rows]
+    seq_scans = [d for d in details if d.startswith('SCAN ') and ' USING ' not in d]
+    return details, seq_scans
+
+
+def _plan_postgresql(conn, sql):
+    # Bảng nhỏ thì planner luôn chọn Seq Scan; tắt seqscan để kiểm tra có
+    # đường đi bằng index hay không (nếu không có, planner vẫn buộc phải Seq Scan)
+    conn.execute(text('SET LOCAL enable_seqscan = off'))
+    details = [row[0] for row in conn.execute(text('EXPLAIN ' + sql)).all()]
+    seq_scans = [d.strip() for d in details if 'Seq Scan' in d]
+    return details, seq_scans
+
+
+def check_query_plans():
+    """Trả về {tên truy vấn: (kế hoạch, các bước quét toàn bảng)}"""
+    engine = db.engine
+    explain = _plan_postgresql if engine.dialect.name == 'postgresql' else _plan_sqlite
+    results = {}
+    with engine.connect() as conn:
+        for name, stmt in hot_queries().items():
+            sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True}))
+            with conn.begin():
+                results[name] = explain(conn, sql)
+    return results
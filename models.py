@@ -0,0 +1,216 @@
+"""
+Định nghĩa các model của hệ thống quản lý sinh viên
+"""
+
+from flask_sqlalchemy import SQLAlchemy
+from flask_login import UserMixin
+from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
+
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+# Models
+class User(UserMixin, db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    username = db.Column(db.String(80), unique=True, nullable=False)
+    password = db.Column(db.String(200), nullable=False)
+    role = db.Column(db.String(20), nullable=False)  # admin, teacher, student
+    full_name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120))
+    # Tăng khi đổi mật khẩu/vai trò để vô hiệu các session cũ (xem auth.py)
+    session_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    
+    def set_password(self, password):
+        self.password = generate_password_hash(password)
+    
+    def check_password(self, password):
+        return check_password_hash(self.password, password)
+    
+    def get_id(self):
+        return f'{self.id}:{self.session_version or 1}'
+
+class Student(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    student_id = db.Column(db.String(20), unique=True, nullable=False)
+    full_name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120))
+    phone = db.Column(db.String(20))
+    birth_date = db.Column(db.Date)
+    class_name = db.Column(db.String(50))
+    major = db.Column(db.String(100))
+    # active_history: counters.py cần trạng thái cũ kể cả khi thuộc tính đã expire
+    status = db.column_property(db.Column(db.String(20), default='active'), active_history=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Mã SV + họ tên đã bỏ dấu, viết thường - dùng cho tìm kiếm (xem search.py)
+    search_text = db.Column(db.String(200))
+    scores = db.relationship('Score', backref='student', lazy=True, cascade='all, delete-orphan')
+    
+    __table_args__ = (
+        db.Index('ix_student_created_at', 'created_at'),
+        db.Index('ix_student_status', 'status'),
+        db.Index('ix_student_class_name', 'class_name', 'id'),
+        db.Index('ix_student_updated_at', 'updated_at'),
+    )
+
+class Subject(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    subject_code = db.Column(db.String(20), unique=True, nullable=False)
+    subject_name = db.Column(db.String(100), nullable=False)
+    credits = db.Column(db.Integer, nullable=False)
+    semester = db.Column(db.String(20))
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
+    scores = db.relationship('Score', backref='subject', lazy=True, cascade='all, delete-orphan')
+
+class Score(db.Model):
+    # Chính sách mặc định khi không có GradingPolicy nào khớp:
+    # trọng số giữa kỳ / cuối kỳ và thang điểm chữ (ngưỡng tối thiểu, từ cao xuống thấp)
+    MIDTERM_WEIGHT = 0.4
+    FINAL_WEIGHT = 0.6
+    GRADE_SCALE = [
+        (9.0, 'A+'), (8.5, 'A'), (8.0, 'B+'), (7.0, 'B'),
+        (6.5, 'C+'), (5.5, 'C'), (5.0, 'D+'), (4.0, 'D'),
+    ]
+    FAIL_GRADE = 'F'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    # active_history: gán lại thuộc tính đã expire (sau commit) vẫn giữ giá trị cũ
+    # trong history để gpa.py trừ đúng phần đóng góp cũ
+    student_id = db.column_property(db.Column(db.Integer, db.ForeignKey('student.id'), nullable=False),
+                                    active_history=True)
+    subject_id = db.column_property(db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False),
+                                    active_history=True)
+    midterm_score = db.Column(db.Float)
+    final_score = db.Column(db.Float)
+    average_score = db.Column(db.Float)
+    letter_grade = db.column_property(db.Column(db.String(2)), active_history=True)
+    semester = db.column_property(db.Column(db.String(20)), active_history=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('uq_score_student_subject_semester', 'student_id', 'subject_id', 'semester', unique=True),
+        db.Index('ix_score_created_at_id', 'created_at', 'id'),
+        db.Index('ix_score_semester_created_at', 'semester', 'created_at', 'id'),
+        db.Index('ix_score_subject_created_at', 'subject_id', 'created_at', 'id'),
+        db.Index('ix_score_updated_at', 'updated_at'),
+    )
+    
+    def calculate_average(self):
+        """Tính điểm TB và điểm chữ theo chính sách áp dụng cho môn/học kỳ (xem grading.py)"""
+        if self.midterm_score is not None and self.final_score is not None:
+            from grading import resolve_policy
+            policy = resolve_policy(self.subject_id, self.semester)
+            self.average_score, self.letter_grade = policy.grade(self.midterm_score, self.final_score)
+    
+    @classmethod
+    def get_letter_grade(cls, score):
+        for threshold, grade in cls.GRADE_SCALE:
+            if score >= threshold:
+                return grade
+        return cls.FAIL_GRADE
+
+class StudentGpa(db.Model):
+    """Tổng hợp GPA/tín chỉ của từng sinh viên, được duy trì bởi gpa.py"""
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id', ondelete='CASCADE'), primary_key=True)
+    total_credits = db.Column(db.Integer, nullable=False, default=0)
+    total_points = db.Column(db.Float, nullable=False, default=0)
+    gpa = db.Column(db.Float, nullable=False, default=0, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class StudentSemesterGpa(db.Model):
+    """Tổng hợp GPA/tín chỉ của từng sinh viên theo học kỳ ('' = chưa ghi học kỳ)"""
+    student_id = db.Column(db.Integer, db.ForeignKey('student.id', ondelete='CASCADE'), primary_key=True)
+    semester = db.Column(db.String(20), primary_key=True, default='')
+    total_credits = db.Column(db.Integer, nullable=False, default=0)
+    total_points = db.Column(db.Float, nullable=False, default=0)
+    gpa = db.Column(db.Float, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('ix_student_semester_gpa_semester_gpa', 'semester', 'gpa'),
+    )
+
+class GradingPolicy(db.Model):
+    """
+    Chính sách tính điểm (trọng số, thang điểm chữ, cách làm tròn) áp dụng cho
+    một học kỳ và/hoặc một môn học; NULL nghĩa là áp dụng cho tất cả. Mỗi lần
+    thay đổi tạo một version mới, version cao nhất có hiệu lực (xem grading.py).
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    semester = db.Column(db.String(20), index=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), index=True)
+    version = db.Column(db.Integer, nullable=False, default=1)
+    midterm_weight = db.Column(db.Float, nullable=False)
+    final_weight = db.Column(db.Float, nullable=False)
+    grade_scale = db.Column(db.JSON, nullable=False)  # [[9.0, "A+"], [8.5, "A"], ...]
+    fail_grade = db.Column(db.String(2), nullable=False, default='F')
+    decimals = db.Column(db.Integer, nullable=False, default=2)
+    rounding = db.Column(db.String(10), nullable=False, default='half_even')  # half_even, half_up
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class AppCounter(db.Model):
+    """Bộ đếm dùng chung giữa các worker (tổng sinh viên, điểm...), duy trì bởi counters.py"""
+    name = db.Column(db.String(50), primary_key=True)
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+class Job(db.Model):
+    """
+    Tác vụ nền (import, export, tính lại điểm) trong hàng đợi trên database.
+    Job được chia thành các JobChunk để nhiều tiến trình worker xử lý song song
+    (xem jobs.py). status: queued, running, done, failed.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    chunks_total = db.Column(db.Integer, nullable=False, default=0)
+    chunks_done = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100))
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='SET NULL'), index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_status_id', 'status', 'id'),
+    )
+
+class JobChunk(db.Model):
+    """Một phần việc của Job (một khoảng id, một lô dòng import...)"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('job.id', ondelete='CASCADE'), nullable=False, index=True)
+    seq = db.Column(db.Integer, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    params = db.Column(db.JSON, nullable=False, default=dict)
+    result = db.Column(db.JSON)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    worker = db.Column(db.String(100))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_job_chunk_status_id', 'status', 'id'),
+    )
+
+class ChangeLog(db.Model):
+    """
+    Nhật ký thêm/sửa/xóa bản ghi student, subject, score; được ghi bởi trigger
+    trong database (xem changes.py). id tăng dần là cursor của /api/v1/changes.
+    """
+    id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    table_name = db.Column(db.String(20), nullable=False)
+    row_id = db.Column(db.Integer, nullable=False)
+    op = db.Column(db.String(6), nullable=False)  # insert, update, delete
+    changed_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_change_log_changed_at', 'changed_at'),
+        # AUTOINCREMENT: SQLite không dùng lại id sau khi purge xóa các dòng cuối
+        {'sqlite_autoincrement': True},
+    )
@@ -0,0 +1,82 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Thay vì OFFSET (càng về sau càng chậm), mỗi trang được xác định bởi giá trị
+khóa sắp xếp của bản ghi cuối cùng trang trước. Truy vấn chỉ cần đọc
+`limit + 1` dòng theo index nên thời gian gần như không đổi theo kích thước bảng.
+"""
+
+import base64
+import json
+from datetime import date, datetime
+
+from sqlalchemy import tuple_
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode_value(value, column):
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except (AttributeError, NotImplementedError):
+        return value
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+    if python_type is date:
+        return date.fromisoformat(value)
+    return value
+
+
+def encode_cursor(values):
+    """Mã hóa bộ giá trị khóa thành chuỗi an toàn cho URL"""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Giải mã cursor; trả về None nếu cursor rỗng hoặc không hợp lệ"""
+    if not token:
+        return None
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if not isinstance(values, list) or len(values) != len(columns):
+            return None
+        return [_decode_value(v, c) for v, c in zip(values, columns)]
+    except (ValueError, TypeError):
+        return None
+
+
+def keyset_page(query, columns, cursor=None, limit=50, descending=True, key=None):
+    """
+    Lấy một trang theo keyset trên các cột `columns` (ví dụ created_at, id).
+
+    `key` là hàm lấy bộ giá trị khóa từ một phần tử kết quả; mặc định đọc
+    thuộc tính cùng tên với các cột. Trả về (items, next_cursor).
+    """
+    values = decode_cursor(cursor, columns)
+    if values is not None:
+        if descending:
+            query = query.filter(tuple_(*columns) < tuple_(*values))
+        else:
+            query = query.filter(tuple_(*columns) > tuple_(*values))
+
+    ordering = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*ordering).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        if key is None:
+            last_values = [getattr(last, c.key) for c in columns]
+        else:
+            last_values = key(last)
+        next_cursor = encode_cursor(last_values)
+    return rows, next_cursor
@@ -0,0 +1,315 @@
+"""
+Đo thời gian từng request, thống kê SQL và số liệu Prometheus
+
+- Mỗi request (trừ /metrics và static) được ghi vào histogram độ trễ theo route
+  (endpoint Flask) và phương thức; số câu SQL và tổng thời gian DB của request
+  đo bằng event before_cursor_execute / after_cursor_execute của SQLAlchemy.
+  Response có header Server-Timing (app, db) để xem ngay trong DevTools.
+- Nghi vấn N+1: khi một câu lệnh SQL giống hệt nhau (chỉ khác tham số) chạy từ
+  NPLUSONE_THRESHOLD lần trở lên trong cùng một request, app.logger ghi cảnh báo
+  kèm câu lệnh và bộ đếm n_plus_one_warnings_total tăng.
+- /metrics trả số liệu dạng text của Prometheus (kèm pool kết nối và cache, xem
+  cache.py). Số liệu nằm trong bộ nhớ của từng worker (nhãn pid), mỗi lần scrape
+  chỉ thấy worker nhận request đó.
+- Profile một request (PROFILE_REQUESTS=1, chỉ admin): thêm ?_profile=1 để ghi
+  file vào PROFILE_DIR (cProfile .prof, mở bằng pstats/snakeviz; hoặc .html của
+  pyinstrument nếu PROFILER=pyinstrument và đã cài), ?_profile=text để nhận báo
+  cáo dạng text thay cho response.
+
+Response dạng luồng (export CSV, báo cáo) chỉ được tính tới lúc bắt đầu gửi.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, has_request_context, request
+from flask_login import current_user
+from sqlalchemy import event
+
+# Ngưỡng (giây) của histogram, giống mặc định của các thư viện client Prometheus
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+SKIPPED_ENDPOINTS = ('main.metrics', 'static')
+UNMATCHED_ENDPOINT = '<unmatched>'
+
+
+def _label_text(labels):
+    if not labels:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+               for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+class Histogram:
+    def __init__(self, name, help_text, label_names, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, label_values, value):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * len(self.buckets), 0.0, 0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[0][index] += 1
+                break
+        series[1] += value
+        series[2] += 1
+
+    def render(self, extra):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for label_values, (counts, total, count) in sorted(self._series.items()):
+            labels = dict(zip(self.label_names, label_values), **extra)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{self.name}_bucket{_label_text(dict(labels, le=f"{bound:g}"))} {cumulative}')
+            lines.append(f'{self.name}_bucket{_label_text(dict(labels, le="+Inf"))} {count}')
+            lines.append(f'{self.name}_sum{_label_text(labels)} {total:.6f}')
+            lines.append(f'{self.name}_count{_label_text(labels)} {count}')
+        return lines
+
+
+class CounterMetric:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self._values = {}
+
+    def inc(self, label_values, amount=1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self, extra):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for label_values, value in sorted(self._values.items()):
+            labels = dict(zip(self.label_names, label_values), **extra)
+            lines.append(f'{self.name}{_label_text(labels)} {value:g}')
+        return lines
+
+
+class MetricsRegistry:
+    """Số liệu của worker hiện tại; mọi thao tác ghi/đọc đi qua một lock"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = CounterMetric('http_requests_total', 'Số request đã xử lý',
+                                      ('endpoint', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Thời gian xử lý request',
+                                 ('endpoint', 'method'), LATENCY_BUCKETS)
+        self.queries = Histogram('db_queries_per_request', 'Số câu SQL mỗi request',
+                                 ('endpoint',), QUERY_COUNT_BUCKETS)
+        self.db_time = Histogram('db_time_per_request_seconds', 'Tổng thời gian SQL mỗi request',
+                                 ('endpoint',), LATENCY_BUCKETS)
+        self.n_plus_one = CounterMetric('n_plus_one_warnings_total',
+                                        'Số request có câu SQL lặp lại nghi N+1', ('endpoint',))
+
+    def record(self, endpoint, method, status, elapsed, query_count, db_time, n_plus_one):
+        with self._lock:
+            self.requests.inc((endpoint, method, str(status)))
+            self.latency.observe((endpoint, method), elapsed)
+            self.queries.observe((endpoint,), query_count)
+            self.db_time.observe((endpoint,), db_time)
+            if n_plus_one:
+                self.n_plus_one.inc((endpoint,))
+
+    def render(self, pool_stats=None, cache_stats=None):
+        extra = {'pid': os.getpid()}
+        with self._lock:
+            lines = []
+            for metric in (self.requests, self.latency, self.queries, self.db_time, self.n_plus_one):
+                lines.extend(metric.render(extra))
+        if pool_stats:
+            gauges = (('db_pool_checked_out', 'gauge', 'checked_out', 'Kết nối đang được dùng'),
+                      ('db_pool_checkouts_total', 'counter', 'checkouts', 'Số lần lấy kết nối từ pool'),
+                      ('db_pool_timeouts_total', 'counter', 'timeouts', 'Số lần hết thời gian chờ pool'))
+            for name, kind, key, help_text in gauges:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}']
+                for engine, stats in sorted(pool_stats.items()):
+                    if key in stats:
+                        lines.append(f'{name}{_label_text(dict(extra, engine=engine))} {stats[key]}')
+        if cache_stats:
+            series = (('cache_entries', 'gauge', 'entries', 'Số mục trong cache truy vấn/fragment'),
+                      ('cache_bytes', 'gauge', 'bytes', 'Kích thước ước lượng của cache (byte)'),
+                      ('cache_hits_total', 'counter', 'hits', 'Số lần đọc trúng cache'),
+                      ('cache_misses_total', 'counter', 'misses', 'Số lần không có trong cache'),
+                      ('cache_evictions_total', 'counter', 'evictions', 'Số mục bị đẩy ra theo LRU'))
+            for name, kind, key, help_text in series:
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} {kind}',
+                          f'{name}{_label_text(extra)} {cache_stats[key]}']
+        return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+
+class RequestStats:
+    """Số câu SQL, thời gian DB và số lần lặp từng câu lệnh trong một request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.db_time = 0.0
+        self.statements = Counter()
+
+    def repeated(self, threshold):
+        return [(statement, count) for statement, count in self.statements.most_common()
+                if count >= threshold]
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._profiling_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    stats = g.get('_request_stats') if has_request_context() else None
+    if stats is None or context is None:
+        return
+    stats.query_count += 1
+    stats.db_time += time.perf_counter() - getattr(context, '_profiling_started', time.perf_counter())
+    stats.statements[statement] += 1
+
+
+def _endpoint():
+    return request.endpoint or UNMATCHED_ENDPOINT
+
+
+def _start_request():
+    if request.endpoint in SKIPPED_ENDPOINTS:
+        return
+    g._request_stats = RequestStats()
+    mode = request.args.get('_profile')
+    if mode and current_app.config.get('PROFILE_REQUESTS') and _is_admin():
+        g._profiler = _start_profiler(current_app.config.get('PROFILER', 'cprofile'))
+        g._profile_mode = mode
+
+
+def _is_admin():
+    return current_user.is_authenticated and current_user.role == 'admin'
+
+
+def _start_profiler(kind):
+    if kind == 'pyinstrument':
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            current_app.logger.warning('PROFILER=pyinstrument nhưng chưa cài pyinstrument, dùng cProfile')
+        else:
+            profiler = Profiler()
+            profiler.start()
+            return profiler
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _finish_profile(profiler, response):
+    """Dừng profiler; ghi file vào PROFILE_DIR hoặc thay response bằng báo cáo text"""
+    is_cprofile = isinstance(profiler, cProfile.Profile)
+    if is_cprofile:
+        profiler.disable()
+    else:
+        profiler.stop()
+
+    if g._profile_mode == 'text':
+        if is_cprofile:
+            output = io.StringIO()
+            pstats.Stats(profiler, stream=output).sort_stats('cumulative').print_stats(60)
+            text = output.getvalue()
+        else:
+            text = profiler.output_text(unicode=True)
+        return current_app.response_class(text, content_type='text/plain; charset=utf-8')
+
+    directory = current_app.config.get('PROFILE_DIR')
+    os.makedirs(directory, exist_ok=True)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{_endpoint().replace('.', '_')}-{os.getpid()}"
+    if is_cprofile:
+        path = os.path.join(directory, f'{name}.prof')
+        profiler.dump_stats(path)
+    else:
+        path = os.path.join(directory, f'{name}.html')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(profiler.output_html())
+    response.headers['X-Profile-File'] = path
+    return response
+
+
+def _finish_request(response):
+    stats = g.pop('_request_stats', None)
+    if stats is None:
+        return response
+    elapsed = time.perf_counter() - stats.started
+    endpoint = _endpoint()
+
+    profiler = g.pop('_profiler', None)
+    if profiler is not None:
+        response = _finish_profile(profiler, response)
+
+    repeated = stats.repeated(current_app.config.get('NPLUSONE_THRESHOLD', 10))
+    for statement, count in repeated[:3]:
+        current_app.logger.warning('Nghi vấn N+1 tại %s %s: câu SQL chạy %d lần: %s',
+                                   request.method, request.path, count, ' '.join(statement.split())[:300])
+
+    metrics.record(endpoint, request.method, response.status_code, elapsed,
+                   stats.query_count, stats.db_time, bool(repeated))
+    response.headers.add('Server-Timing', f'app;dur={elapsed * 1000:.1f}')
+    response.headers.add('Server-Timing',
+                         f'db;dur={stats.db_time * 1000:.1f};desc="{stats.query_count} queries"')
+    return response
+
+
+def _teardown_request(exc):
+    """
+    View ném lỗi mà lỗi được lan ra ngoài (PROPAGATE_EXCEPTIONS, debug) thì Flask
+    bỏ qua after_request: ghi số liệu ở đây để lỗi 500 vẫn hiện trên /metrics
+    """
+    stats = g.pop('_request_stats', None)
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - stats.started
+    profiler = g.pop('_profiler', None)
+    if isinstance(profiler, cProfile.Profile):
+        profiler.disable()
+    elif profiler is not None:
+        profiler.stop()
+    status = getattr(exc, 'code', None) or 500
+    metrics.record(_endpoint(), request.method, status, elapsed, stats.query_count, stats.db_time,
+                   bool(stats.repeated(current_app.config.get('NPLUSONE_THRESHOLD', 10))))
+
+
+def metrics_authorized():
+    """/metrics: cần header Authorization: Bearer <METRICS_TOKEN>, hoặc đăng nhập admin"""
+    token = current_app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return _is_admin()
+
+
+def instrument_engine(app, engine):
+    """Gắn event đo SQL vào engine (nếu METRICS_ENABLED)"""
+    if app.config.get('METRICS_ENABLED', True):
+        event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def init_app(app, db):
+    """Gắn event đo SQL vào các engine và hook đo request (nếu METRICS_ENABLED)"""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(app, engine)
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    app.teardown_request(_teardown_request)
@@ -0,0 +1,192 @@
+"""
+Báo cáo xếp hạng và bảng điểm tính bằng hàm cửa sổ (window function) trong SQL
+
+Mỗi báo cáo là đúng một câu SELECT trên Score JOIN Subject (lấy số tín chỉ):
+- rankings:   GPA từng sinh viên, hạng và phân vị trong lớp và trong chuyên ngành
+              (RANK / PERCENT_RANK / COUNT OVER PARTITION BY lớp, ngành)
+- pass_rates: số bản ghi đạt/trượt và tỉ lệ đạt theo môn, học kỳ, kèm hạng độ
+              khó trong học kỳ (RANK theo tỉ lệ trượt)
+- transcript: bảng điểm từng sinh viên kèm GPA học kỳ và tín chỉ tích lũy
+              (SUM OVER PARTITION BY sinh viên, học kỳ / running sum)
+Kết quả được đọc theo lô bằng server-side cursor và ghi thẳng ra CSV/Excel
+(exporter.csv_chunks / exporter.xlsx_file).
+
+PostgreSQL và SQLite đều hỗ trợ các hàm cửa sổ này; khác biệt nằm ở phép làm
+tròn (PostgreSQL chỉ có round(numeric, n)) và phép chia số nguyên, được xử lý
+trong _round2() và _ratio().
+"""
+
+from sqlalchemy import Float, Numeric, case, cast, func, select
+
+import exporter
+import gpa
+from models import db, GradingPolicy, Score, Student, Subject
+
+PREVIEW_ROWS = 50
+
+
+def _round2(expr):
+    if db.engine.dialect.name == 'postgresql':
+        return func.round(cast(expr, Numeric), 2)
+    return func.round(expr, 2)
+
+
+def _ratio(numerator, denominator):
+    """numerator / denominator dạng số thực (tránh chia nguyên trên PostgreSQL), 0 nếu mẫu = 0"""
+    return case((denominator > 0, cast(numerator, Float) / denominator), else_=0.0)
+
+
+def _fail_grades():
+    grades = {Score.FAIL_GRADE}
+    grades.update(db.session.execute(select(GradingPolicy.fail_grade).distinct()).scalars())
+    return sorted(grades)
+
+
+def _score_filters(stmt, filters):
+    if filters.get('semester'):
+        stmt = stmt.where(Score.semester == filters['semester'])
+    if filters.get('class_name'):
+        stmt = stmt.where(Student.class_name == filters['class_name'])
+    if filters.get('major'):
+        stmt = stmt.where(Student.major == filters['major'])
+    return stmt
+
+
+def rankings_query(filters):
+    """GPA (theo học kỳ nếu lọc học kỳ) cùng hạng/phân vị trong lớp và ngành"""
+    points = func.sum(case(gpa.GRADE_POINTS, value=Score.letter_grade, else_=0.0) * Subject.credits)
+    credits = func.sum(Subject.credits)
+    per_student = (select(Score.student_id,
+                          credits.label('credits'),
+                          _ratio(points, credits).label('gpa'))
+                   .join(Subject, Subject.id == Score.subject_id)
+                   .where(Score.letter_grade.isnot(None))
+                   .group_by(Score.student_id))
+    if filters.get('semester'):
+        per_student = per_student.where(Score.semester == filters['semester'])
+    per_student = per_student.cte('per_student')
+
+    gpa_col = per_student.c.gpa
+    by_class = {'partition_by': Student.class_name}
+    by_major = {'partition_by': Student.major}
+    ranked = (select(
+        Student.student_id, Student.full_name, Student.class_name, Student.major,
+        per_student.c.credits, gpa_col.label('gpa'),
+        func.rank().over(order_by=gpa_col.desc(), **by_class).label('class_rank'),
+        func.count().over(**by_class).label('class_size'),
+        func.percent_rank().over(order_by=gpa_col, **by_class).label('class_pct'),
+        func.rank().over(order_by=gpa_col.desc(), **by_major).label('major_rank'),
+        func.count().over(**by_major).label('major_size'),
+        func.percent_rank().over(order_by=gpa_col, **by_major).label('major_pct'),
+    ).join(per_student, per_student.c.student_id == Student.id)).subquery('ranked')
+
+    # Lọc lớp/ngành ở truy vấn ngoài để hạng vẫn tính trên toàn bộ lớp và ngành
+    stmt = select(ranked.c.student_id, ranked.c.full_name, ranked.c.class_name, ranked.c.major,
+                  ranked.c.credits, _round2(ranked.c.gpa),
+                  ranked.c.class_rank, ranked.c.class_size, _round2(ranked.c.class_pct * 100),
+                  ranked.c.major_rank, ranked.c.major_size, _round2(ranked.c.major_pct * 100))
+    if filters.get('class_name'):
+        stmt = stmt.where(ranked.c.class_name == filters['class_name'])
+    if filters.get('major'):
+        stmt = stmt.where(ranked.c.major == filters['major'])
+    return stmt.order_by(ranked.c.class_name, ranked.c.class_rank, ranked.c.student_id)
+
+
+def pass_rates_query(filters):
+    """Tỉ lệ đạt/trượt theo môn và học kỳ, xếp hạng môn khó nhất trong từng học kỳ"""
+    graded = Score.letter_grade.isnot(None)
+    failed = Score.letter_grade.in_(_fail_grades())
+    total = func.count().filter(graded)
+    fail_count = func.count().filter(failed)
+    fail_rate = _ratio(fail_count, total)
+
+    stmt = (select(
+        Subject.subject_code, Subject.subject_name, Score.semester,
+        total.label('total'),
+        (total - fail_count).label('passed'),
+        fail_count.label('failed'),
+        _round2((1 - fail_rate) * 100).label('pass_rate'),
+        _round2(func.avg(Score.average_score)).label('mean'),
+        func.rank().over(partition_by=Score.semester, order_by=fail_rate.desc()).label('difficulty_rank'),
+    ).select_from(Score).join(Subject, Subject.id == Score.subject_id))
+    if filters.get('class_name') or filters.get('major'):
+        stmt = stmt.join(Student, Student.id == Score.student_id)
+    stmt = _score_filters(stmt, filters)
+    stmt = stmt.group_by(Subject.id, Subject.subject_code, Subject.subject_name, Score.semester)
+    return stmt.order_by(Score.semester, 'difficulty_rank', Subject.subject_code)
+
+
+def transcript_query(filters):
+    """Bảng điểm theo sinh viên: GPA học kỳ và tín chỉ tích lũy tính bằng hàm cửa sổ"""
+    point_value = case(gpa.GRADE_POINTS, value=Score.letter_grade, else_=0.0) * Subject.credits
+    earned = case((Score.letter_grade.in_(_fail_grades()), 0), else_=Subject.credits)
+    term = {'partition_by': [Score.student_id, Score.semester]}
+    semester_gpa = _ratio(func.sum(point_value).over(**term), func.sum(Subject.credits).over(**term))
+    cumulative = func.sum(earned).over(partition_by=Score.student_id,
+                                       order_by=[Score.semester, Subject.subject_code],
+                                       rows=(None, 0))
+
+    stmt = (select(
+        Student.student_id, Student.full_name, Student.class_name, Score.semester,
+        Subject.subject_code, Subject.subject_name, Subject.credits,
+        Score.midterm_score, Score.final_score, Score.average_score, Score.letter_grade,
+        _round2(semester_gpa), cumulative,
+    ).select_from(Score)
+        .join(Student, Student.id == Score.student_id)
+        .join(Subject, Subject.id == Score.subject_id)
+        .where(Score.letter_grade.isnot(None)))
+    stmt = _score_filters(stmt, filters)
+    return stmt.order_by(Student.class_name, Student.student_id, Score.semester, Subject.subject_code)
+
+
+REPORTS = {
+    'rankings': {
+        'title': 'Xếp hạng GPA theo lớp và chuyên ngành',
+        'sheet': 'Xếp hạng',
+        'header': ['Mã SV', 'Họ tên', 'Lớp', 'Chuyên ngành', 'Tín chỉ', 'GPA',
+                   'Hạng trong lớp', 'Sĩ số lớp', 'Phân vị lớp (%)',
+                   'Hạng trong ngành', 'Số SV ngành', 'Phân vị ngành (%)'],
+        'query': rankings_query,
+    },
+    'pass_rates': {
+        'title': 'Tỉ lệ đạt/trượt theo môn học',
+        'sheet': 'Tỉ lệ đạt',
+        'header': ['Mã môn', 'Tên môn', 'Học kỳ', 'Số bản ghi', 'Đạt', 'Trượt',
+                   'Tỉ lệ đạt (%)', 'Điểm TB', 'Hạng độ khó trong học kỳ'],
+        'query': pass_rates_query,
+    },
+    'transcript': {
+        'title': 'Bảng điểm theo sinh viên',
+        'sheet': 'Bảng điểm',
+        'header': ['Mã SV', 'Họ tên', 'Lớp', 'Học kỳ', 'Mã môn', 'Tên môn', 'Tín chỉ',
+                   'Điểm GK', 'Điểm CK', 'Điểm TB', 'Điểm chữ', 'GPA học kỳ', 'Tín chỉ tích lũy'],
+        'query': transcript_query,
+    },
+}
+
+FILTER_NAMES = ('semester', 'class_name', 'major')
+
+
+def _report(name):
+    if name not in REPORTS:
+        raise ValueError(f'Báo cáo không tồn tại: {name}')
+    return REPORTS[name]
+
+
+def iter_report(name, filters, fetch_size=exporter.FETCH_SIZE):
+    """Duyệt các dòng của báo cáo, giữ tối đa fetch_size dòng trong bộ nhớ"""
+    return exporter.iter_rows(_report(name)['query'](filters or {}), fetch_size)
+
+
+def preview(name, filters, limit=PREVIEW_ROWS):
+    stmt = _report(name)['query'](filters or {}).limit(limit)
+    return [tuple(row) for row in db.session.execute(stmt)]
+
+
+def report_csv(name, filters):
+    return exporter.csv_chunks(_report(name)['header'], iter_report(name, filters))
+
+
+def report_xlsx(name, filters):
+    report = _report(name)
+    return exporter.xlsx_file(report['header'], iter_report(name, filters), report['sheet'])
@@ -0,0 +1,155 @@
+"""
+Tìm kiếm sinh viên theo mã SV / họ tên
+
+- Cột `Student.search_text` lưu mã SV + họ tên đã bỏ dấu, viết thường
+  ("nguyen" khớp "Nguyễn", "duc" khớp "Đức").
+- PostgreSQL: index GIN trigram (pg_trgm) trên search_text, xếp hạng bằng similarity().
+- SQLite: bảng ảo FTS5 (tokenizer trigram) đồng bộ bằng trigger, xếp hạng bằng bm25().
+- Kết quả phân trang bằng cursor (xem pagination.py).
+"""
+
+import unicodedata
+
+from sqlalchemy import column, event, func, inspect, literal_column, table, text
+
+from models import db, Student
+from pagination import keyset_page
+
+# Trigram tokenizer của FTS5 không khớp chuỗi ngắn hơn 3 ký tự
+MIN_FTS_TOKEN = 3
+BACKFILL_BATCH_SIZE = 1000
+
+student_fts = table('student_fts', column('rowid'))
+
+
+def fold_text(value):
+    """Bỏ dấu tiếng Việt, viết thường và chuẩn hóa khoảng trắng"""
+    if not value:
+        return ''
+    value = str(value).replace('đ', 'd').replace('Đ', 'D')
+    decomposed = unicodedata.normalize('NFD', value)
+    stripped = ''.join(ch for ch in decomposed if unicodedata.category(ch) != 'Mn')
+    return ' '.join(stripped.lower().split())
+
+
+def build_search_text(student_id, full_name):
+    return fold_text(f'{student_id or ""} {full_name or ""}')
+
+
+@event.listens_for(Student, 'before_insert')
+@event.listens_for(Student, 'before_update')
+def _sync_search_text(mapper, connection, target):
+    target.search_text = build_search_text(target.student_id, target.full_name)
+
+
+def setup_search_index(conn):
+    """
+    Tạo cột/index/bảng FTS phục vụ tìm kiếm (idempotent).
+    Chạy bởi migration 0001_student_search_text (xem migrations.py).
+    """
+    columns = {c['name'] for c in inspect(conn).get_columns('student')}
+    if 'search_text' not in columns:
+        conn.execute(text('ALTER TABLE student ADD COLUMN search_text VARCHAR(200)'))
+    _backfill_search_text(conn)
+
+    if conn.dialect.name == 'postgresql':
+        conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        conn.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_student_search_text_trgm '
+            'ON student USING gin (search_text gin_trgm_ops)'
+        ))
+    elif conn.dialect.name == 'sqlite':
+        _setup_sqlite_fts(conn)
+
+
+def _backfill_search_text(conn):
+    while True:
+        rows = conn.execute(text(
+            'SELECT id, student_id, full_name FROM student '
+            'WHERE search_text IS NULL LIMIT :limit'
+        ), {'limit': BACKFILL_BATCH_SIZE}).fetchall()
+        if not rows:
+            break
+        conn.execute(
+            text('UPDATE student SET search_text = :search_text WHERE id = :id'),
+            [{'id': r.id, 'search_text': build_search_text(r.student_id, r.full_name)}
+             for r in rows]
+        )
+
+
+def _setup_sqlite_fts(conn):
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_fts'"
+    )).first()
+    if exists:
+        return
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE student_fts USING fts5("
+        "search_text, content='student', content_rowid='id', tokenize='trigram')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER student_fts_ai AFTER INSERT ON student BEGIN "
+        "INSERT INTO student_fts(rowid, search_text) VALUES (new.id, new.search_text); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER student_fts_ad AFTER DELETE ON student BEGIN "
+        "INSERT INTO student_fts(student_fts, rowid, search_text) "
+        "VALUES ('delete', old.id, old.search_text); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER student_fts_au AFTER UPDATE OF search_text ON student BEGIN "
+        "INSERT INTO student_fts(student_fts, rowid, search_text) "
+        "VALUES ('delete', old.id, old.search_text); "
+        "INSERT INTO student_fts(rowid, search_text) VALUES (new.id, new.search_text); END"
+    ))
+    conn.execute(text("INSERT INTO student_fts(student_fts) VALUES ('rebuild')"))
+
+
+def _fts_query(tokens):
+    # Mỗi token là một chuỗi con cần khớp; đặt trong ngoặc kép để FTS5 không
+    # hiểu nhầm ký tự đặc biệt (-, *, :) thành cú pháp truy vấn
+    return ' '.join('"{}"'.format(t.replace('"', '""')) for t in tokens)
+
+
+def search_students(term, cursor=None, limit=50):
+    """
+    Tìm sinh viên theo mã SV hoặc họ tên (không phân biệt dấu).
+    Trả về (students, next_cursor); kết quả tốt nhất đứng trước.
+    """
+    tokens = fold_text(term).split()
+    query = Student.query
+    if not tokens:
+        return keyset_page(query, [Student.id], cursor=cursor, limit=limit,
+                           descending=False)
+
+    dialect = db.engine.dialect.name
+    long_tokens = [t for t in tokens if len(t) >= MIN_FTS_TOKEN]
+    for token in tokens:
+        if dialect != 'sqlite' or token not in long_tokens:
+            query = query.filter(Student.search_text.like(f'%{_escape_like(token)}%',
+                                                          escape='\\'))
+
+    if dialect == 'postgresql':
+        rank = func.similarity(Student.search_text, ' '.join(tokens))
+        descending = True
+    elif dialect == 'sqlite' and long_tokens:
+        query = (query
+                 .join(student_fts, student_fts.c.rowid == Student.id)
+                 .filter(text('student_fts MATCH :fts_query')
+                         .bindparams(fts_query=_fts_query(long_tokens))))
+        # bm25() càng nhỏ càng liên quan
+        rank = func.bm25(literal_column('student_fts'))
+        descending = False
+    else:
+        return keyset_page(query, [Student.id], cursor=cursor, limit=limit,
+                           descending=False)
+
+    query = query.add_columns(rank.label('rank'))
+    rows, next_cursor = keyset_page(query, [rank, Student.id], cursor=cursor,
+                                    limit=limit, descending=descending,
+                                    key=lambda row: (row.rank, row[0].id))
+    return [row[0] for row in rows], next_cursor
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
@@ -0,0 +1,192 @@
+"""
+Thống kê điểm tính hoàn toàn trong database
+
+Mọi con số (phân bố điểm chữ, trung bình, trung vị, phân vị) đều được tính
+bằng GROUP BY / hàm cửa sổ; Python chỉ nhận về vài dòng kết quả nên bộ nhớ
+mỗi request không phụ thuộc số bản ghi điểm.
+"""
+
+import math
+
+from sqlalchemy import func, select
+
+from models import db, Score, Student, Subject
+
+GRADE_ORDER = ['A+', 'A', 'B+', 'B', 'C+', 'C', 'D+', 'D', 'F']
+# Nhóm cho điểm chữ ngoài GRADE_ORDER (dữ liệu cũ, sửa tay trong database)
+OTHER_GRADE = 'Khác'
+PERCENTILES = (0.25, 0.5, 0.75, 0.9)
+
+# Các chiều có thể dùng để chia nhỏ thống kê (tham số group_by)
+GROUP_COLUMNS = {
+    'semester': Score.semester,
+    'subject': Subject.subject_code,
+    'class': Student.class_name,
+    'major': Student.major,
+}
+
+
+def _apply_filters(stmt, filters, group_by=None):
+    filters = filters or {}
+    needs_student = group_by in ('class', 'major') or filters.get('class_name') or filters.get('major')
+    needs_subject = group_by == 'subject'
+    if needs_student:
+        stmt = stmt.join(Student, Student.id == Score.student_id)
+    if needs_subject:
+        stmt = stmt.join(Subject, Subject.id == Score.subject_id)
+
+    if filters.get('semester'):
+        stmt = stmt.where(Score.semester == filters['semester'])
+    if filters.get('subject_id'):
+        stmt = stmt.where(Score.subject_id == filters['subject_id'])
+    if filters.get('class_name'):
+        stmt = stmt.where(Student.class_name == filters['class_name'])
+    if filters.get('major'):
+        stmt = stmt.where(Student.major == filters['major'])
+    return stmt
+
+
+def _group_key(group_by):
+    if group_by is None:
+        return None
+    if group_by not in GROUP_COLUMNS:
+        raise ValueError(f'group_by không hợp lệ: {group_by}')
+    return GROUP_COLUMNS[group_by].label('grp')
+
+
+def _grade_label(grade):
+    return 'na' if grade is None else 'g_' + grade.replace('+', '_plus')
+
+
+def _aggregate(filters, group_by):
+    """
+    Một truy vấn GROUP BY duy nhất: tổng số bản ghi, số bản ghi theo từng điểm
+    chữ (COUNT ... FILTER), count/avg/min/max của điểm trung bình, và trên
+    PostgreSQL cả percentile_cont.
+    """
+    grp = _group_key(group_by)
+    columns = [func.count().filter(Score.letter_grade == g).label(_grade_label(g))
+               for g in GRADE_ORDER]
+    columns += [
+        func.count().filter(Score.letter_grade.is_(None)).label(_grade_label(None)),
+        func.count(Score.id).label('total'),
+        func.count(Score.average_score).label('n'),
+        func.avg(Score.average_score).label('mean'),
+        func.min(Score.average_score).label('min'),
+        func.max(Score.average_score).label('max'),
+    ]
+    if db.engine.dialect.name == 'postgresql':
+        columns += [func.percentile_cont(p).within_group(Score.average_score).label(f'p{i}')
+                    for i, p in enumerate(PERCENTILES)]
+    if grp is not None:
+        columns.insert(0, grp)
+    stmt = _apply_filters(select(*columns).select_from(Score), filters, group_by)
+    if grp is not None:
+        stmt = stmt.group_by(grp)
+    return {(row.grp if grp is not None else None): row for row in db.session.execute(stmt)}
+
+
+def _percentiles_window(filters, group_by):
+    """
+    Phân vị nội suy tuyến tính (giống percentile_cont) cho DB không có hàm
+    percentile: đánh số thứ tự bằng ROW_NUMBER() rồi chỉ lấy các dòng ở vị trí
+    cần thiết, tối đa 2 dòng cho mỗi phân vị của mỗi nhóm.
+    """
+    grp = _group_key(group_by)
+    partition = [grp] if grp is not None else []
+    columns = [
+        Score.average_score.label('v'),
+        (func.row_number().over(partition_by=partition, order_by=Score.average_score) - 1).label('rn'),
+        func.count().over(partition_by=partition).label('n'),
+    ]
+    if grp is not None:
+        columns.insert(0, grp)
+    ranked = _apply_filters(select(*columns).select_from(Score), filters, group_by)
+    ranked = ranked.where(Score.average_score.isnot(None)).subquery()
+
+    wanted = []
+    for p in PERCENTILES:
+        # CAST sang INTEGER cắt phần thập phân (= floor vì giá trị không âm)
+        lower = ((ranked.c.n - 1) * p).cast(db.Integer)
+        wanted.extend([ranked.c.rn == lower, ranked.c.rn == lower + 1])
+    out_columns = [ranked.c.rn, ranked.c.n, ranked.c.v]
+    if grp is not None:
+        out_columns.insert(0, ranked.c.grp)
+    stmt = select(*out_columns).where(db.or_(*wanted))
+
+    values = {}
+    sizes = {}
+    for row in db.session.execute(stmt):
+        key = row.grp if grp is not None else None
+        values.setdefault(key, {})[row.rn] = row.v
+        sizes[key] = row.n
+
+    result = {}
+    for key, by_rank in values.items():
+        n = sizes[key]
+        result[key] = {}
+        for p in PERCENTILES:
+            pos = (n - 1) * p
+            lo = math.floor(pos)
+            hi = min(lo + 1, n - 1)
+            frac = pos - lo
+            result[key][p] = by_rank[lo] + (by_rank[hi] - by_rank[lo]) * frac
+    return result
+
+
+def compute_statistics(filters=None, group_by=None):
+    """
+    Trả về {group: {'grade_distribution', 'total_scores', 'summary'}}
+    (group=None khi không chia nhóm). Phân vị tính cùng truy vấn trên PostgreSQL,
+    các DB khác dùng thêm một truy vấn hàm cửa sổ.
+    """
+    rows = _aggregate(filters, group_by)
+    if db.engine.dialect.name == 'postgresql':
+        percentiles = {key: {p: getattr(row, f'p{i}') for i, p in enumerate(PERCENTILES)}
+                       for key, row in rows.items()}
+    else:
+        percentiles = _percentiles_window(filters, group_by)
+
+    result = {}
+    for key, row in rows.items():
+        distribution = {}
+        for grade in GRADE_ORDER + [None]:
+            count = getattr(row, _grade_label(grade))
+            if count:
+                distribution[grade or 'N/A'] = count
+        other = row.total - sum(distribution.values())
+        if other:
+            distribution[OTHER_GRADE] = other
+        pct = percentiles.get(key, {})
+        result[key] = {
+            'grade_distribution': distribution,
+            'total_scores': row.total,
+            'summary': {
+                'count': row.n,
+                'mean': _round(row.mean),
+                'min': _round(row.min),
+                'max': _round(row.max),
+                'median': _round(pct.get(0.5)),
+                'percentiles': {f'p{int(p * 100)}': _round(pct.get(p)) for p in PERCENTILES},
+            },
+        }
+    return result
+
+
+def _round(value):
+    return round(float(value), 2) if value is not None else None
+
+
+def get_statistics(filters=None, group_by=None):
+    """Thống kê tổng thể, kèm bảng chia theo nhóm nếu có group_by"""
+    result = compute_statistics(filters).get(None) or {
+        'grade_distribution': {}, 'total_scores': 0, 'summary': None,
+    }
+    if group_by:
+        groups = compute_statistics(filters, group_by)
+        result['group_by'] = group_by
+        result['breakdown'] = [
+            dict(group=key, **groups[key])
+            for key in sorted(groups, key=lambda k: (k is None, k or ''))
+        ]
+    return result
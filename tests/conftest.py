@@ -0,0 +1,102 @@
+"""
+Fixture dùng chung: mỗi test một app profile testing với database SQLite trong
+bộ nhớ riêng (StaticPool), đã chạy migration (trigger change_log, bộ đếm, thế hệ
+cache) và có sẵn tài khoản mặc định.
+
+Chạy: make test, hoặc python -m pytest tests
+"""
+
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Phải đặt trước khi import app (app.py tạo app ở mức module). Băm lại mật
+# khẩu sau đăng nhập dùng pbkdf2 ít vòng cho nhanh; test không đo độ an toàn của hash
+os.environ.update(APP_PROFILE='testing', DATABASE_URL='sqlite://',
+                  AUTH_HASH_METHOD='pbkdf2:sha256:1000')
+
+
+@pytest.fixture
+def app():
+    import app as app_module
+    import auth
+    import cache
+    import counters
+
+    app = app_module.create_app()
+    with app.app_context():
+        app_module.bootstrap_db()
+        yield app
+        app_module.db.session.remove()
+        app_module.db.engine.dispose()
+    # Trạng thái trong bộ nhớ của module dùng chung giữa các app
+    auth.user_cache.clear()
+    cache.store.clear()
+    counters._cache.invalidate()
+
+
+@pytest.fixture
+def db(app):
+    from models import db
+    return db
+
+
+@pytest.fixture
+def make_student(db):
+    from models import Student
+
+    def make(student_id, **fields):
+        student = Student(student_id=student_id, full_name=fields.pop('full_name', f'Sinh viên {student_id}'),
+                          status=fields.pop('status', 'active'), **fields)
+        db.session.add(student)
+        db.session.commit()
+        return student
+    return make
+
+
+@pytest.fixture
+def make_subject(db):
+    from models import Subject
+
+    def make(subject_code, credits=3, **fields):
+        subject = Subject(subject_code=subject_code, subject_name=fields.pop('subject_name', subject_code),
+                          credits=credits, **fields)
+        db.session.add(subject)
+        db.session.commit()
+        return subject
+    return make
+
+
+@pytest.fixture
+def make_score(db):
+    from models import Score
+
+    def make(student, subject, midterm, final, semester='HK1-2024'):
+        score = Score(student_id=student.id, subject_id=subject.id, midterm_score=midterm,
+                      final_score=final, semester=semester)
+        score.calculate_average()
+        db.session.add(score)
+        db.session.commit()
+        return score
+    return make
+
+
+def _login(app, username, password):
+    client = app.test_client()
+    response = client.post('/login', data={'username': username, 'password': password})
+    assert response.status_code == 302
+    return client
+
+
+@pytest.fixture
+def teacher(app):
+    return _login(app, 'teacher', 'teacher123')
+
+
+@pytest.fixture
+def admin(app):
+    return _login(app, 'admin', 'admin123')
@@ -0,0 +1,98 @@
+"""Giới hạn đăng nhập (token bucket), pool băm mật khẩu và cache người dùng theo session_version"""
+
+import threading
+import time
+
+import pytest
+
+import auth
+from models import User
+
+
+@pytest.fixture
+def limiters(app):
+    limiters = {'ip': auth.TokenBucketLimiter(3, 3600), 'username': auth.TokenBucketLimiter(2, 3600)}
+    app.extensions['auth_limiters'] = limiters
+    return limiters
+
+
+def _tokens(limiter, key):
+    return limiter._buckets[key][0]
+
+
+def test_bucket_refills_and_refund_is_capped():
+    limiter = auth.TokenBucketLimiter(2, 0.2)
+    assert limiter.acquire('k') == 0
+    assert limiter.acquire('k') == 0
+    assert limiter.acquire('k') > 0
+    time.sleep(0.15)
+    assert limiter.acquire('k') == 0
+    limiter.refund('k')
+    limiter.refund('k')
+    limiter.refund('k')
+    assert _tokens(limiter, 'k') <= 2
+
+
+def test_denied_bucket_does_not_drain_the_other(app, limiters):
+    for _ in range(2):
+        assert auth.authenticate('admin', 'sai', '10.0.0.1') is None
+    assert _tokens(limiters['ip'], '10.0.0.1') == pytest.approx(1, abs=0.01)
+
+    # Username đã hết lượt: IP được hoàn lại token vừa lấy
+    for _ in range(5):
+        with pytest.raises(auth.LoginRateLimited):
+            auth.authenticate('admin', 'sai', '10.0.0.1')
+    assert _tokens(limiters['ip'], '10.0.0.1') == pytest.approx(1, abs=0.01)
+
+    # IP còn lượt cho username khác
+    assert auth.authenticate('teacher', 'teacher123', '10.0.0.1').username == 'teacher'
+
+
+def test_denied_ip_does_not_charge_username(app, limiters):
+    for name in ('u1', 'u2', 'u3'):
+        assert auth.authenticate(name, 'sai', '10.0.0.2') is None
+    with pytest.raises(auth.LoginRateLimited) as denied:
+        auth.authenticate('teacher', 'teacher123', '10.0.0.2')
+    assert denied.value.retry_after > 0
+    assert 'teacher' not in limiters['username']._buckets
+
+
+def test_successful_login_refunds_both_buckets(app, limiters):
+    for _ in range(5):
+        assert auth.authenticate('teacher', 'teacher123', '10.0.0.3') is not None
+    assert _tokens(limiters['ip'], '10.0.0.3') == pytest.approx(3, abs=0.01)
+    assert _tokens(limiters['username'], 'teacher') == pytest.approx(2, abs=0.01)
+
+
+def test_login_route_reports_rate_limit(app, limiters):
+    client = app.test_client()
+    for _ in range(2):
+        client.post('/login', data={'username': 'admin', 'password': 'sai'})
+    response = client.post('/login', data={'username': 'admin', 'password': 'sai'})
+    assert response.status_code == 429
+
+
+def test_hasher_timeout_maps_to_busy_and_holds_slot():
+    hasher = auth.PasswordHasher(workers=1, queue=0, timeout=0.1)
+    release = threading.Event()
+    with pytest.raises(auth.AuthBusy):
+        hasher._run(release.wait, 5)
+    # Tác vụ cũ vẫn chạy nên slot chưa được trả
+    with pytest.raises(auth.AuthBusy):
+        hasher._run(lambda: True)
+    release.set()
+    time.sleep(0.05)
+    assert hasher._run(lambda: True) is True
+
+
+def test_password_change_invalidates_cached_sessions(db):
+    user = User.query.filter_by(username='teacher').one()
+    old_id = user.get_id()
+    assert auth.load_user(old_id).username == 'teacher'
+    assert auth.load_user(old_id) is not None  # lần này lấy từ cache
+
+    user.set_password('mat-khau-moi')
+    db.session.commit()
+    assert auth.load_user(old_id) is None
+    assert auth.load_user(user.get_id()).username == 'teacher'
+    assert auth.load_user('1') is None
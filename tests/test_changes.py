@@ -0,0 +1,113 @@
+"""Nhật ký thay đổi: trigger, gộp thay đổi, lỗ id chưa commit và cursor đã bị purge"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+
+import changes
+from models import ChangeLog, Student
+
+
+def _log(db, *rows):
+    """Ghi thẳng các dòng (id, table, row_id, op, tuổi tính bằng giây) vào change_log"""
+    now = datetime.utcnow()
+    db.session.execute(ChangeLog.__table__.insert(), [
+        {'id': id_, 'table_name': table, 'row_id': row_id, 'op': op,
+         'changed_at': now - timedelta(seconds=age)}
+        for id_, table, row_id, op, age in rows
+    ])
+    db.session.commit()
+
+
+@pytest.fixture
+def settle(app):
+    app.config['CHANGES_SETTLE_SECONDS'] = 60
+    return 60
+
+
+def test_triggers_record_orm_and_bulk_writes(db, make_student, make_subject, make_score):
+    student = make_student('SV001')
+    subject = make_subject('MATH')
+    make_score(student, subject, 7, 8)
+    student.full_name = 'Tên mới'
+    db.session.commit()
+    db.session.execute(update(Student).values(major='CNTT'))
+    db.session.delete(student)
+    db.session.commit()
+
+    logged = [(r.table_name, r.op) for r in db.session.query(ChangeLog).order_by(ChangeLog.id)]
+    assert logged == [('student', 'insert'), ('subject', 'insert'), ('score', 'insert'),
+                      ('student', 'update'), ('student', 'update'),
+                      ('score', 'delete'), ('student', 'delete')]
+
+
+def test_collapses_changes_per_record(db, settle):
+    _log(db, (1, 'student', 10, 'insert', 5), (2, 'student', 11, 'update', 5),
+         (3, 'student', 10, 'update', 5), (4, 'student', 12, 'insert', 5),
+         (5, 'student', 12, 'delete', 5))
+    entries, next_cursor, has_more = changes.read_changes(0, 100)
+    assert [(e['id'], e['op'], e['created'], e['cursor']) for e in entries] == [
+        (11, 'update', False, 2), (10, 'update', True, 3), (12, 'delete', True, 5)]
+    assert (next_cursor, has_more) == (5, False)
+
+
+def test_stops_before_recent_gap(db, settle):
+    # id 3 chưa xuất hiện: transaction giữ id đó có thể vẫn chưa commit
+    _log(db, (1, 'student', 1, 'insert', 5), (2, 'student', 2, 'insert', 5),
+         (4, 'student', 4, 'insert', 5), (5, 'student', 5, 'insert', 5))
+    entries, next_cursor, has_more = changes.read_changes(0, 100)
+    assert [e['id'] for e in entries] == [1, 2]
+    assert (next_cursor, has_more) == (2, True)
+
+    # Transaction muộn commit: lần đọc sau từ cursor 2 thấy đủ, không bỏ sót
+    _log(db, (3, 'student', 3, 'insert', 0))
+    entries, next_cursor, has_more = changes.read_changes(next_cursor, 100)
+    assert [e['id'] for e in entries] == [3, 4, 5]
+    assert (next_cursor, has_more) == (5, False)
+
+
+def test_skips_settled_gap(db, settle):
+    # Lỗ trước dòng cũ hơn thời gian chờ: transaction đã rollback, đọc tiếp qua lỗ;
+    # lỗ trước dòng mới (id 7) vẫn phải chờ
+    _log(db, (1, 'student', 1, 'insert', 600), (4, 'student', 4, 'insert', 120),
+         (5, 'student', 5, 'insert', 90), (7, 'score', 7, 'insert', 5))
+    entries, next_cursor, has_more = changes.read_changes(0, 100)
+    assert [e['id'] for e in entries] == [1, 4, 5]
+    assert (next_cursor, has_more) == (5, True)
+
+
+def test_table_filter_still_advances_cursor(db, settle):
+    _log(db, (1, 'student', 1, 'insert', 5), (2, 'score', 1, 'insert', 5), (3, 'subject', 1, 'insert', 5))
+    entries, next_cursor, has_more = changes.read_changes(0, 2, {'score'})
+    assert [e['table'] for e in entries] == ['score']
+    assert (next_cursor, has_more) == (2, True)
+    entries, next_cursor, has_more = changes.read_changes(next_cursor, 2, {'score'})
+    assert entries == [] and next_cursor == 3
+
+
+def test_purge_expires_old_cursors(db, settle):
+    _log(db, (1, 'student', 1, 'insert', 10 * 86400), (2, 'student', 2, 'insert', 10 * 86400),
+         (3, 'student', 3, 'insert', 5))
+    assert changes.purge(days=7) == 2
+    with pytest.raises(changes.CursorExpired):
+        changes.read_changes(1, 100)
+    entries, _, _ = changes.read_changes(2, 100)
+    assert [e['id'] for e in entries] == [3]
+
+
+def test_feed_endpoint(db, teacher, make_student):
+    student = make_student('SV001')
+    deleted = make_student('SV002')
+    db.session.delete(deleted)
+    db.session.commit()
+
+    response = teacher.get('/api/v1/changes?since=0&types=student')
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert [(line['id'], line['op']) for line in lines] == [(student.id, 'insert'), (deleted.id, 'delete')]
+    assert lines[0]['data']['student_id'] == 'SV001'
+    assert response.headers['X-Next-Cursor'] == str(lines[-1]['cursor'])
+
+    assert teacher.get('/api/v1/changes?types=unknown').status_code == 400
@@ -0,0 +1,91 @@
+"""Bộ đếm dashboard và thế hệ cache sau ghi qua ORM và UPDATE/DELETE hàng loạt"""
+
+import pytest
+from sqlalchemy import delete, update
+
+import cache
+import counters
+from models import Score, Student, Subject
+
+
+def _assert_counters_exact(db):
+    db.session.commit()
+    assert {name: counters.current(name) for name in counters.COUNTER_NAMES} == \
+        counters._count_all(db.session.connection())
+
+
+@pytest.fixture
+def seeded(make_student, make_subject, make_score):
+    students = [make_student(f'SV{i:03d}', status='active' if i % 3 else 'inactive') for i in range(9)]
+    subject = make_subject('MATH')
+    for student in students[:5]:
+        make_score(student, subject, 7, 8)
+    return students, subject
+
+
+def test_orm_writes(db, seeded):
+    students, _ = seeded
+    _assert_counters_exact(db)
+
+    # Thuộc tính đã expire sau commit: giá trị cũ vẫn phải được tính
+    students[1].status = 'inactive'
+    students[0].status = 'active'
+    students[2].status = 'active'
+    db.session.commit()
+    _assert_counters_exact(db)
+
+    db.session.delete(students[4])
+    db.session.commit()
+    _assert_counters_exact(db)
+
+
+def test_bulk_update_and_delete(db, seeded):
+    db.session.execute(update(Student).where(Student.student_id <= 'SV004').values(status='graduated'))
+    _assert_counters_exact(db)
+
+    db.session.execute(delete(Score).where(Score.student_id.in_([s.id for s in seeded[0][:2]])))
+    _assert_counters_exact(db)
+
+    db.session.execute(delete(Student).where(Student.status == 'active'))
+    _assert_counters_exact(db)
+
+    db.session.execute(delete(Subject))
+    _assert_counters_exact(db)
+    assert counters.current(counters.TOTAL_SUBJECTS) == 0
+
+
+def test_cache_generations_bump_once_per_transaction(db, seeded):
+    before = cache.generations(Student, Subject, Score)
+
+    db.session.execute(update(Score).values(midterm_score=Score.midterm_score))
+    db.session.execute(update(Score).values(final_score=Score.final_score))
+    db.session.commit()
+    after_update = cache.generations(Student, Subject, Score)
+    assert after_update == (before[0], before[1], before[2] + 1)
+
+    db.session.execute(delete(Student).where(Student.status == 'inactive'))
+    db.session.commit()
+    after_delete = cache.generations(Student, Subject, Score)
+    assert after_delete == (after_update[0] + 1, after_update[1], after_update[2])
+
+    db.session.execute(update(Student).values(major='CNTT'))
+    db.session.rollback()
+    assert cache.generations(Student, Subject, Score) == after_delete
+
+
+def test_memoize_recomputes_after_bulk_write(app, db, seeded):
+    app.config['CACHE_ENABLED'] = True
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return db.session.query(Student).filter_by(status='active').count()
+
+    first = cache.memoize('active_students', (Student,), compute)
+    assert cache.memoize('active_students', (Student,), compute) == first
+    assert len(calls) == 1
+
+    db.session.execute(update(Student).values(status='active'))
+    db.session.commit()
+    assert cache.memoize('active_students', (Student,), compute) == 9
+    assert len(calls) == 2
@@ -0,0 +1,92 @@
+"""Bảng tổng hợp GPA cập nhật tăng dần phải khớp với tính lại toàn bộ (rebuild_all)"""
+
+import pytest
+
+import gpa
+from models import Score, StudentGpa, StudentSemesterGpa
+
+
+def _summaries(db):
+    # Dòng còn 0 tín chỉ (đã xóa hết điểm) tương đương với không có dòng
+    overall = {row.student_id: (row.total_credits, round(row.total_points, 6), round(row.gpa, 6))
+               for row in db.session.query(StudentGpa) if row.total_credits}
+    by_semester = {(row.student_id, row.semester): (row.total_credits, round(row.total_points, 6),
+                                                    round(row.gpa, 6))
+                   for row in db.session.query(StudentSemesterGpa) if row.total_credits}
+    return overall, by_semester
+
+
+def _assert_matches_rebuild(db):
+    db.session.expire_all()
+    incremental = _summaries(db)
+    gpa.rebuild_all()
+    db.session.expire_all()
+    assert incremental == _summaries(db)
+    return incremental
+
+
+@pytest.fixture
+def graded(make_student, make_subject, make_score):
+    alice, bob = make_student('SV001'), make_student('SV002')
+    math, physics = make_subject('MATH', credits=3), make_subject('PHYS', credits=4)
+    scores = [
+        make_score(alice, math, 9, 9.5),
+        make_score(alice, physics, 6, 7),
+        make_score(alice, math, 4, 5, semester='HK2-2024'),
+        make_score(bob, physics, 8, 8),
+    ]
+    return alice, bob, math, physics, scores
+
+
+def test_insert_matches_rebuild(db, graded):
+    alice, bob, *_ = graded
+    overall, by_semester = _assert_matches_rebuild(db)
+    assert overall[alice.id][0] == 10
+    assert by_semester[(alice.id, 'HK1-2024')][0] == 7
+    assert overall[bob.id] == (4, 14.0, 3.5)
+
+
+def test_update_grade_subject_semester_and_student(db, graded):
+    alice, bob, math, physics, scores = graded
+    first, second, third, _ = scores
+
+    first.midterm_score, first.final_score = 2, 3
+    first.calculate_average()
+    db.session.commit()
+    _assert_matches_rebuild(db)
+
+    second.subject_id = math.id
+    second.semester = 'HK3-2024'
+    db.session.commit()
+    _assert_matches_rebuild(db)
+
+    third.student_id = bob.id
+    db.session.commit()
+    overall, _ = _assert_matches_rebuild(db)
+    assert overall[bob.id][0] == 7
+
+
+def test_delete_matches_rebuild(db, graded):
+    alice, bob, _, _, scores = graded
+    db.session.delete(scores[3])
+    db.session.commit()
+    overall, _ = _assert_matches_rebuild(db)
+    assert bob.id not in overall
+
+    db.session.delete(alice)
+    db.session.commit()
+    overall, by_semester = _assert_matches_rebuild(db)
+    assert overall == {} and by_semester == {}
+    assert db.session.query(Score).count() == 0
+
+
+def test_refresh_students_after_bulk_insert(db, graded):
+    alice, bob, math, _, _ = graded
+    db.session.execute(Score.__table__.insert(), [
+        {'student_id': bob.id, 'subject_id': math.id, 'semester': 'HK2-2024',
+         'midterm_score': 10, 'final_score': 10, 'average_score': 10, 'letter_grade': 'A+'},
+    ])
+    gpa.refresh_students([bob.id])
+    db.session.commit()
+    overall, _ = _assert_matches_rebuild(db)
+    assert overall[bob.id][0] == 7
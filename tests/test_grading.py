@@ -0,0 +1,38 @@
+"""Chính sách tính điểm: kiểm tra thang điểm chữ, regrade cập nhật điểm chữ và GPA"""
+
+import pytest
+
+import grading
+from models import Score, StudentGpa
+
+
+@pytest.mark.parametrize('grade_scale, fail_grade', [
+    ([(8.5, 'A'), (5.0, 'Đạt')], 'F'),         # nhãn không có điểm hệ 4
+    ([(8.5, 'A'), (5.0, 'C')], 'Trượt'),       # dài hơn cột letter_grade String(2)
+])
+def test_rejects_unknown_grade_labels(grade_scale, fail_grade):
+    with pytest.raises(ValueError, match='Điểm chữ không hợp lệ'):
+        grading.Policy(0.4, 0.6, grade_scale, fail_grade=fail_grade)
+
+
+def test_add_policy_validates_before_saving(db):
+    with pytest.raises(ValueError):
+        grading.add_policy('Sai', 0.5, 0.5, [(5.0, 'PASS')])
+    assert grading.resolve_policy(None, None).name == grading.default_policy().name
+
+
+def test_regrade_updates_letters_and_gpa(db, make_student, make_subject, make_score):
+    student = make_student('SV001')
+    subject = make_subject('MATH', credits=3)
+    score = make_score(student, subject, 6, 6)
+    before = db.session.get(StudentGpa, student.id).gpa
+
+    # Thang mới: 6 điểm trở lên là A
+    grading.add_policy('Thang dễ', 0.5, 0.5, [(6.0, 'A'), (4.0, 'D')], semester='HK1-2024')
+    assert grading.regrade(semester='HK1-2024') == (1, 1)
+
+    db.session.expire_all()
+    assert db.session.get(Score, score.id).letter_grade == 'A'
+    assert db.session.get(StudentGpa, student.id).gpa == pytest.approx(3.7)
+    assert before < 3.7
+    assert grading.regrade(semester='HK1-2024') == (1, 0)
@@ -0,0 +1,64 @@
+"""Phân trang keyset: đi hết các trang phải gặp mỗi bản ghi đúng một lần, kể cả khi khóa sắp xếp trùng"""
+
+from datetime import datetime
+
+import pytest
+
+import search
+from models import Score
+from pagination import decode_cursor, encode_cursor, keyset_page
+
+
+def _all_pages(fetch, limit):
+    seen, cursor, pages = [], None, 0
+    while True:
+        items, cursor = fetch(cursor, limit)
+        seen.extend(items)
+        pages += 1
+        assert pages < 100
+        if cursor is None:
+            return seen
+
+
+@pytest.fixture
+def tied_scores(db, make_student, make_subject, make_score):
+    subject = make_subject('MATH')
+    scores = [make_score(make_student(f'SV{i:03d}'), subject, 5, 5) for i in range(10)]
+    # Hai nhóm created_at trùng nhau (import hàng loạt ghi cùng một thời điểm)
+    moments = [datetime(2024, 9, 1, 8, 0, 0, 123456), datetime(2024, 9, 1, 8, 0, 0, 654321)]
+    for index, score in enumerate(scores):
+        score.created_at = moments[index % 2]
+    db.session.commit()
+    return scores
+
+
+@pytest.mark.parametrize('descending', [True, False])
+@pytest.mark.parametrize('limit', [1, 3, 4, 10, 11])
+def test_ties_on_created_at(tied_scores, descending, limit):
+    def fetch(cursor, limit):
+        return keyset_page(Score.query, [Score.created_at, Score.id], cursor, limit, descending=descending)
+
+    seen = _all_pages(fetch, limit)
+    expected = sorted(tied_scores, key=lambda s: (s.created_at, s.id), reverse=descending)
+    assert [s.id for s in seen] == [s.id for s in expected]
+
+
+def test_search_rank_ties(make_student):
+    # Cùng họ tên nên bm25 (SQLite FTS5) bằng nhau cho mọi dòng
+    students = [make_student(f'SV{i:03d}', full_name='Nguyễn Văn Trùng') for i in range(7)]
+    make_student('SV999', full_name='Trần Thị Khác')
+
+    seen = _all_pages(lambda cursor, limit: search.search_students('nguyen trung', cursor, limit), 2)
+    assert sorted(s.id for s in seen) == sorted(s.id for s in students)
+    assert len(seen) == len(students)
+
+
+def test_cursor_round_trip_and_invalid_cursor(tied_scores):
+    moment = tied_scores[1].created_at
+    assert decode_cursor(encode_cursor([moment, 7]), [Score.created_at, Score.id]) == [moment, 7]
+    assert decode_cursor('không-hợp-lệ', [Score.created_at, Score.id]) is None
+    assert decode_cursor(encode_cursor([1]), [Score.created_at, Score.id]) is None
+
+    first_page, _ = keyset_page(Score.query, [Score.created_at, Score.id], None, 3)
+    from_garbage, _ = keyset_page(Score.query, [Score.created_at, Score.id], 'rác', 3)
+    assert [s.id for s in from_garbage] == [s.id for s in first_page]